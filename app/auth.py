@@ -4,10 +4,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, UserRole
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -42,6 +44,11 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 	return db.query(User).filter(User.email == email).first()
 
 
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+	result = await db.execute(select(User).where(User.email == email).limit(1))
+	return result.scalars().first()
+
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
 	user = get_user_by_email(db, email)
 	if not user:
@@ -51,7 +58,19 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
 	return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_user_from_token(db: Session, token: str) -> Optional[User]:
+	"""Resolve a bearer token to a user, or None if it is invalid (for WebSocket auth)."""
+	try:
+		payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+	except JWTError:
+		return None
+	email = payload.get("sub")
+	if email is None:
+		return None
+	return get_user_by_email(db, email=email)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
 	credentials_exception = HTTPException(
 		status_code=status.HTTP_401_UNAUTHORIZED,
 		detail="Could not validate credentials",
@@ -63,7 +82,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 		if email is None:
 			raise credentials_exception
 		role = payload.get("role")
-		user = get_user_by_email(db, email=email)
+		user = await get_user_by_email_async(db, email=email)
 		if user is None:
 			raise credentials_exception
 		return user
@@ -8,12 +8,80 @@ class Settings(BaseSettings):
 	algorithm: str = Field(default="HS256")
 	access_token_expire_minutes: int = Field(default=60 * 24)
 	database_url: str = Field(default="sqlite:///./rehab.db")
+	# SQLite performance profile, applied to every pooled connection
+	sqlite_wal: bool = Field(default=True)
+	sqlite_synchronous: str = Field(default="NORMAL")
+	sqlite_cache_size_kib: int = Field(default=65536)
+	sqlite_mmap_size: int = Field(default=256 * 1024 * 1024)
+	sqlite_busy_timeout_ms: int = Field(default=5000)
+	# New databases reclaim space incrementally (see the retention job)
+	sqlite_auto_vacuum: str = Field(default="INCREMENTAL")
+	# Connection pool: roughly request threads + inference workers + the realtime writer
+	db_pool_size: int = Field(default=10)
+	db_max_overflow: int = Field(default=10)
+	db_pool_timeout_s: float = Field(default=30.0)
+	# In-process cache of per-patient analytics responses, invalidated on writes
+	analytics_cache_enabled: bool = Field(default=True)
+	analytics_cache_max_entries: int = Field(default=1024)
+	analytics_cache_ttl_s: float = Field(default=30.0)
+	# Retention: per-frame results older than N days are archived into compact
+	# per-session blobs and deleted in batches (0 = keep everything)
+	retention_results_days: int = Field(default=0)
+	retention_archive_keypoints: bool = Field(default=True)
+	retention_batch_rows: int = Field(default=5000)
+	retention_interval_s: float = Field(default=3600.0)
+	retention_vacuum_pages: int = Field(default=2000)
+	# Bulk exports are read and encoded this many rows at a time
+	export_chunk_rows: int = Field(default=1000)
 	media_dir: str = Field(default="media")
 	models_dir: str = Field(default="app/models")
 	movenet_model_handle: str = Field(
 		default="https://tfhub.dev/google/movenet/singlepose/thunder/4"
 	)
 	lstm_model_path: str = Field(default="app/models/lstm_model.h5")
+	# Realtime keyframe mode: run MoveNet every N frames and track keypoints
+	# with optical flow in between (1 = run MoveNet on every frame)
+	realtime_keyframe_interval: int = Field(default=1)
+	realtime_min_track_quality: float = Field(default=0.6)
+	# Write-behind persistence of realtime predictions (group commit every N rows or T ms)
+	realtime_write_batch_size: int = Field(default=200)
+	realtime_write_flush_ms: int = Field(default=500)
+	realtime_write_queue_size: int = Field(default=10000)
+	# Log per-frame realtime debug output only for every N-th frame
+	realtime_log_sample_every: int = Field(default=100)
+	# CPU-bound frame work runs on a bounded executor, sized separately from
+	# TensorFlow's own thread pools (0 = TensorFlow default)
+	inference_workers: int = Field(default=2)
+	inference_max_pending: int = Field(default=8)
+	# Batch video work is scheduled behind realtime frames, in chunks of
+	# VIDEO_BATCH_FRAMES, but gets at least this share of dispatches
+	inference_batch_min_share: float = Field(default=0.2)
+	video_batch_frames: int = Field(default=16)
+	tf_intra_op_threads: int = Field(default=0)
+	tf_inter_op_threads: int = Field(default=0)
+	loop_lag_interval_ms: int = Field(default=500)
+	# Adaptive capture advice sent to realtime clients that opt in
+	realtime_target_latency_ms: int = Field(default=150)
+	realtime_advice_cooldown_s: float = Field(default=2.0)
+	# Binary responses resend label/probabilities only past this change
+	realtime_label_hysteresis: float = Field(default=0.1)
+	# Per-connection dedup of near-identical frames (perceptual hash distance in bits)
+	realtime_dedup_enabled: bool = Field(default=True)
+	realtime_dedup_max_distance: int = Field(default=3)
+	realtime_dedup_max_reuse: int = Field(default=15)
+	# Admission control and per-connection limits (0 = unlimited)
+	realtime_max_streams: int = Field(default=64)
+	realtime_admission_wait_s: float = Field(default=5.0)
+	realtime_max_fps: float = Field(default=30.0)
+	realtime_burst_frames: float = Field(default=10.0)
+	realtime_max_bytes_per_s: int = Field(default=2_000_000)
+	realtime_max_message_bytes: int = Field(default=1_000_000)
+	# Optional shared inference process (python -m app.inference_server): unix
+	# socket path or @name (abstract socket), never TCP since messages are
+	# pickled; empty = load models in every worker
+	inference_server_address: str = Field(default="")
+	inference_server_authkey: str = Field(default="CHANGE_ME_INFERENCE_KEY")
+	inference_ring_slots: int = Field(default=96)
 
 	class Config:
 		env_file = ".env"
@@ -1,5 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 import os
 
@@ -7,14 +10,119 @@ import os
 os.makedirs(settings.media_dir, exist_ok=True)
 os.makedirs(settings.models_dir, exist_ok=True)
 
-engine = create_engine(
-	settings.database_url,
-	connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {},
-	pool_pre_ping=True,
-)
+
+def _is_sqlite(url: str) -> bool:
+	return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+	return _is_sqlite(url) and (url.endswith(":memory:") or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"))
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+	"""Per-connection SQLite profile: WAL so readers don't block on the writer,
+	NORMAL sync (durable at checkpoints under WAL), a larger page cache,
+	memory-mapped reads and a busy timeout instead of immediate 'database is locked'."""
+	cursor = dbapi_connection.cursor()
+	try:
+		# Only takes effect on new (empty) databases; existing ones need one VACUUM
+		cursor.execute(f"PRAGMA auto_vacuum={settings.sqlite_auto_vacuum}")
+		if settings.sqlite_wal:
+			cursor.execute("PRAGMA journal_mode=WAL")
+		cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+		cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+		cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+		cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+		cursor.execute("PRAGMA temp_store=MEMORY")
+	finally:
+		cursor.close()
+
+
+def create_db_engine(url: str) -> Engine:
+	"""Engine with the SQLite performance profile and a pool sized for our workers"""
+	if not _is_sqlite(url):
+		return create_engine(
+			url,
+			pool_pre_ping=True,
+			pool_size=settings.db_pool_size,
+			max_overflow=settings.db_max_overflow,
+			pool_timeout=settings.db_pool_timeout_s,
+		)
+	kwargs = {}
+	if not _is_sqlite_memory(url):
+		kwargs.update(
+			pool_size=settings.db_pool_size,
+			max_overflow=settings.db_max_overflow,
+			pool_timeout=settings.db_pool_timeout_s,
+		)
+	sqlite_engine = create_engine(
+		url,
+		connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000.0},
+		pool_pre_ping=True,
+		**kwargs,
+	)
+	event.listen(sqlite_engine, "connect", apply_sqlite_pragmas)
+	return sqlite_engine
+
+
+_ASYNC_DRIVERS = {
+	"sqlite": "sqlite+aiosqlite",
+	"postgresql": "postgresql+asyncpg",
+	"postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+	"""Map a sync database URL to its async driver (aiosqlite / asyncpg)"""
+	parsed = make_url(url)
+	backend = parsed.get_backend_name()
+	if parsed.drivername in _ASYNC_DRIVERS:
+		parsed = parsed.set(drivername=_ASYNC_DRIVERS[parsed.drivername])
+	elif backend in _ASYNC_DRIVERS and "+" in parsed.drivername:
+		# Explicit sync driver (e.g. postgresql+psycopg2): swap it for the async one
+		parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+	return parsed.render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str) -> AsyncEngine:
+	"""Async counterpart of create_db_engine, with the same SQLite profile and pool sizing"""
+	async_url = async_database_url(url)
+	if not _is_sqlite(url):
+		return create_async_engine(
+			async_url,
+			pool_pre_ping=True,
+			pool_size=settings.db_pool_size,
+			max_overflow=settings.db_max_overflow,
+			pool_timeout=settings.db_pool_timeout_s,
+		)
+	kwargs = {}
+	if not _is_sqlite_memory(url):
+		# aiosqlite defaults to NullPool; pool connections so pragmas are set once each
+		kwargs.update(
+			poolclass=AsyncAdaptedQueuePool,
+			pool_size=settings.db_pool_size,
+			max_overflow=settings.db_max_overflow,
+			pool_timeout=settings.db_pool_timeout_s,
+		)
+	sqlite_engine = create_async_engine(
+		async_url,
+		connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000.0},
+		pool_pre_ping=True,
+		**kwargs,
+	)
+	event.listen(sqlite_engine.sync_engine, "connect", apply_sqlite_pragmas)
+	return sqlite_engine
+
+
+engine = create_db_engine(settings.database_url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async handlers use this engine so queries don't block the event loop
+async_engine = create_async_db_engine(settings.database_url)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 
 Base = declarative_base()
 
@@ -26,3 +134,7 @@ def get_db():
 	finally:
 		db.close()
 
+
+async def get_async_db():
+	async with AsyncSessionLocal() as db:
+		yield db
@@ -0,0 +1,136 @@
+"""Standalone inference process shared by all web workers.
+
+Run with ``python -m app.inference_server`` and point the API workers at it
+with ``INFERENCE_SERVER_ADDRESS`` (a unix socket path, or ``@name`` for an
+abstract socket; TCP is refused since messages are pickled) and the
+same ``INFERENCE_SERVER_AUTHKEY``. MoveNet and the LSTM are loaded once here
+instead of once per worker; frames are read from each worker's shared-memory
+ring, so only small control messages are pickled over the connection.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
+from app.config import settings
+from app.services.inference_executor import configure_tensorflow_threads
+from app.services.remote_inference import parse_address
+from app.services.shared_frames import FrameRing
+
+
+class ClientHandler:
+	"""One connected web worker: its frame ring and its open classifier streams"""
+
+	def __init__(self, conn, pool: ThreadPoolExecutor, movenet, lstm):
+		self.conn = conn
+		self.pool = pool
+		self.movenet = movenet
+		self.lstm = lstm
+		self.ring = None
+		self.streams = {}
+		self._streams_lock = threading.Lock()
+		self._send_lock = threading.Lock()
+
+	def _reply(self, req_id, ok, payload):
+		try:
+			with self._send_lock:
+				self.conn.send((req_id, ok, payload))
+		except (OSError, ValueError):
+			pass
+
+	def _stream(self, stream_id):
+		with self._streams_lock:
+			state = self.streams.get(stream_id)
+			if state is None:
+				state = self.streams[stream_id] = self.lstm.new_stream()
+			return state
+
+	def _attach(self, name, shape, slots):
+		self.ring = FrameRing(name, slots, shape)
+
+	def _handle(self, kind, req_id, args):
+		try:
+			if kind == "detect":
+				result = self.movenet.detect_keypoints(self.ring.view(args[0]))
+			elif kind == "classify":
+				result = self.lstm.predict_step(self._stream(args[0]), args[1])
+			elif kind == "classify_seq":
+				result = self.lstm.predict_sequence(args[0])
+			elif kind == "classify_frames":
+				state = self._stream(args[1]) if len(args) > 1 and args[1] is not None else None
+				result = self.lstm.predict_per_frame(args[0], state, args[2] if len(args) > 2 else 0)
+			else:
+				raise ValueError(f"unknown request {kind!r}")
+		except Exception as e:
+			self._reply(req_id, False, f"{type(e).__name__}: {e}")
+			return
+		self._reply(req_id, True, result)
+
+	def serve(self):
+		try:
+			while True:
+				message = self.conn.recv()
+				kind = message[0]
+				if kind == "attach":
+					self._attach(*message[1:])
+				elif kind == "close_stream":
+					with self._streams_lock:
+						self.streams.pop(message[1], None)
+				else:
+					self.pool.submit(self._handle, kind, message[1], message[2:])
+		except (EOFError, OSError):
+			pass
+		finally:
+			self.conn.close()
+			if self.ring is not None:
+				self.ring.close()
+			print(f"[INFERENCE] Client disconnected ({len(self.streams)} streams dropped)")
+
+
+def main():
+	if not settings.inference_server_address:
+		raise SystemExit("Set INFERENCE_SERVER_ADDRESS (unix socket path or @name)")
+	try:
+		address = parse_address(settings.inference_server_address)
+	except ValueError as e:
+		raise SystemExit(str(e))
+	configure_tensorflow_threads()
+	from app.services.movenet_service import get_movenet_service
+	from app.services.lstm_service import get_lstm_classifier
+
+	print("[INFERENCE] Loading models...")
+	movenet = get_movenet_service()
+	lstm = get_lstm_classifier()
+	pool = ThreadPoolExecutor(max_workers=max(1, settings.inference_workers), thread_name_prefix="inference-server")
+
+	if settings.inference_server_authkey == type(settings).model_fields["inference_server_authkey"].default:
+		print("[INFERENCE] ⚠️ INFERENCE_SERVER_AUTHKEY is the default; set a secret shared with the workers")
+	filesystem_socket = not address.startswith(("\\\\", "\0"))
+	if filesystem_socket and os.path.exists(address):
+		os.unlink(address)  # stale socket from a previous run
+	# Only this user may connect to the socket file
+	umask = os.umask(0o177) if filesystem_socket else None
+	try:
+		listener = Listener(address, authkey=settings.inference_server_authkey.encode())
+	finally:
+		if umask is not None:
+			os.umask(umask)
+	print(f"[INFERENCE] ✅ Listening on {settings.inference_server_address}")
+	try:
+		while True:
+			try:
+				conn = listener.accept()
+			except Exception as e:
+				print(f"[INFERENCE] Rejected connection: {e}")
+				continue
+			handler = ClientHandler(conn, pool, movenet, lstm)
+			threading.Thread(target=handler.serve, name="inference-client", daemon=True).start()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		listener.close()
+		pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,9 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 import cv2
 import base64
 import numpy as np
 from pydantic_settings import BaseSettings
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .database import Base, engine
 from sqlalchemy import text
 
@@ -11,6 +13,8 @@ from sqlalchemy import text
 from .routers import auth_router, patients_router  # Add other routers as needed
 from .routers import classification_router, realtime_router
 from .routers import database_router
+from .routers import analytics_router
+from .routers import export_router
 
 app = FastAPI(title="Rehab AI Backend", version="1.0.0")
 
@@ -29,6 +33,7 @@ app.add_middleware(
 	allow_credentials=True,
 	allow_methods=["*"],            # Allow all HTTP methods
 	allow_headers=["*"],            # Allow all headers
+	expose_headers=["X-Next-Cursor"],  # Keyset pagination cursor for list endpoints
 )
 
 # Include your routers with proper API prefixes
@@ -37,6 +42,8 @@ app.include_router(patients_router.router, prefix="/api", tags=["patients"])
 app.include_router(classification_router.router)
 app.include_router(realtime_router.router)
 app.include_router(database_router.router, prefix="/api", tags=["database"])
+app.include_router(analytics_router.router, prefix="/api", tags=["analytics"])
+app.include_router(export_router.router, prefix="/api", tags=["export"])
 
 # Add other routers as needed (uncomment when you have them):
 # from .routers import doctor_router, profile_router
@@ -53,6 +60,27 @@ def health_check():
 	return {"status": "healthy", "message": "Backend is operational"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+	"""Prometheus scrape endpoint for the inference pipeline."""
+	from .services.metrics import CONTENT_TYPE, render_latest
+	return PlainTextResponse(render_latest(), media_type=CONTENT_TYPE)
+
+
+def _backfill_rollups():
+    """Build analytics rollups once for databases that predate them"""
+    from .database import SessionLocal
+    from .models import ExerciseResult, SessionRollup
+    from .services.rollups import rebuild_rollups
+    db = SessionLocal()
+    try:
+        if db.query(SessionRollup.session_id).first() is None and db.query(ExerciseResult.id).first() is not None:
+            sessions, days = rebuild_rollups(db)
+            print(f"[Startup] ✅ Backfilled rollups for {sessions} sessions ({days} patient-days).")
+    finally:
+        db.close()
+
+
 @app.on_event("startup")
 def startup_create_tables():
     print("[Startup] Initializing database and creating tables...")
@@ -61,6 +89,10 @@ def startup_create_tables():
         from . import models  # noqa: F401
         Base.metadata.create_all(bind=engine)
         print("[Startup] ✅ Database tables ensured.")
+        from .migrations import run_migrations
+        for version in run_migrations(engine):
+            print(f"[Startup] ✅ Applied migration {version}")
+        _backfill_rollups()
     except Exception as e:
         print(f"[Startup] ❌ Failed to create tables: {e}")
 
@@ -68,14 +100,80 @@ def startup_create_tables():
 async def startup_load_models():
 	print("[Startup] Initializing models...")
 	try:
-		from .services.lstm_service import LSTMClassifier
+		from .services.model_provider import get_classifier
 		print("[Startup] Creating LSTMClassifier instance...")
-		app.state.lstm = LSTMClassifier()
+		app.state.lstm = get_classifier()
 		print("[Startup] ✅ LSTMClassifier initialized.")
 	except Exception as e:
 		print(f"[Startup] ❌ Failed to initialize LSTMClassifier: {e}")
 
 
+@app.on_event("startup")
+async def startup_loop_lag_monitor():
+	from .config import settings
+	from .services.inference_executor import monitor_event_loop_lag
+	app.state.loop_lag_task = asyncio.create_task(
+		monitor_event_loop_lag(settings.loop_lag_interval_ms / 1000.0)
+	)
+
+
+@app.on_event("startup")
+async def startup_retention_job():
+	from .config import settings
+	if settings.retention_results_days <= 0:
+		return
+	from .services.retention import run_retention
+
+	# Every uvicorn worker runs this loop; compact() claims each chunk with its
+	# DELETE, so overlapping passes never archive the same rows twice
+	async def loop():
+		while True:
+			try:
+				await asyncio.to_thread(run_retention, should_stop=lambda: app.state.retention_stopping)
+			except Exception as e:
+				print(f"[RETENTION] ❌ Compaction failed: {e}")
+			await asyncio.sleep(settings.retention_interval_s)
+
+	app.state.retention_stopping = False
+	app.state.retention_task = asyncio.create_task(loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_retention_job():
+	task = getattr(app.state, "retention_task", None)
+	if task is not None:
+		app.state.retention_stopping = True
+		task.cancel()
+
+
+@app.on_event("shutdown")
+async def shutdown_inference_executor():
+	task = getattr(app.state, "loop_lag_task", None)
+	if task is not None:
+		task.cancel()
+	from .services.inference_executor import get_inference_executor
+	get_inference_executor().shutdown()
+
+
+@app.on_event("startup")
+def startup_realtime_writer():
+	from .services.realtime_writer import get_realtime_writer
+	get_realtime_writer().start()
+
+
+@app.on_event("shutdown")
+def shutdown_realtime_writer():
+	from .services.realtime_writer import get_realtime_writer
+	print("[Shutdown] Flushing realtime predictions...")
+	get_realtime_writer().stop()
+
+
+@app.on_event("shutdown")
+async def shutdown_async_engine():
+	from .database import async_engine
+	await async_engine.dispose()
+
+
 @app.post("/api/test/user")
 def create_test_user():
 	"""Create a test user to verify database connectivity."""
@@ -0,0 +1,58 @@
+"""Versioned schema migrations applied at startup after ``create_all``.
+
+``create_all`` only creates missing tables, so changes to existing tables
+(indexes, columns) are listed here. Each migration runs once, in order, and
+is recorded in ``schema_migrations``; statements should be idempotent so a
+fresh database (where the models already declare the change) is a no-op.
+
+Statements may use ``:now``, bound to the current UTC time by SQLAlchemy so
+it is stored in the same format as ORM-written datetimes (SQLite's
+CURRENT_TIMESTAMP has no fractional seconds and would compare as an earlier
+string than an equal bound value).
+"""
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+MIGRATIONS: List[Tuple[str, List[str]]] = [
+	("0001_composite_indexes", [
+		"CREATE INDEX IF NOT EXISTS ix_sessions_patient_started ON sessions (patient_id, started_at)",
+		"CREATE INDEX IF NOT EXISTS ix_exercise_results_session_label "
+		"ON exercise_results (session_id, predicted_label, confidence, timestamp)",
+		# Superseded by the composite index above (same leading column)
+		"DROP INDEX IF EXISTS ix_exercise_results_session_id",
+		"ANALYZE",
+	]),
+	# Keyset pagination orders sessions by (started_at, id), so started_at
+	# must never be NULL; the model declares NOT NULL for new databases
+	("0002_backfill_session_started_at", [
+		"UPDATE sessions SET started_at = COALESCE("
+		"(SELECT MIN(r.timestamp) FROM exercise_results r WHERE r.session_id = sessions.id), "
+		"completed_at, :now) WHERE started_at IS NULL",
+	]),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+	"""Apply pending migrations; returns the versions applied."""
+	applied: List[str] = []
+	with engine.begin() as conn:
+		conn.execute(text(
+			"CREATE TABLE IF NOT EXISTS schema_migrations (version VARCHAR PRIMARY KEY, applied_at TIMESTAMP)"
+		))
+		done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+	for version, statements in MIGRATIONS:
+		if version in done:
+			continue
+		now = datetime.utcnow()
+		with engine.begin() as conn:
+			for statement in statements:
+				conn.execute(text(statement), {"now": now})
+			conn.execute(
+				text("INSERT INTO schema_migrations (version, applied_at) VALUES (:v, :t)"),
+				{"v": version, "t": now},
+			)
+		applied.append(version)
+	return applied
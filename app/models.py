@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Float, Enum, JSON, Column
+from sqlalchemy import Integer, String, Date, DateTime, ForeignKey, Float, Enum, JSON, Column, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -27,12 +27,16 @@ class User(Base):
 
 class Session(Base):
 	__tablename__ = "sessions"
+	__table_args__ = (
+		# Patient session lists, newest first (see app/migrations.py)
+		Index("ix_sessions_patient_started", "patient_id", "started_at"),
+	)
 
 	id = Column(Integer, primary_key=True, index=True)
 	patient_id = Column(Integer, ForeignKey("users.id"), index=True)
 	exercise_name = Column(String, index=True)
 	video_path = Column(String, nullable=False)
-	started_at = Column(DateTime, default=datetime.utcnow)
+	started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 	completed_at = Column(DateTime, nullable=True)
 	# Added fields
 	duration_seconds = Column(Integer, default=0)
@@ -47,9 +51,13 @@ class Session(Base):
 
 class ExerciseResult(Base):
 	__tablename__ = "exercise_results"
+	__table_args__ = (
+		# Per-session label scans; covers the rollup aggregates (see app/migrations.py)
+		Index("ix_exercise_results_session_label", "session_id", "predicted_label", "confidence", "timestamp"),
+	)
 
 	id = Column(Integer, primary_key=True, index=True)
-	session_id = Column(Integer, ForeignKey("sessions.id"), index=True)
+	session_id = Column(Integer, ForeignKey("sessions.id"))
 	frame_index = Column(Integer)
 	predicted_label = Column(String, index=True)
 	confidence = Column(Float)
@@ -60,3 +68,59 @@ class ExerciseResult(Base):
 
 	session = relationship("Session", back_populates="results")
 
+
+
+# Per-frame results older than the retention age, compacted by
+# app/services/retention.py into one compressed blob per chunk of rows
+class ExerciseResultArchive(Base):
+	__tablename__ = "exercise_result_archives"
+
+	id = Column(Integer, primary_key=True)
+	session_id = Column(Integer, ForeignKey("sessions.id"), index=True, nullable=False)
+	frame_count = Column(Integer, nullable=False)
+	first_timestamp = Column(DateTime, nullable=True)
+	last_timestamp = Column(DateTime, nullable=True)
+	data = Column(LargeBinary, nullable=False)
+	created_at = Column(DateTime, default=datetime.utcnow)
+
+
+
+# Rollups maintained incrementally alongside exercise_results (see
+# app/services/rollups.py) so analytics reads O(sessions) rows, not O(frames)
+class SessionRollup(Base):
+	__tablename__ = "session_rollups"
+
+	session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
+	patient_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=True)
+	frame_count = Column(Integer, default=0, nullable=False)
+	confidence_sum = Column(Float, default=0.0, nullable=False)
+	label_counts = Column(JSON, default=dict)
+	form_score = Column(Float, nullable=True)
+	last_active = Column(DateTime, nullable=True)
+
+	@property
+	def mean_confidence(self):
+		return self.confidence_sum / self.frame_count if self.frame_count else None
+
+
+
+class PatientDailyRollup(Base):
+	__tablename__ = "patient_daily_rollups"
+
+	patient_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+	day = Column(Date, primary_key=True)
+	session_count = Column(Integer, default=0, nullable=False)
+	frame_count = Column(Integer, default=0, nullable=False)
+	confidence_sum = Column(Float, default=0.0, nullable=False)
+	label_counts = Column(JSON, default=dict)
+	form_score_sum = Column(Float, default=0.0, nullable=False)
+	form_score_count = Column(Integer, default=0, nullable=False)
+	last_active = Column(DateTime, nullable=True)
+
+	@property
+	def mean_confidence(self):
+		return self.confidence_sum / self.frame_count if self.frame_count else None
+
+	@property
+	def form_score(self):
+		return self.form_score_sum / self.form_score_count if self.form_score_count else None
@@ -1,31 +1,128 @@
 import os
 import numpy as np
 from typing import List, Dict, Optional
-from collections import Counter
-from datetime import datetime
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import require_role
-from app.database import get_db
-from app.models import UserRole, Session as DbSession, ExerciseResult
-from app.schemas import ProgressSummary
+from app.database import AsyncSessionLocal
+from app.models import UserRole, Session as DbSession, ExerciseResult, PatientDailyRollup, SessionRollup
+from app.schemas import ProgressSummary, ProgressTimeseries
+from app.services.response_cache import get_response_cache
+from app.services.rollups import as_date
+from app.services.timeseries import DayStats, build_series
 
 router = APIRouter(prefix="/analytics", tags=["analytics"]) 
 
 
 @router.get("/patient/{patient_id}", response_model=ProgressSummary)
-async def patient_progress(patient_id: int, db: Session = Depends(get_db), user=Depends(require_role(UserRole.doctor))):
-	sessions = db.query(DbSession).filter(DbSession.patient_id == patient_id).all()
-	session_ids = [s.id for s in sessions]
-	results = db.query(ExerciseResult).filter(ExerciseResult.session_id.in_(session_ids)).all() if session_ids else []
-	label_counts = Counter(r.predicted_label for r in results)
-	last_active = max((r.timestamp for r in results), default=None)
+async def patient_progress(patient_id: int, user=Depends(require_role(UserRole.doctor))):
+	# Dashboards poll this; serve from the response cache until the patient's data changes
+	return await get_response_cache().get_or_compute("analytics", patient_id, lambda: _patient_progress(patient_id))
+
+
+async def _patient_progress(patient_id: int) -> ProgressSummary:
+	async with AsyncSessionLocal() as db:
+		return await compute_patient_progress(db, patient_id)
+
+
+async def compute_patient_progress(db: AsyncSession, patient_id: int) -> ProgressSummary:
+	# One rollup row per session: never touch per-frame rows (or their keypoint JSON)
+	total_sessions = (await db.execute(
+		select(func.count(DbSession.id)).where(DbSession.patient_id == patient_id)
+	)).scalar_one()
+	rollups = (await db.execute(
+		select(SessionRollup.label_counts, SessionRollup.last_active)
+		.join(DbSession, SessionRollup.session_id == DbSession.id)
+		.where(DbSession.patient_id == patient_id)
+	)).all()
+	label_counts: Dict[str, int] = {}
+	for labels, _ in rollups:
+		for label, count in (labels or {}).items():
+			label_counts[label] = label_counts.get(label, 0) + count
+	last_active = max((ts for _, ts in rollups if ts is not None), default=None)
 	return ProgressSummary(
 		patient_id=patient_id,
-		total_sessions=len(sessions),
-		total_frames=len(results),
-		label_distribution=dict(label_counts),
+		total_sessions=total_sessions,
+		total_frames=sum(label_counts.values()),
+		label_distribution=label_counts,
 		last_active=last_active,
 	)
 
+
+@router.get("/patient/{patient_id}/timeseries", response_model=ProgressTimeseries)
+async def patient_timeseries(
+	patient_id: int,
+	bucket: str = Query("day", pattern="^(day|week|month)$"),
+	start: Optional[date] = None,
+	end: Optional[date] = None,
+	max_points: int = Query(200, ge=1, le=2000),
+	user=Depends(require_role(UserRole.doctor)),
+):
+	"""Per-day/week/month trend of sessions, frames, mean confidence, form score and repetitions.
+
+	Built from daily rollups and a per-day GROUP BY over sessions; when the
+	range holds more than max_points buckets, buckets are widened evenly.
+	"""
+	if start is not None and end is not None and start > end:
+		raise HTTPException(status_code=400, detail="start must not be after end")
+	return await get_response_cache().get_or_compute(
+		"timeseries", patient_id,
+		lambda: _patient_timeseries(patient_id, bucket, start, end, max_points),
+		variant=(bucket, start, end, max_points),
+	)
+
+
+async def _patient_timeseries(patient_id: int, bucket: str, start: Optional[date], end: Optional[date], max_points: int) -> ProgressTimeseries:
+	async with AsyncSessionLocal() as db:
+		days = await compute_daily_stats(db, patient_id, start, end)
+	return ProgressTimeseries(
+		patient_id=patient_id,
+		bucket=bucket,
+		start=start,
+		end=end,
+		points=build_series(days, bucket, start, end, max_points),
+	)
+
+
+async def compute_daily_stats(db: AsyncSession, patient_id: int, start: Optional[date], end: Optional[date]) -> Dict[date, DayStats]:
+	days: Dict[date, DayStats] = {}
+
+	# Frame-level metrics: one rollup row per active day
+	rollups = select(PatientDailyRollup.day, PatientDailyRollup.frame_count, PatientDailyRollup.confidence_sum).where(
+		PatientDailyRollup.patient_id == patient_id
+	)
+	if start is not None:
+		rollups = rollups.where(PatientDailyRollup.day >= start)
+	if end is not None:
+		rollups = rollups.where(PatientDailyRollup.day <= end)
+	for day, frames, confidence_sum in await db.execute(rollups):
+		stats = days.setdefault(day, DayStats())
+		stats.frames += frames
+		stats.confidence_sum += confidence_sum
+
+	# Session-level metrics, grouped by the day each session started
+	day_col = func.date(DbSession.started_at)
+	sessions = (
+		select(
+			day_col, func.count(DbSession.id), func.sum(DbSession.form_score),
+			func.count(DbSession.form_score), func.sum(DbSession.repetitions_count),
+		)
+		.where(DbSession.patient_id == patient_id)
+		.group_by(day_col)
+	)
+	if start is not None:
+		sessions = sessions.where(DbSession.started_at >= datetime.combine(start, datetime.min.time()))
+	if end is not None:
+		sessions = sessions.where(DbSession.started_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+	for day, count, form_sum, form_count, repetitions in await db.execute(sessions):
+		if day is None:
+			continue
+		stats = days.setdefault(as_date(day), DayStats())
+		stats.sessions += count
+		stats.form_score_sum += form_sum or 0.0
+		stats.form_score_count += form_count
+		stats.repetitions += repetitions or 0
+	return days
@@ -4,11 +4,12 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.auth import authenticate_user, create_access_token, get_password_hash, verify_password
+from app.auth import authenticate_user, create_access_token, get_password_hash, get_user_by_email_async, verify_password
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User, UserRole
 from app.schemas import UserCreate, UserRead, Token
 
@@ -75,7 +76,7 @@ async def logout():
 
 
 @router.get("/me")
-async def get_current_user_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user_me(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
 	try:
 		from jose import jwt
 		payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
@@ -83,7 +84,7 @@ async def get_current_user_me(token: str = Depends(oauth2_scheme), db: Session =
 		if not email:
 			raise HTTPException(status_code=401, detail="Invalid token")
 		
-		user = db.query(User).filter(User.email == email).first()
+		user = await get_user_by_email_async(db, email)
 		if not user:
 			raise HTTPException(status_code=404, detail="User not found")
 		
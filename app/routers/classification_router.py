@@ -1,20 +1,64 @@
 import os
-from typing import List
+import cv2
+from datetime import datetime
+from typing import Dict, List
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Session as DbSession, ExerciseResult
 from app.schemas import SessionRead, ClassificationSummary
-from app.services.movenet_service import MoveNetService
-from app.services.lstm_service import LSTMClassifier, LABELS
+from app.services.labels import LABELS
+from app.services.model_provider import get_classifier, get_movenet
+from app.services.inference_executor import BATCH, get_inference_executor
+from app.services.response_cache import invalidate_patient
+from app.services.rollups import apply_results
 
 router = APIRouter(prefix="/classify", tags=["classification"]) 
 
-movenet = MoveNetService()
-lstm = LSTMClassifier()
+# Shared with the realtime routes; video work runs at BATCH priority behind live frames
+movenet = get_movenet()
+lstm = get_classifier()
+
+
+async def _process_video_scheduled(video_path: str) -> List[List[Dict]]:
+	"""Run MoveNet over a video as background frame batches on the shared inference scheduler"""
+	executor = get_inference_executor()
+	cap = cv2.VideoCapture(video_path)
+	poses: List[List[Dict]] = []
+	frame_index = 0
+	finished = False
+	try:
+		while not finished:
+			batch, frame_index, finished = await executor.run(
+				movenet.process_video_batch, cap, settings.video_batch_frames, 1, frame_index, priority=BATCH
+			)
+			poses.extend(batch)
+	finally:
+		cap.release()
+	return poses
+
+
+async def _classify_video_scheduled(poses: List[List[Dict]]) -> List[Dict]:
+	"""Per-frame classification as BATCH jobs of video_batch_frames frames each.
+
+	Realtime frames queued meanwhile run between chunks instead of waiting
+	for the whole video; recurrent state is carried from chunk to chunk.
+	"""
+	executor = get_inference_executor()
+	chunk = max(1, settings.video_batch_frames)
+	stream = lstm.new_stream()
+	preds: List[Dict] = []
+	try:
+		for start in range(0, len(poses), chunk):
+			preds.extend(await executor.run(
+				lstm.predict_per_frame, poses[start:start + chunk], stream, start, priority=BATCH
+			))
+	finally:
+		stream.reset()
+	return preds
 
 
 @router.get("/labels")
@@ -26,7 +70,7 @@ async def get_labels():
 async def classify_video(
 	file: UploadFile = File(...),
 	exercise_name: str = Form(...),
-	db: Session = Depends(get_db),
+	db: AsyncSession = Depends(get_async_db),
 	user = Depends(get_current_user),
 ):
 	if user.role not in ("patient", "doctor"):
@@ -41,27 +85,34 @@ async def classify_video(
 	# Create session
 	session = DbSession(patient_id=user.id, exercise_name=exercise_name, video_path=video_path)
 	db.add(session)
-	db.commit()
-	db.refresh(session)
+	await db.commit()
+	await db.refresh(session)
+	invalidate_patient(user.id)
 
 	# Process video -> poses
-	poses = movenet.process_video(video_path)
+	poses = await _process_video_scheduled(video_path)
 
 	# Classify per frame
-	preds = lstm.predict_per_frame(poses)
+	preds = await _classify_video_scheduled(poses)
 
-	# Store results
-	for p in preds:
-		res = ExerciseResult(
+	# Store results, with their rollups in the same transaction
+	now = datetime.utcnow()
+	db.add_all([
+		ExerciseResult(
 			session_id=session.id,
 			frame_index=p["frame_index"],
 			predicted_label=p["label"],
 			confidence=p["confidence"],
 			pose_keypoints=poses[p["frame_index"]],
+			timestamp=now,
 			exercise_name=exercise_name,
 		)
-		db.add(res)
-	db.commit()
+		for p in preds
+	])
+	rows = [(p["label"], p["confidence"], now) for p in preds]
+	await db.run_sync(apply_results, session.id, user.id, rows, session.form_score)
+	await db.commit()
+	invalidate_patient(user.id)
 
 	# Summary
 	counts = {label: 0 for label in LABELS}
@@ -91,8 +142,8 @@ async def classify_video_detect(
 			f.write(await file.read())
 
 		# Process video and predict overall exercise
-		poses = movenet.process_video(video_path)
-		label, confidence, _ = lstm.predict_sequence(poses)
+		poses = await _process_video_scheduled(video_path)
+		label, confidence, _ = await get_inference_executor().run(lstm.predict_sequence, poses, priority=BATCH)
 
 		# Keep API label exactly as produced by model; message is human-friendly
 		message = f"Detected exercise: {label.replace('_', ' ').title()}"
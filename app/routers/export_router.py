@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+
+from app.auth import require_role
+from app.database import AsyncSessionLocal
+from app.models import UserRole
+from app.services.export import MEDIA_TYPES, ExportFilters, check_format, iter_export_async
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+@router.get("/{kind}")
+async def export_data(
+	kind: str = Path(..., pattern="^(sessions|results)$"),
+	format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+	patient_id: Optional[int] = None,
+	exercise: Optional[str] = None,
+	start: Optional[date] = None,
+	end: Optional[date] = None,
+	user=Depends(require_role(UserRole.doctor)),
+):
+	"""Stream every matching session or per-frame result as NDJSON, CSV or Parquet.
+
+	Rows are read and encoded in fixed-size chunks, so exports of any size
+	use constant memory; archived (compacted) results are included.
+	"""
+	if start is not None and end is not None and start > end:
+		raise HTTPException(status_code=400, detail="start must not be after end")
+	try:
+		check_format(format)
+	except ValueError as e:
+		raise HTTPException(status_code=501, detail=str(e))
+	filters = ExportFilters(patient_id, exercise, start, end)
+
+	async def body():
+		async with AsyncSessionLocal() as db:
+			async for data in iter_export_async(db, kind, format, filters):
+				yield data
+
+	return StreamingResponse(
+		body(),
+		media_type=MEDIA_TYPES[format],
+		headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+	)
@@ -1,14 +1,19 @@
 import os
 import numpy as np
-from typing import List, Dict, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.auth import require_role
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_async_db
 from app.models import User, UserRole, Session as DbSession
 from app.schemas import UserRead, SessionRead
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.services.response_cache import get_response_cache
 
 router = APIRouter(prefix="/patients", tags=["patients"]) 
 
@@ -215,19 +220,98 @@ async def create_assignment(patient_id: str, req: CreateAssignmentRequest, user=
     return item
 
 @router.get("/", response_model=List[UserRead])
-async def list_patients(db: Session = Depends(get_db), user=Depends(require_role(UserRole.doctor))):
-	return db.query(User).filter(User.role == UserRole.patient).all()
+async def list_patients(
+	response: Response,
+	limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+	cursor: Optional[str] = None,
+	format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+	db: AsyncSession = Depends(get_async_db),
+	user=Depends(require_role(UserRole.doctor)),
+):
+	"""Patients by id, one keyset page at a time; the next page's cursor is in X-Next-Cursor.
+
+	format=ndjson streams every remaining patient instead (limit is ignored).
+	"""
+	try:
+		after = decode_cursor("patients", cursor, (int,))
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	query = select(User).where(User.role == UserRole.patient).order_by(User.id)
+	if after is not None:
+		query = query.where(User.id > after[0])
+	if format == "ndjson":
+		return _ndjson_response(query, UserRead)
+	patients = (await db.execute(query.limit(limit + 1))).scalars().all()
+	if len(patients) > limit:
+		patients = patients[:limit]
+		response.headers[NEXT_CURSOR_HEADER] = encode_cursor("patients", [patients[-1].id])
+	return patients
 
 
 @router.get("/{patient_id}", response_model=UserRead)
-async def get_patient(patient_id: int, db: Session = Depends(get_db), user=Depends(require_role(UserRole.doctor))):
-	pat = db.query(User).filter(User.id == patient_id, User.role == UserRole.patient).first()
+async def get_patient(patient_id: int, db: AsyncSession = Depends(get_async_db), user=Depends(require_role(UserRole.doctor))):
+	pat = (await db.execute(select(User).where(User.id == patient_id, User.role == UserRole.patient).limit(1))).scalars().first()
 	if not pat:
 		raise HTTPException(status_code=404, detail="Patient not found")
 	return pat
 
 
 @router.get("/{patient_id}/sessions", response_model=List[SessionRead])
-async def list_patient_sessions(patient_id: int, db: Session = Depends(get_db), user=Depends(require_role(UserRole.doctor))):
-	sessions = db.query(DbSession).filter(DbSession.patient_id == patient_id).order_by(DbSession.started_at.desc()).all()
-	return sessions
\ No newline at end of file
+async def list_patient_sessions(
+	patient_id: int,
+	response: Response,
+	limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+	cursor: Optional[str] = None,
+	format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+	user=Depends(require_role(UserRole.doctor)),
+):
+	"""Sessions newest first, keyset-paginated on (started_at, id); see list_patients."""
+	try:
+		after = decode_cursor(f"sessions:{patient_id}", cursor, (datetime, int))
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	query = _patient_sessions_query(patient_id, after)
+	if format == "ndjson":
+		return _ndjson_response(query, SessionRead)
+	sessions, next_cursor = await get_response_cache().get_or_compute(
+		"sessions", patient_id, lambda: _patient_sessions_page(patient_id, query, limit), variant=(cursor, limit)
+	)
+	if next_cursor:
+		response.headers[NEXT_CURSOR_HEADER] = next_cursor
+	return sessions
+
+
+def _patient_sessions_query(patient_id: int, after: Optional[List]):
+	query = (
+		select(DbSession)
+		.where(DbSession.patient_id == patient_id)
+		.order_by(DbSession.started_at.desc(), DbSession.id.desc())
+	)
+	if after is not None:
+		started_at, session_id = after
+		query = query.where(or_(
+			DbSession.started_at < started_at,
+			and_(DbSession.started_at == started_at, DbSession.id < session_id),
+		))
+	return query
+
+
+async def _patient_sessions_page(patient_id: int, query, limit: int) -> Tuple[List[SessionRead], Optional[str]]:
+	async with AsyncSessionLocal() as db:
+		sessions = (await db.execute(query.limit(limit + 1))).scalars().all()
+	next_cursor = None
+	if len(sessions) > limit:
+		sessions = sessions[:limit]
+		last = sessions[-1]
+		next_cursor = encode_cursor(f"sessions:{patient_id}", [last.started_at, last.id])
+	return [SessionRead.model_validate(s) for s in sessions], next_cursor
+
+
+def _ndjson_response(query, schema) -> StreamingResponse:
+	"""Stream rows as NDJSON from a server-side cursor, without materialising the list"""
+	async def rows():
+		async with AsyncSessionLocal() as db:
+			result = await db.stream(query.execution_options(yield_per=200))
+			async for row in result.scalars():
+				yield schema.model_validate(row).model_dump_json() + "\n"
+	return StreamingResponse(rows(), media_type="application/x-ndjson")
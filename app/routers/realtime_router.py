@@ -1,45 +1,69 @@
 import base64
 import json
+import logging
 import os
+import time
 import numpy as np
 import cv2
 from typing import Any, List, Dict, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from PIL import Image
 from io import BytesIO
 
-from app.auth import get_current_user
-from app.services.movenet_service import MoveNetService
-from app.services.lstm_service import LSTMClassifier
+from app.auth import get_current_user, get_user_from_token, require_role
+from app.config import settings
+from app.database import SessionLocal
+from app.models import UserRole
+from app.services.database_service import get_database_service
+from app.services.labels import LABELS
+from app.services.model_provider import get_classifier, get_movenet
+from app.services.keypoint_tracker import KeypointTracker
+from app.services.frame_decoder import decode_frame
+from app.services.metrics import FRAMES_IN, FRAMES_OUT, STAGE_SECONDS, WS_CONNECTIONS, time_stage
+from app.services.inference_executor import get_inference_executor
+from app.services.capture_advisor import CaptureAdvisor
+from app.services.keypoint_codec import KeypointEncoder, unpack_keypoints
+from app.services.frame_dedup import FrameDeduplicator
+from app.services.latency_stats import client_seq, finite_number, get_connection_registry
+from app.services.rate_limiter import connection_limiter, get_admission_controller
 
 router = APIRouter(prefix="/realtime", tags=["realtime"]) 
+logger = logging.getLogger(__name__)
 
-movenet = MoveNetService()
-lstm = LSTMClassifier()
+movenet = get_movenet()
+lstm = get_classifier()
 
-def preprocess_image(image_data: str):
-    """Convert base64 image to tensor for MoveNet - improved from Flask code"""
+def preprocess_image(image_data: str, out: Optional[np.ndarray] = None):
+    """Convert base64 image to a 256x256 frame for MoveNet - improved from Flask code
+
+    JPEGs are decoded at a reduced DCT scale; pass `out` to reuse a
+    preallocated (256, 256, 3) uint8 buffer across frames.
+    """
     try:
-        # Handle base64 data URL format
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        image = np.array(image)
-        
-        # Convert BGR to RGB if needed
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Resize to 256x256 for MoveNet Thunder
-        image = cv2.resize(image, (256, 256))
-        
-        return image
+        image_bytes = _b64_to_bytes(image_data)
     except Exception as e:
-        print(f"[REALTIME] Image preprocessing error: {e}")
+        logger.warning("[REALTIME] Image preprocessing error: %s", e)
+        return None
+    return _decode_image(image_bytes, out)
+
+def _b64_to_bytes(image_data: str) -> bytes:
+    # Handle base64 data URL format
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    
+    # Decode base64
+    with time_stage("b64_decode"):
+        return base64.b64decode(image_data)
+
+def _decode_image(image_bytes: bytes, out: Optional[np.ndarray] = None):
+    try:
+        # Decode at the nearest DCT scale >= 256x256, then resize for MoveNet Thunder
+        with time_stage("image_decode"):
+            return decode_frame(image_bytes, (256, 256), out=out)
+    except Exception as e:
+        logger.warning("[REALTIME] Image preprocessing error: %s", e)
         return None
 
 def keypoints_to_dict(keypoints: np.ndarray) -> List[Dict]:
@@ -47,6 +71,17 @@ def keypoints_to_dict(keypoints: np.ndarray) -> List[Dict]:
     if keypoints is None or len(keypoints) == 0:
         return []
     
+    # MoveNetService already returns {x, y, score} dicts
+    if isinstance(keypoints[0], dict):
+        return [
+            {
+                'x': float(kp.get('x', 0.0)),
+                'y': float(kp.get('y', 0.0)),
+                'score': float(kp.get('score', 0.0))
+            }
+            for kp in keypoints
+        ]
+    
     return [
         {
             'x': float(kp[1]),  # MoveNet returns [y, x, score]
@@ -56,42 +91,193 @@ def keypoints_to_dict(keypoints: np.ndarray) -> List[Dict]:
         for kp in keypoints
     ]
 
+def _resolve_patient_id(token: Optional[str]) -> Optional[int]:
+    """Look up the connecting user from an optional `?token=` query parameter.
+
+    No token means an anonymous stream; a token that is invalid or expired raises ValueError.
+    """
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+    finally:
+        db.close()
+    if user is None:
+        raise ValueError("invalid or expired token")
+    return user.id
+
+def _infer_frame(
+    image_data: str,
+    frame_buffer: Optional[np.ndarray],
+    tracker: Optional[KeypointTracker],
+    stream,
+    dedup: Optional[FrameDeduplicator] = None,
+):
+    """Decode, detect and classify one frame. CPU-bound: runs on the inference executor.
+
+    Returns None for undecodable images, else (frame_shape, poses, keyframe, prediction, cached)
+    where prediction is (label, confidence, probabilities) or None, and cached is True when
+    the frame was effectively unchanged and the previous result was reused.
+    """
+    try:
+        image_bytes = _b64_to_bytes(image_data)
+    except Exception as e:
+        logger.warning("[REALTIME] Image preprocessing error: %s", e)
+        return None
+    
+    dedup_key = None
+    if dedup is not None:
+        with time_stage("dedup"):
+            cached, dedup_key = dedup.lookup(image_bytes)
+        if cached is not None:
+            return (*cached, True)
+    
+    frame = _decode_image(image_bytes, out=frame_buffer)
+    if frame is None:
+        return None
+    
+    # Get keypoints from MoveNet (or propagate them between keyframes)
+    if tracker is not None:
+        start = time.perf_counter()
+        poses, keyframe = tracker.process(frame)
+        if not keyframe:
+            # Keyframes are timed as "movenet" by the tracker's detector
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="tracking")
+    else:
+        poses, keyframe = _detect_keypoints(frame), True
+    
+    result = (frame.shape, poses, keyframe, _classify(poses, stream))
+    if dedup is not None:
+        dedup.store(dedup_key, result)
+    return (*result, False)
+
+def _detect_keypoints(frame: np.ndarray) -> List[Dict]:
+    with time_stage("movenet"):
+        return movenet.detect_keypoints(frame)
+
+def _classify(poses: List[Dict], stream):
+    """Classify one frame of keypoints; None unless all 17 keypoints are present"""
+    if len(poses) != 17:
+        return None
+    with time_stage("classifier"):
+        if stream is None:
+            return lstm.predict_sequence([poses])
+        # One incremental step for recurrent models
+        return lstm.predict_step(stream, poses)
+
+def _json_response(frame_shape, poses: List[Dict], keyframe: bool, prediction, log_frame: bool = False) -> Dict:
+    """Build the JSON realtime response (the default, uncompressed encoding)"""
+    response: Dict[str, Any] = {}
+    if frame_shape is None:
+        response["mode"] = "keypoints"
+    else:
+        # Send keypoints for skeleton visualization
+        response.update({
+            "keypoints": keypoints_to_dict(poses),
+            "frame_shape": [frame_shape[1], frame_shape[0]],  # [width, height]
+            "keyframe": keyframe,
+        })
+    
+    # Add LSTM prediction (one incremental step for recurrent models)
+    if prediction is not None:
+        label, conf, dist = prediction
+        if log_frame:
+            logger.debug("[REALTIME] LSTM Prediction: %s (confidence: %.3f)", label, conf)
+        response.update({
+            "label": label, 
+            "confidence": conf,
+            "prediction_available": True,
+            "all_probabilities": dist
+        })
+    else:
+        if log_frame:
+            logger.debug("[REALTIME] Not enough keypoints for prediction: %d/17", len(poses))
+        response.update({
+            "prediction_available": False,
+            "frames_needed": 0
+        })
+    return response
+
+async def _receive_raw(websocket: WebSocket):
+    """Receive one WebSocket message as str (JSON text) or bytes (packed keypoints)"""
+    raw = await websocket.receive()
+    if raw["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(raw.get("code", 1000))
+    if raw.get("bytes") is not None:
+        return raw["bytes"]
+    return raw["text"]
+
+def _parse_message(data) -> Dict:
+    """Parse a frame message: JSON text, or binary packed float32 keypoints"""
+    if isinstance(data, bytes):
+        return {"keypoints": data}
+    message = json.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("message must be a JSON object")
+    return message
+
 class ImageRequest(BaseModel):
-    image: str
+    # Either a base64 image, or client-side keypoints (17 rows of [y, x, score])
+    image: Optional[str] = None
+    keypoints: Optional[List[List[float]]] = None
 
 @router.get("/test")
 async def test_realtime():
 	return {"status": "realtime service is working", "movenet": "loaded", "lstm": "loaded"}
 
+@router.get("/admin/latency")
+async def realtime_latency(user=Depends(require_role(UserRole.doctor))):
+	"""Rolling p50/p95/p99 latency components for every open realtime connection"""
+	return {"connections": [stats.summary() for stats in get_connection_registry().all()]}
+
+
+@router.get("/admin/latency/{connection_id}")
+async def realtime_connection_latency(connection_id: int, user=Depends(require_role(UserRole.doctor))):
+	stats = get_connection_registry().get(connection_id)
+	if stats is None:
+		raise HTTPException(status_code=404, detail="Connection not found")
+	return stats.summary()
+
 @router.post("/detect-pose")
 async def detect_pose(request: ImageRequest):
     """Process single frame and return pose detection - from Flask code"""
     try:
         image_data = request.image
         
+        if request.keypoints is not None:
+            # Keypoints-only mode: the browser ran MoveNet, only classify here
+            FRAMES_IN.inc(transport="http")
+            try:
+                poses = unpack_keypoints(request.keypoints)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            label, conf, dist = await get_inference_executor().run(_classify, poses, None)
+            FRAMES_OUT.inc(transport="http")
+            return {"pose": label, "confidence": float(conf), "all_probabilities": dist}
+        
         if not image_data:
             raise HTTPException(status_code=400, detail="No image provided")
         
-        # Process image using improved preprocessing
-        frame = preprocess_image(image_data)
-        if frame is None:
+        FRAMES_IN.inc(transport="http")
+        # Decode, detect and classify off the event loop
+        inferred = await get_inference_executor().run(_infer_frame, image_data, None, None, None)
+        if inferred is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
-        
-        # Detect keypoints
-        poses = movenet.detect_keypoints(frame)
+        frame_shape, poses, _, prediction, _ = inferred
         
         # Convert keypoints to dict format
         keypoints_dict = keypoints_to_dict(poses)
         
         # Classify pose
-        if len(poses) == 17:
-            label, conf, dist = lstm.predict_sequence([poses])
+        if prediction is not None:
+            label, conf, dist = prediction
             result = {
                 "pose": label,
                 "confidence": float(conf),
                 "all_probabilities": dist,
                 "keypoints": keypoints_dict,
-                "frame_shape": [frame.shape[1], frame.shape[0]]
+                "frame_shape": [frame_shape[1], frame_shape[0]]
             }
         else:
             result = {
@@ -99,72 +285,229 @@ async def detect_pose(request: ImageRequest):
                 "confidence": 0.0,
                 "all_probabilities": [0.2, 0.2, 0.2, 0.2, 0.2],
                 "keypoints": keypoints_dict,
-                "frame_shape": [frame.shape[1], frame.shape[0]]
+                "frame_shape": [frame_shape[1], frame_shape[0]]
             }
         
+        FRAMES_OUT.inc(transport="http")
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[REALTIME] Error in detect-pose: {str(e)}")
+        logger.error("[REALTIME] Error in detect-pose: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.websocket("/ws")
 async def ws_realtime(websocket: WebSocket):
 	await websocket.accept()
-	print("[REALTIME] WebSocket connection established!")
-	poses_buffer = []
+	logger.info("[REALTIME] WebSocket connection established")
+	try:
+		patient_id = await run_in_threadpool(_resolve_patient_id, websocket.query_params.get("token"))
+	except ValueError as e:
+		await websocket.send_json({"error": str(e)})
+		await websocket.close(code=1008)  # Policy Violation
+		return
+	exercise_name = websocket.query_params.get("exercise_name", "realtime")
+	# Global cap on concurrent streams: wait for a slot, or reject cleanly
+	admission = get_admission_controller()
+	if admission.would_queue():
+		await websocket.send_json({"type": "queued", "waiting": admission.waiting + 1})
+	if not await admission.acquire():
+		await websocket.send_json({"error": "server busy", "retry_after_ms": int(admission.wait_timeout * 1000)})
+		await websocket.close(code=1013)  # Try Again Later
+		return
+	# Everything after acquire() runs inside the try, so the slot (and any
+	# resources already set up) are released even if setup itself fails
+	frame_buffer = db_session = stream = tracker = dedup = stats = None
+	db_service = get_database_service()
+	WS_CONNECTIONS.inc()
 	try:
+		limiter = connection_limiter()
+		last_limit_notice = 0.0
+		# Per-frame debug output is sampled so logging does not add per-frame latency
+		sample_every = max(1, settings.realtime_log_sample_every)
+		frame_count = 0
+		# Decode target reused for every frame of this connection (a shared-memory
+		# slot the inference server reads in place, when one is configured)
+		frame_buffer = movenet.lease_frame_buffer()
+		executor = get_inference_executor()
+		# Session row and per-frame results are persisted by the write-behind queue
+		# (enqueued off the event loop: the put blocks while the queue is full)
+		db_session = await run_in_threadpool(db_service.open_realtime_session, patient_id, exercise_name)
+		# Recurrent state lives with the connection: one step per frame, constant memory
+		stream = lstm.new_stream()
+		# Keyframe mode: MoveNet on every k-th frame, optical flow in between
+		if settings.realtime_keyframe_interval > 1:
+			tracker = KeypointTracker(
+				_detect_keypoints,
+				keyframe_interval=settings.realtime_keyframe_interval,
+				min_quality=settings.realtime_min_track_quality,
+			)
+		# Near-identical frames (stationary patient) reuse the previous result
+		if settings.realtime_dedup_enabled:
+			dedup = FrameDeduplicator(
+				max_distance=settings.realtime_dedup_max_distance,
+				max_reuse=settings.realtime_dedup_max_reuse,
+			)
+		# Capture advice is only sent once the client opts in over the control channel
+		advisor: Optional[CaptureAdvisor] = None
+		# Compact binary responses, also opt-in over the control channel
+		encoder: Optional[KeypointEncoder] = None
+		# Rolling latency statistics, queryable via /realtime/admin/latency
+		stats = get_connection_registry().open(patient_id, exercise_name)
 		while True:
-			message = await websocket.receive_json()
-			print(f"[REALTIME] Received message: {list(message.keys())}")
-			image_data = message.get("image_b64")
-			if not image_data:
-				await websocket.send_json({"error": "missing image_b64"})
+			data = await _receive_raw(websocket)
+			limit = limiter.check(len(data))
+			if limit is not None:
+				# Drop the frame; tell the client at most once per second
+				now = time.monotonic()
+				if now - last_limit_notice >= 1.0:
+					last_limit_notice = now
+					await websocket.send_json({
+						"type": "rate_limited",
+						"limit": limit,
+						"retry_after_ms": int(limiter.retry_after(limit, len(data)) * 1000),
+					})
 				continue
-
-			# Use improved preprocessing from Flask code
-			frame = preprocess_image(image_data)
-			if frame is None:
-				await websocket.send_json({"error": "invalid image data"})
+			try:
+				message = _parse_message(data)
+			except ValueError:
+				await websocket.send_json({"error": "invalid message"})
+				continue
+			frame_count += 1
+			log_frame = frame_count % sample_every == 0 and logger.isEnabledFor(logging.DEBUG)
+			if log_frame:
+				logger.debug("[REALTIME] Received message: %s", list(message.keys()))
+			received_at = time.perf_counter()
+			t_server_recv = time.time() * 1000.0
+			
+			# Control channel: {"type": "control", "capture_advice": true}
+			if message.get("type") == "control":
+				if message.get("capture_advice") and advisor is None:
+					advisor = CaptureAdvisor(
+						target_latency=settings.realtime_target_latency_ms / 1000.0,
+						cooldown=settings.realtime_advice_cooldown_s,
+					)
+					await websocket.send_json(advisor.update())
+				elif message.get("capture_advice") is False:
+					advisor = None
+				# {"type": "control", "encoding": "binary", "delta": true} | {"encoding": "json"}
+				if message.get("encoding") == "binary":
+					hysteresis = message.get("hysteresis", settings.realtime_label_hysteresis)
+					if isinstance(hysteresis, bool) or not isinstance(hysteresis, (int, float)) or not 0.0 <= hysteresis <= 1.0:
+						await websocket.send_json({"error": "hysteresis must be a number between 0 and 1"})
+						continue
+					encoder = KeypointEncoder(
+						LABELS,
+						delta=bool(message.get("delta", True)),
+						hysteresis=float(hysteresis),
+					)
+				elif message.get("encoding") == "json":
+					encoder = None
 				continue
-
-			# Get keypoints from MoveNet
-			poses = movenet.detect_keypoints(frame)
-			poses_buffer.append(poses)
 			
-			# Debug: Print keypoints info
-			print(f"[REALTIME] Detected {len(poses)} keypoints")
-			if len(poses) > 0:
-				print(f"[REALTIME] First keypoint: {poses[0]}")
+			# Only frame messages count as frames; control messages returned above
+			FRAMES_IN.inc(transport="ws")
+			if "keypoints" in message:
+				# Keypoints-only mode: the client ran MoveNet (e.g. TF.js), so skip
+				# image decode and MoveNet and only classify + persist
+				try:
+					poses = unpack_keypoints(message["keypoints"])
+				except ValueError as e:
+					await websocket.send_json({"error": str(e)})
+					continue
+				prediction, started, finished = await executor.run_timed(_classify, poses, stream)
+				# Nothing to draw: the client already has its own keypoints
+				frame_shape, keyframe, visual_poses, cached = None, True, [], False
+			else:
+				image_data = message.get("image_b64")
+				if not image_data:
+					await websocket.send_json({"error": "missing image_b64"})
+					continue
+
+				# Decode + MoveNet + classifier run on the bounded executor so a slow
+				# frame never stalls the other sockets served by this event loop
+				inferred, started, finished = await executor.run_timed(_infer_frame, image_data, frame_buffer, tracker, stream, dedup)
+				if inferred is None:
+					await websocket.send_json({"error": "invalid image data"})
+					continue
+				frame_shape, poses, keyframe, prediction, cached = inferred
+				visual_poses = poses
+				
+				if log_frame:
+					logger.debug("[REALTIME] Detected %d keypoints (keyframe=%s)", len(poses), keyframe)
 			
-			# Convert keypoints to dict format for frontend
-			keypoints_dict = keypoints_to_dict(poses)
+			if prediction is not None:
+				db_service.save_exercise_prediction(prediction[0], poses, prediction[1], session=db_session)
 			
-			# Send keypoints for skeleton visualization
-			response = {
-				"keypoints": keypoints_dict,
-				"frame_shape": [frame.shape[1], frame.shape[0]]  # [width, height]
-			}
+			# Timestamps (epoch ms) echoed to clients that send "seq" / "t_capture"
+			t_capture = finite_number(message.get("t_capture"))
+			t_infer_start = started * 1000.0
+			telemetry = None
+			if t_capture is not None or "seq" in message:
+				telemetry = {
+					"seq": client_seq(message.get("seq")),
+					"t_capture": t_capture,
+					"t_server_recv": t_server_recv,
+					"t_infer_start": t_infer_start,
+				}
 			
-			# Add LSTM prediction for single-frame model
-			if len(poses) == 17:  # Valid keypoints detected
-				label, conf, dist = lstm.predict_sequence([poses])  # Single frame
-				print(f"[REALTIME] LSTM Prediction: {label} (confidence: {conf:.3f})")
-				response.update({
-					"label": label, 
-					"confidence": conf,
-					"prediction_available": True,
-					"all_probabilities": dist
-				})
+			if encoder is not None:
+				# Quantised keypoints; label/probabilities only when they change
+				with time_stage("serialize"):
+					if telemetry is not None:
+						telemetry["t_server_send"] = time.time() * 1000.0
+					payload = encoder.encode(visual_poses, keyframe, prediction, telemetry)
+				await websocket.send_bytes(payload)
 			else:
-				print(f"[REALTIME] Not enough keypoints for prediction: {len(poses)}/17")
-				response.update({
-					"prediction_available": False,
-					"frames_needed": 0
-				})
+				response = _json_response(frame_shape, visual_poses, keyframe, prediction, log_frame)
+				if dedup is not None and frame_shape is not None:
+					response["cached"] = cached
+					response["dedup_hit_rate"] = round(dedup.hit_rate, 3)
+				with time_stage("serialize"):
+					if telemetry is not None:
+						telemetry["t_server_send"] = time.time() * 1000.0
+						response["telemetry"] = telemetry
+					payload = json.dumps(response)
+				await websocket.send_text(payload)
+			FRAMES_OUT.inc(transport="ws")
+			
+			t_server_send = time.time() * 1000.0
+			stats.record(
+				uplink=t_server_recv - t_capture if t_capture is not None else None,
+				queue=t_infer_start - t_server_recv,
+				inference=(finished - started) * 1000.0,
+				server=t_server_send - t_server_recv,
+				# Clients may report the capture-to-display latency of an earlier frame
+				e2e=finite_number(message.get("e2e_ms")),
+			)
+			if dedup is not None:
+				stats.extra["dedup_hit_rate"] = round(dedup.hit_rate, 3)
 			
-			await websocket.send_json(response)
+			if advisor is not None:
+				advisor.observe(time.perf_counter() - received_at)
+				advice = advisor.update()
+				if advice is not None:
+					await websocket.send_json(advice)
 	except WebSocketDisconnect:
 		return
+	finally:
+		await admission.release()
+		WS_CONNECTIONS.dec()
+		if stats is not None:
+			get_connection_registry().close(stats)
+		if dedup is not None:
+			logger.info(
+				"[REALTIME] Connection closed: %d frames, dedup hit rate %.1f%%",
+				dedup.hits + dedup.misses, dedup.hit_rate * 100,
+			)
+		if db_session is not None:
+			await run_in_threadpool(db_service.close_realtime_session, db_session)
+		if stream is not None:
+			stream.reset()
+		if frame_buffer is not None:
+			movenet.release_frame_buffer(frame_buffer)
+		if tracker is not None:
+			tracker.reset()
 
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field
 from app.models import UserRole
@@ -77,3 +77,20 @@ class ProgressSummary(BaseModel):
 	label_distribution: dict[str, int]
 	last_active: Optional[datetime]
 
+
+class TimeseriesPoint(BaseModel):
+	start: date
+	end: date
+	sessions: int
+	frames: int
+	mean_confidence: Optional[float]
+	form_score: Optional[float]
+	repetitions: int
+
+
+class ProgressTimeseries(BaseModel):
+	patient_id: int
+	bucket: str
+	start: Optional[date]
+	end: Optional[date]
+	points: List[TimeseriesPoint]
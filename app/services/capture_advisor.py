@@ -0,0 +1,70 @@
+import time
+from typing import Dict, Optional
+
+from app.services.inference_executor import LOOP_LAG_CURRENT, get_inference_executor
+
+# Capture ladder, best first. MoveNet only ever sees 256x256, so nothing above
+# 320x240 is worth uploading; lower rungs trade frame rate and JPEG quality.
+CAPTURE_LEVELS = [
+	{"width": 320, "height": 240, "jpeg_quality": 0.80, "fps": 30},
+	{"width": 320, "height": 240, "jpeg_quality": 0.70, "fps": 20},
+	{"width": 256, "height": 192, "jpeg_quality": 0.65, "fps": 15},
+	{"width": 256, "height": 192, "jpeg_quality": 0.60, "fps": 10},
+	{"width": 256, "height": 192, "jpeg_quality": 0.50, "fps": 5},
+]
+
+
+class CaptureAdvisor:
+	"""Per-connection advice on capture resolution, JPEG quality and frame rate.
+
+	Steps down the ladder when the connection's smoothed processing latency
+	exceeds ``target_latency`` or the server is loaded, and back up once both
+	have stayed comfortably low. Changes are rate limited by ``cooldown``.
+	"""
+
+	def __init__(self, target_latency: float = 0.15, cooldown: float = 2.0, alpha: float = 0.2):
+		self.target_latency = target_latency
+		self.cooldown = cooldown
+		self.alpha = alpha
+		self.level = 0
+		self.latency: Optional[float] = None
+		self._last_change = 0.0
+		self._sent_level: Optional[int] = None
+
+	@staticmethod
+	def server_load() -> float:
+		"""0..1 (or above) estimate combining executor occupancy and event-loop lag."""
+		executor = get_inference_executor()
+		occupancy = executor.load()
+		lag = LOOP_LAG_CURRENT.value()
+		return max(occupancy, lag / 0.1)
+
+	def observe(self, processing_seconds: float):
+		if self.latency is None:
+			self.latency = processing_seconds
+		else:
+			self.latency = self.alpha * processing_seconds + (1.0 - self.alpha) * self.latency
+
+	def update(self, now: Optional[float] = None) -> Optional[Dict]:
+		"""Re-evaluate the level; returns an advice message if it should be (re)sent."""
+		now = time.monotonic() if now is None else now
+		if self.latency is not None and now - self._last_change >= self.cooldown:
+			load = self.server_load()
+			if (self.latency > self.target_latency or load > 0.8) and self.level < len(CAPTURE_LEVELS) - 1:
+				self.level += 1
+				self._last_change = now
+			elif self.latency < 0.6 * self.target_latency and load < 0.5 and self.level > 0:
+				self.level -= 1
+				self._last_change = now
+		if self.level == self._sent_level:
+			return None
+		self._sent_level = self.level
+		return self.advice()
+
+	def advice(self) -> Dict:
+		return {
+			"type": "capture_advice",
+			"level": self.level,
+			"target_latency_ms": int(self.target_latency * 1000),
+			**CAPTURE_LEVELS[self.level],
+		}
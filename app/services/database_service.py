@@ -3,22 +3,39 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
 from app.auth import get_password_hash
+from app.services.realtime_writer import RealtimeSession, get_realtime_writer
 
 
 class DatabaseService:
     def __init__(self):
         pass
 
-    def save_exercise_prediction(self, exercise: str, keypoints: List[float], confidence: float, user_id: Optional[str] = None):
+    def open_realtime_session(self, user_id: Optional[int], exercise_name: str) -> RealtimeSession:
         """
-        Save exercise prediction to SQLite database
+        Start a realtime Session row (written asynchronously by the write-behind queue)
+        """
+        return get_realtime_writer().open_session(user_id, exercise_name)
+
+    def close_realtime_session(self, session: RealtimeSession):
+        """
+        Mark a realtime Session as completed once its queued results are written
+        """
+        get_realtime_writer().close_session(session)
+
+    def save_exercise_prediction(self, exercise: str, keypoints: List, confidence: float, user_id: Optional[str] = None, session: Optional[RealtimeSession] = None):
+        """
+        Queue an exercise prediction for batched insertion into SQLite.
+        Without a realtime session the prediction is stored in a one-frame session.
         """
         try:
-            # For now, just print the data - you can implement SQLite storage later
-            print(f"Exercise prediction saved: {exercise}, confidence: {confidence}")
-            if user_id:
-                print(f"   User ID: {user_id}")
-            return {"success": True, "message": "Exercise prediction saved"}
+            writer = get_realtime_writer()
+            if session is None:
+                one_off = writer.open_session(int(user_id) if user_id else None, exercise)
+                writer.add_prediction(one_off, exercise, confidence, keypoints)
+                writer.close_session(one_off)
+            else:
+                writer.add_prediction(session, exercise, confidence, keypoints)
+            return {"success": True, "message": "Exercise prediction queued"}
         except Exception as e:
             print(f"Error saving exercise prediction: {e}")
             raise e
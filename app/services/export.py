@@ -0,0 +1,369 @@
+"""Bulk export of sessions and per-frame results as NDJSON, CSV or Parquet.
+
+Rows are read through server-side cursors (``yield_per``) and encoded in
+chunks of ``EXPORT_CHUNK_ROWS``, so memory stays flat whatever the size of
+the export. Results already compacted by the retention job are read back
+from their archives after the live rows (``archived`` is true, ``id`` empty);
+both reads share one snapshot, so a retention pass running meanwhile cannot
+make rows appear twice.
+
+    python -m app.services.export sessions|results [--format ndjson|csv|parquet]
+        [--patient ID] [--exercise NAME] [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--out FILE]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import ExerciseResult, ExerciseResultArchive, Session as DbSession
+from app.services.metrics import counter
+from app.services.retention import unpack_archive
+
+try:
+	import pyarrow as pa  # type: ignore[reportMissingImports]
+	import pyarrow.parquet as pq  # type: ignore[reportMissingImports]
+except Exception:
+	pa = pq = None  # Parquet export needs the optional pyarrow package
+
+EXPORT_ROWS = counter("rehab_export_rows_total", "Rows written by bulk exports", ("kind", "format"))
+
+EXPORT_KINDS = ("sessions", "results")
+MEDIA_TYPES = {
+	"ndjson": "application/x-ndjson",
+	"csv": "text/csv",
+	"parquet": "application/vnd.apache.parquet",
+}
+SESSION_FIELDS = (
+	"id", "patient_id", "exercise_name", "video_path", "started_at", "completed_at",
+	"duration_seconds", "form_score", "repetitions_count", "status",
+)
+RESULT_FIELDS = (
+	"id", "session_id", "patient_id", "exercise_name", "frame_index", "predicted_label",
+	"confidence", "timestamp", "pose_keypoints", "archived",
+)
+
+
+class ExportFilters:
+	"""Patient, exercise and inclusive date range; dates apply to session start / result timestamp"""
+
+	__slots__ = ("patient_id", "exercise", "start", "end")
+
+	def __init__(self, patient_id: Optional[int] = None, exercise: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None):
+		self.patient_id = patient_id
+		self.exercise = exercise
+		self.start = datetime.combine(start, datetime.min.time()) if start else None
+		self.end = datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None
+
+	def apply(self, query, timestamp_col):
+		if self.patient_id is not None:
+			query = query.where(DbSession.patient_id == self.patient_id)
+		if self.exercise:
+			query = query.where(DbSession.exercise_name == self.exercise)
+		if self.start is not None:
+			query = query.where(timestamp_col >= self.start)
+		if self.end is not None:
+			query = query.where(timestamp_col < self.end)
+		return query
+
+	def includes(self, timestamp: Optional[datetime]) -> bool:
+		if self.start is None and self.end is None:
+			return True
+		if timestamp is None:
+			return False
+		return (self.start is None or timestamp >= self.start) and (self.end is None or timestamp < self.end)
+
+
+def _sessions_query(filters: ExportFilters):
+	columns = [getattr(DbSession, name) for name in SESSION_FIELDS]
+	return filters.apply(select(*columns), DbSession.started_at).order_by(DbSession.id)
+
+
+def _results_query(filters: ExportFilters):
+	query = (
+		select(
+			ExerciseResult.id, ExerciseResult.session_id, DbSession.patient_id,
+			func.coalesce(ExerciseResult.exercise_name, DbSession.exercise_name),
+			ExerciseResult.frame_index, ExerciseResult.predicted_label, ExerciseResult.confidence,
+			ExerciseResult.timestamp, ExerciseResult.pose_keypoints,
+		)
+		.join(DbSession, ExerciseResult.session_id == DbSession.id)
+	)
+	return filters.apply(query, ExerciseResult.timestamp).order_by(ExerciseResult.id)
+
+
+def _archives_query(filters: ExportFilters):
+	query = (
+		select(ExerciseResultArchive.session_id, DbSession.patient_id, DbSession.exercise_name, ExerciseResultArchive.data)
+		.join(DbSession, ExerciseResultArchive.session_id == DbSession.id)
+	)
+	# Archives overlapping the range; their rows are filtered one by one
+	if filters.patient_id is not None:
+		query = query.where(DbSession.patient_id == filters.patient_id)
+	if filters.exercise:
+		query = query.where(DbSession.exercise_name == filters.exercise)
+	if filters.start is not None:
+		query = query.where(ExerciseResultArchive.last_timestamp >= filters.start)
+	if filters.end is not None:
+		query = query.where(ExerciseResultArchive.first_timestamp < filters.end)
+	return query.order_by(ExerciseResultArchive.id)
+
+
+def _is_sqlite(db) -> bool:
+	return db.get_bind().dialect.name == "sqlite"
+
+
+def _session_row(row) -> Dict:
+	return dict(zip(SESSION_FIELDS, row))
+
+
+def _result_row(row) -> Dict:
+	return dict(zip(RESULT_FIELDS, (*row, False)))
+
+
+def _archived_rows(archive, filters: ExportFilters) -> Iterator[Dict]:
+	session_id, patient_id, exercise_name, data = archive
+	for row in unpack_archive(data):
+		if filters.includes(row["timestamp"]):
+			yield {
+				"id": None,
+				"session_id": session_id,
+				"patient_id": patient_id,
+				"exercise_name": row["exercise_name"] or exercise_name,
+				"frame_index": row["frame_index"],
+				"predicted_label": row["predicted_label"],
+				"confidence": row["confidence"],
+				"timestamp": row["timestamp"],
+				"pose_keypoints": row["pose_keypoints"],
+				"archived": True,
+			}
+
+
+def _chunked(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+	chunk: List[Dict] = []
+	for row in rows:
+		chunk.append(row)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _json_default(value):
+	if isinstance(value, (datetime, date)):
+		return value.isoformat()
+	return str(value)
+
+
+class _NdjsonEncoder:
+	def __init__(self, kind: str):
+		pass
+
+	def encode(self, rows: List[Dict]) -> bytes:
+		return "".join(json.dumps(row, default=_json_default, separators=(",", ":")) + "\n" for row in rows).encode()
+
+	def finish(self) -> bytes:
+		return b""
+
+
+class _CsvEncoder:
+	def __init__(self, kind: str):
+		self.fields = SESSION_FIELDS if kind == "sessions" else RESULT_FIELDS
+		self.header = True
+
+	def _cell(self, value):
+		if value is None:
+			return ""
+		if isinstance(value, (datetime, date)):
+			return value.isoformat()
+		if isinstance(value, (list, dict)):
+			return json.dumps(value, separators=(",", ":"))
+		return value
+
+	def encode(self, rows: List[Dict]) -> bytes:
+		buffer = io.StringIO()
+		writer = csv.writer(buffer)
+		if self.header:
+			writer.writerow(self.fields)
+			self.header = False
+		writer.writerows([self._cell(row[name]) for name in self.fields] for row in rows)
+		return buffer.getvalue().encode()
+
+	def finish(self) -> bytes:
+		# An empty export still gets its header line
+		return self.encode([]) if self.header else b""
+
+
+class _ByteSink:
+	"""Write-only file handed to ParquetWriter; drained after every row group"""
+
+	def __init__(self):
+		self.chunks: List[bytes] = []
+		self.position = 0
+		self.closed = False
+
+	def write(self, data) -> int:
+		data = bytes(data)
+		self.chunks.append(data)
+		self.position += len(data)
+		return len(data)
+
+	def tell(self) -> int:
+		return self.position
+
+	def flush(self):
+		pass
+
+	def close(self):
+		self.closed = True
+
+	def drain(self) -> bytes:
+		data = b"".join(self.chunks)
+		self.chunks = []
+		return data
+
+
+def _parquet_schema(kind: str):
+	timestamp = pa.timestamp("us")
+	if kind == "sessions":
+		return pa.schema([
+			("id", pa.int64()), ("patient_id", pa.int64()), ("exercise_name", pa.string()),
+			("video_path", pa.string()), ("started_at", timestamp), ("completed_at", timestamp),
+			("duration_seconds", pa.int64()), ("form_score", pa.float64()),
+			("repetitions_count", pa.int64()), ("status", pa.string()),
+		])
+	keypoint = pa.struct([("x", pa.float32()), ("y", pa.float32()), ("score", pa.float32())])
+	return pa.schema([
+		("id", pa.int64()), ("session_id", pa.int64()), ("patient_id", pa.int64()),
+		("exercise_name", pa.string()), ("frame_index", pa.int64()), ("predicted_label", pa.string()),
+		("confidence", pa.float64()), ("timestamp", timestamp),
+		("pose_keypoints", pa.list_(keypoint)), ("archived", pa.bool_()),
+	])
+
+
+class _ParquetEncoder:
+	"""One Parquet row group per chunk, streamed as it is written"""
+
+	def __init__(self, kind: str):
+		self.schema = _parquet_schema(kind)
+		self.sink = _ByteSink()
+		self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+	def encode(self, rows: List[Dict]) -> bytes:
+		self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+		return self.sink.drain()
+
+	def finish(self) -> bytes:
+		self.writer.close()
+		return self.sink.drain()
+
+
+_ENCODERS = {"ndjson": _NdjsonEncoder, "csv": _CsvEncoder, "parquet": _ParquetEncoder}
+
+
+def check_format(fmt: str):
+	"""Raise ValueError for unknown formats, or parquet without pyarrow installed"""
+	if fmt not in _ENCODERS:
+		raise ValueError(f"unknown export format: {fmt}")
+	if fmt == "parquet" and pq is None:
+		raise ValueError("parquet export requires pyarrow (pip install pyarrow)")
+
+
+def iter_export(db: Session, kind: str, fmt: str, filters: ExportFilters, chunk_rows: Optional[int] = None) -> Iterator[bytes]:
+	"""Encoded export, one chunk of rows at a time (sync; for the CLI)"""
+	check_format(fmt)
+	chunk_rows = chunk_rows or settings.export_chunk_rows
+	encoder = _ENCODERS[fmt](kind)
+	if kind == "sessions":
+		for chunk in db.execute(_sessions_query(filters).execution_options(yield_per=chunk_rows)).partitions():
+			EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+			yield encoder.encode([_session_row(r) for r in chunk])
+	else:
+		# Live rows and archives from one snapshot (db must be a fresh session):
+		# a retention pass committing between the two reads would otherwise
+		# make the rows it compacted appear twice
+		if _is_sqlite(db):
+			db.execute(text("BEGIN"))  # pysqlite only opens transactions for writes
+		else:
+			db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+		for chunk in db.execute(_results_query(filters).execution_options(yield_per=chunk_rows)).partitions():
+			EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+			yield encoder.encode([_result_row(r) for r in chunk])
+		for archive in db.execute(_archives_query(filters).execution_options(yield_per=1)):
+			for chunk in _chunked(_archived_rows(archive, filters), chunk_rows):
+				EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+				yield encoder.encode(chunk)
+	yield encoder.finish()
+
+
+async def iter_export_async(db: AsyncSession, kind: str, fmt: str, filters: ExportFilters, chunk_rows: Optional[int] = None) -> AsyncIterator[bytes]:
+	"""Async twin of iter_export for streaming responses; encoding runs off the event loop"""
+	check_format(fmt)
+	chunk_rows = chunk_rows or settings.export_chunk_rows
+	encoder = _ENCODERS[fmt](kind)
+	if kind == "sessions":
+		result = await db.stream(_sessions_query(filters).execution_options(yield_per=chunk_rows))
+		async for chunk in result.partitions():
+			EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+			yield await asyncio.to_thread(encoder.encode, [_session_row(r) for r in chunk])
+	else:
+		# One snapshot for live rows and archives, as in iter_export
+		if _is_sqlite(db):
+			await db.execute(text("BEGIN"))  # pysqlite only opens transactions for writes
+		else:
+			await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+		result = await db.stream(_results_query(filters).execution_options(yield_per=chunk_rows))
+		async for chunk in result.partitions():
+			EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+			yield await asyncio.to_thread(encoder.encode, [_result_row(r) for r in chunk])
+		archives = await db.stream(_archives_query(filters).execution_options(yield_per=1))
+		async for archive in archives:
+			rows = await asyncio.to_thread(list, _archived_rows(archive, filters))
+			for chunk in _chunked(rows, chunk_rows):
+				EXPORT_ROWS.inc(len(chunk), kind=kind, format=fmt)
+				yield await asyncio.to_thread(encoder.encode, chunk)
+	yield await asyncio.to_thread(encoder.finish)
+
+
+def main(argv=None) -> int:
+	parser = argparse.ArgumentParser(description="Export sessions or per-frame results")
+	parser.add_argument("kind", choices=EXPORT_KINDS)
+	parser.add_argument("--format", choices=tuple(_ENCODERS), default="ndjson")
+	parser.add_argument("--patient", type=int, default=None, help="patient (user) id")
+	parser.add_argument("--exercise", default=None, help="session exercise name")
+	parser.add_argument("--start", type=date.fromisoformat, default=None, help="first day (YYYY-MM-DD)")
+	parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day, inclusive (YYYY-MM-DD)")
+	parser.add_argument("--out", default="-", help="output file (default: stdout)")
+	parser.add_argument("--chunk-rows", type=int, default=None, help="rows per chunk (default: EXPORT_CHUNK_ROWS)")
+	args = parser.parse_args(argv)
+	try:
+		check_format(args.format)
+	except ValueError as e:
+		print(f"[EXPORT] {e}", file=sys.stderr)
+		return 2
+	from app.database import SessionLocal
+
+	filters = ExportFilters(args.patient, args.exercise, args.start, args.end)
+	out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+	db = SessionLocal()
+	try:
+		for data in iter_export(db, args.kind, args.format, filters, args.chunk_rows):
+			out.write(data)
+	finally:
+		db.close()
+		if out is not sys.stdout.buffer:
+			out.close()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
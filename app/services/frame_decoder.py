@@ -0,0 +1,39 @@
+import numpy as np
+import cv2
+from io import BytesIO
+from typing import Optional, Tuple
+from PIL import Image
+
+
+def _open_reduced(image_bytes: bytes, min_size: Tuple[int, int]) -> Image.Image:
+	"""Open an image, letting the JPEG decoder scale by 1/2, 1/4 or 1/8 in the DCT domain.
+
+	The decoded image is the smallest DCT scale that is still at least
+	``min_size`` (width, height); other formats decode at full size.
+	"""
+	img = Image.open(BytesIO(image_bytes))
+	if img.format == "JPEG":
+		img.draft("RGB", min_size)
+	if img.mode != "RGB":
+		img = img.convert("RGB")
+	return img
+
+
+def decode_reduced(image_bytes: bytes, min_size: Tuple[int, int] = (256, 256)) -> np.ndarray:
+	"""Decode to a BGR array no smaller than ``min_size``, keeping the aspect ratio."""
+	rgb = np.asarray(_open_reduced(image_bytes, min_size))
+	return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+def decode_frame(image_bytes: bytes, size: Tuple[int, int] = (256, 256), out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Decode straight to a ``size`` (width, height) BGR frame for MoveNet.
+
+	Pass a preallocated ``(height, width, 3)`` uint8 ``out`` buffer to reuse
+	it across frames of a stream; it is filled in place and returned.
+	"""
+	rgb = np.asarray(_open_reduced(image_bytes, size))
+	if rgb.shape[1] != size[0] or rgb.shape[0] != size[1]:
+		rgb = cv2.resize(rgb, size, interpolation=cv2.INTER_AREA)
+	if out is None:
+		return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+	return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=out)
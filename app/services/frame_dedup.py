@@ -0,0 +1,90 @@
+import hashlib
+import numpy as np
+from io import BytesIO
+from typing import Any, Optional
+from PIL import Image
+
+from app.services.metrics import counter
+
+DEDUP_LOOKUPS = counter("rehab_frame_dedup_total", "Realtime frame dedup lookups", ("result",))
+
+
+def perceptual_hash(image_bytes: bytes, hash_size: int = 16) -> int:
+	"""Difference hash (dHash) of an encoded image.
+
+	JPEGs are decoded at 1/8 scale in greyscale, so this costs a small fraction
+	of a full decode. Returns a ``hash_size * hash_size`` bit integer.
+	"""
+	img = Image.open(BytesIO(image_bytes))
+	if img.format == "JPEG":
+		img.draft("L", (hash_size * 2, hash_size * 2))
+	thumb = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+	pixels = np.asarray(thumb, dtype=np.int16)
+	# A small margin keeps sensor noise in flat regions from flipping bits
+	bits = (pixels[:, 1:] - pixels[:, :-1] > 2).flatten()
+	return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class FrameDeduplicator:
+	"""Per-connection cache of the last inferred frame and its result.
+
+	A frame is a hit when its raw bytes are identical to the reference frame,
+	or its perceptual hash is within ``max_distance`` bits of it. The reference
+	is the last frame that was actually inferred, so slow drift still triggers
+	inference, and at most ``max_reuse`` consecutive hits reuse one result.
+	"""
+
+	def __init__(self, max_distance: int = 3, hash_size: int = 16, max_reuse: int = 15):
+		self.max_distance = max_distance
+		self.hash_size = hash_size
+		self.max_reuse = max_reuse
+		self.hits = 0
+		self.misses = 0
+		self.reset()
+
+	def reset(self):
+		self._digest: Optional[bytes] = None
+		self._phash: Optional[int] = None
+		self._result: Any = None
+		self._reused = 0
+
+	@property
+	def hit_rate(self) -> float:
+		total = self.hits + self.misses
+		return self.hits / total if total else 0.0
+
+	def lookup(self, image_bytes: bytes):
+		"""Return (cached_result, key). cached_result is None on a miss; pass key to store()."""
+		digest = hashlib.blake2b(image_bytes, digest_size=16).digest()
+		phash = None
+		hit = False
+		if self._result is not None and self._reused < self.max_reuse:
+			if digest == self._digest:
+				hit = True
+			else:
+				try:
+					phash = perceptual_hash(image_bytes, self.hash_size)
+				except Exception:
+					phash = None
+				if phash is not None and self._phash is not None:
+					hit = (phash ^ self._phash).bit_count() <= self.max_distance
+		if hit:
+			self.hits += 1
+			self._reused += 1
+			DEDUP_LOOKUPS.inc(result="hit")
+			return self._result, None
+		self.misses += 1
+		DEDUP_LOOKUPS.inc(result="miss")
+		return None, (digest, phash, image_bytes)
+
+	def store(self, key, result: Any):
+		digest, phash, image_bytes = key
+		if phash is None:
+			try:
+				phash = perceptual_hash(image_bytes, self.hash_size)
+			except Exception:
+				phash = None
+		self._digest = digest
+		self._phash = phash
+		self._result = result
+		self._reused = 0
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.metrics import counter, gauge, histogram
+
+# Priority classes, highest first
+REALTIME = 0
+BATCH = 1
+PRIORITY_NAMES = {REALTIME: "realtime", BATCH: "batch"}
+
+INFLIGHT = gauge("rehab_inference_inflight", "Frame jobs queued or running on the inference executor")
+QUEUE_DEPTH = gauge("rehab_inference_queue_depth", "Jobs waiting for an inference worker", ("priority",))
+DISPATCHED = counter("rehab_inference_dispatched_total", "Jobs dispatched to inference workers", ("priority",))
+QUEUE_WAIT_SECONDS = histogram("rehab_inference_queue_wait_seconds", "Time a job waited for an inference worker", ("priority",))
+LOOP_LAG_SECONDS = histogram("rehab_event_loop_lag_seconds", "Event loop scheduling delay")
+LOOP_LAG_CURRENT = gauge("rehab_event_loop_lag_current_seconds", "Most recent event loop scheduling delay")
+
+
+class InferenceExecutor:
+	"""Shared priority scheduler for CPU-bound inference work (decode, cv2, TensorFlow).
+
+	Keeps the event loop free for the many idle sockets while a few are
+	inferring. Realtime frames are dispatched before batch video work; batch
+	callers submit small frame batches, so an upload is preempted at batch
+	boundaries, and while both classes wait at least ``batch_min_share`` of
+	dispatches go to batch work so it never starves. ``max_workers`` jobs run
+	at once and at most ``max_pending`` more realtime jobs queue; further
+	callers are suspended (not the loop) until a slot frees. Size it together
+	with TensorFlow's intra-op threads so that workers x intra-op threads
+	roughly matches the available cores.
+	"""
+
+	def __init__(self, max_workers: int = 2, max_pending: int = 8, batch_min_share: float = 0.2):
+		self.max_workers = max(1, max_workers)
+		self.max_pending = max(0, max_pending)
+		self._batch_every = max(1, round(1.0 / batch_min_share)) if batch_min_share > 0 else None
+		self._queues: Dict[int, deque] = {REALTIME: deque(), BATCH: deque()}
+		self._cond = threading.Condition()
+		self._threads: List[threading.Thread] = []
+		self._stopping = False
+		self._since_batch = 0
+		self._slots: Optional[asyncio.Semaphore] = None
+		self._inflight = 0
+
+	def _ensure(self):
+		with self._cond:
+			if not self._threads:
+				self._stopping = False
+				for i in range(self.max_workers):
+					thread = threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+					thread.start()
+					self._threads.append(thread)
+		if self._slots is None:
+			self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+
+	def _next_job(self):
+		"""Pick the next job; caller holds the condition and at least one queue is non-empty."""
+		realtime, batch = self._queues[REALTIME], self._queues[BATCH]
+		if batch and (not realtime or (self._batch_every and self._since_batch >= self._batch_every - 1)):
+			self._since_batch = 0
+			return BATCH, batch.popleft()
+		self._since_batch = self._since_batch + 1 if batch else 0
+		return REALTIME, realtime.popleft()
+
+	def _worker(self):
+		while True:
+			with self._cond:
+				while not self._stopping and not (self._queues[REALTIME] or self._queues[BATCH]):
+					self._cond.wait()
+				if not (self._queues[REALTIME] or self._queues[BATCH]):
+					return
+				priority, (enqueued, future, fn, args) = self._next_job()
+			name = PRIORITY_NAMES[priority]
+			QUEUE_DEPTH.dec(priority=name)
+			DISPATCHED.inc(priority=name)
+			QUEUE_WAIT_SECONDS.observe(time.perf_counter() - enqueued, priority=name)
+			if not future.set_running_or_notify_cancel():
+				continue
+			try:
+				future.set_result(fn(*args))
+			except BaseException as e:
+				future.set_exception(e)
+
+	def submit(self, fn: Callable, *args, priority: int = REALTIME) -> Future:
+		"""Queue ``fn(*args)`` in the given priority class; returns a concurrent Future."""
+		self._ensure()
+		future: Future = Future()
+		with self._cond:
+			self._queues[priority].append((time.perf_counter(), future, fn, args))
+			self._cond.notify()
+		QUEUE_DEPTH.inc(priority=PRIORITY_NAMES[priority])
+		return future
+
+	async def run(self, fn: Callable, *args, priority: int = REALTIME) -> Any:
+		"""Run ``fn(*args)`` on a worker and await its result."""
+		self._ensure()
+		if priority == REALTIME:
+			async with self._slots:
+				return await self._await(fn, args, priority)
+		# Batch callers await one frame batch at a time, so they need no slot
+		return await self._await(fn, args, priority)
+
+	async def _await(self, fn: Callable, args, priority: int) -> Any:
+		self._inflight += 1
+		INFLIGHT.inc()
+		try:
+			return await asyncio.wrap_future(self.submit(fn, *args, priority=priority))
+		finally:
+			self._inflight -= 1
+			INFLIGHT.dec()
+
+	def load(self) -> float:
+		"""Fraction of worker capacity in use; above 1.0 means jobs are queueing."""
+		return self._inflight / self.max_workers
+
+	async def run_timed(self, fn: Callable, *args, priority: int = REALTIME):
+		"""Like run(), but returns (result, started_at, finished_at) as wall-clock epoch seconds."""
+		return await self.run(self._wall_clock, fn, args, priority=priority)
+
+	@staticmethod
+	def _wall_clock(fn: Callable, args):
+		started_at = time.time()
+		result = fn(*args)
+		return result, started_at, time.time()
+
+	def shutdown(self):
+		"""Finish queued jobs and stop the workers."""
+		with self._cond:
+			self._stopping = True
+			self._cond.notify_all()
+			threads, self._threads = self._threads, []
+		for thread in threads:
+			thread.join()
+		self._slots = None
+
+
+def configure_tensorflow_threads():
+	"""Apply TF thread-pool sizes from settings; must run before TensorFlow executes any op."""
+	import tensorflow as tf
+	try:
+		if settings.tf_intra_op_threads > 0:
+			tf.config.threading.set_intra_op_parallelism_threads(settings.tf_intra_op_threads)
+		if settings.tf_inter_op_threads > 0:
+			tf.config.threading.set_inter_op_parallelism_threads(settings.tf_inter_op_threads)
+	except RuntimeError as e:
+		# TensorFlow was already initialised; keep its existing pools
+		print(f"[Inference] Could not set TensorFlow threads: {e}")
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+	"""Sample how late the loop wakes up from a sleep; a blocked loop shows up as lag."""
+	while True:
+		start = time.perf_counter()
+		await asyncio.sleep(interval)
+		lag = max(0.0, time.perf_counter() - start - interval)
+		LOOP_LAG_SECONDS.observe(lag)
+		LOOP_LAG_CURRENT.set(lag)
+
+
+inference_executor = InferenceExecutor(
+	max_workers=settings.inference_workers,
+	max_pending=settings.inference_max_pending,
+	batch_min_share=settings.inference_batch_min_share,
+)
+
+
+def get_inference_executor() -> InferenceExecutor:
+	return inference_executor
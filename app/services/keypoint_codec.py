@@ -0,0 +1,177 @@
+import numpy as np
+from typing import Dict, List, Optional, Union
+
+KEYPOINT_COUNT = 17
+# 17 rows of [y, x, score] as little-endian float32, the layout of MoveNet's raw output
+PACKED_KEYPOINTS_SIZE = KEYPOINT_COUNT * 3 * 4
+
+
+def unpack_keypoints(data: Union[bytes, bytearray, memoryview, list]) -> List[Dict]:
+	"""Parse client-supplied keypoints into MoveNetService's ``{x, y, score}`` dicts.
+
+	Accepts packed float32 bytes or a nested 17x3 list, each row ``[y, x, score]``
+	with coordinates normalised to the frame. Raises ValueError on bad input.
+	"""
+	if isinstance(data, (bytes, bytearray, memoryview)):
+		if len(data) != PACKED_KEYPOINTS_SIZE:
+			raise ValueError(f"expected {PACKED_KEYPOINTS_SIZE} bytes of packed keypoints, got {len(data)}")
+		arr = np.frombuffer(data, dtype="<f4").reshape(KEYPOINT_COUNT, 3)
+	else:
+		try:
+			arr = np.asarray(data, dtype=np.float32)
+		except (TypeError, ValueError) as e:
+			# e.g. an object, strings or nulls instead of a 17x3 list of numbers
+			raise ValueError(f"expected a {KEYPOINT_COUNT}x3 keypoint array: {e}")
+		if arr.shape != (KEYPOINT_COUNT, 3):
+			raise ValueError(f"expected a {KEYPOINT_COUNT}x3 keypoint array, got shape {arr.shape}")
+	if not np.isfinite(arr).all():
+		raise ValueError("keypoints must be finite")
+	arr = np.clip(arr, 0.0, 1.0)
+	return [{"x": float(x), "y": float(y), "score": float(s)} for y, x, s in arr]
+
+
+# Binary realtime responses (opt-in per connection), little-endian. Only frame
+# results are binary: notices (errors, rate_limited, queued, capture_advice)
+# stay JSON text frames, so clients dispatch on the WebSocket frame type.
+#   uint8 version | uint8 flags | uint16 seq
+#   [FLAG_KEYPOINTS] absolute: 17 x (uint16 x, uint16 y) coordinates in 1/65535 of the frame
+#                    delta:    17 x (int8 dx, int8 dy) in steps of 2**DELTA_SHIFT quantisation units
+#                    then 17 x uint8 score (1/255)
+#   [FLAG_PREDICTION] uint8 label index | uint8 n | n x uint8 probability (1/255)
+#   [FLAG_TELEMETRY]  uint32 client seq | 4 x float64 epoch ms: client capture, server
+#                     receive, inference start, server send (NaN when unknown)
+RESPONSE_VERSION = 1
+FLAG_DELTA = 0x01
+FLAG_KEYFRAME = 0x02
+FLAG_PREDICTION = 0x04
+FLAG_PREDICTION_AVAILABLE = 0x08
+FLAG_KEYPOINTS = 0x10
+FLAG_TELEMETRY = 0x20
+TELEMETRY_FIELDS = ("t_capture", "t_server_recv", "t_infer_start", "t_server_send")
+DELTA_SHIFT = 4
+_COORD_SCALE = 65535
+_BYTE_SCALE = 255
+
+
+class KeypointEncoder:
+	"""Per-connection binary encoder for realtime responses.
+
+	Coordinates are uint16-quantised and, when ``delta`` is on and the motion
+	fits, sent as int8 deltas against what the client has reconstructed so
+	far, so quantisation error never accumulates. The label and probabilities
+	are only sent when the label changes or any probability moves by more
+	than ``hysteresis`` since they were last sent.
+	"""
+
+	def __init__(self, labels: List[str], delta: bool = True, hysteresis: float = 0.1):
+		self.labels = list(labels)
+		self.delta = delta
+		self.hysteresis = hysteresis
+		self.reset()
+
+	def reset(self):
+		self._seq = 0
+		self._coords = None  # client-side reconstruction, int32 (17, 2)
+		self._label = None
+		self._probs = None
+
+	def _prediction_changed(self, label: str, probs: np.ndarray) -> bool:
+		if self._label != label or self._probs is None or self._probs.shape != probs.shape:
+			return True
+		return bool(np.max(np.abs(probs - self._probs)) > self.hysteresis)
+
+	def encode(self, poses: List[Dict], keyframe: bool = True, prediction=None, telemetry: Optional[Dict] = None) -> bytes:
+		flags = FLAG_KEYFRAME if keyframe else 0
+		body = bytearray()
+
+		if len(poses) == KEYPOINT_COUNT:
+			flags |= FLAG_KEYPOINTS
+			xy = np.array([[kp["x"], kp["y"]] for kp in poses], dtype=np.float64)
+			coords = np.rint(np.clip(xy, 0.0, 1.0) * _COORD_SCALE).astype(np.int32)
+			scores = np.rint(np.clip([kp["score"] for kp in poses], 0.0, 1.0) * _BYTE_SCALE).astype(np.uint8)
+			steps = None
+			if self.delta and self._coords is not None:
+				steps = np.rint((coords - self._coords) / (1 << DELTA_SHIFT)).astype(np.int32)
+				if np.abs(steps).max() > 127:
+					steps = None
+			if steps is not None:
+				flags |= FLAG_DELTA
+				self._coords = np.clip(self._coords + (steps << DELTA_SHIFT), 0, _COORD_SCALE)
+				body += steps.astype("<i1").tobytes()
+			else:
+				self._coords = coords
+				body += coords.astype("<u2").tobytes()
+			body += scores.tobytes()
+		else:
+			self._coords = None
+
+		if prediction is not None:
+			flags |= FLAG_PREDICTION_AVAILABLE
+			label, _, dist = prediction
+			probs = np.clip(np.asarray(dist, dtype=np.float64), 0.0, 1.0)
+			if self._prediction_changed(label, probs):
+				flags |= FLAG_PREDICTION
+				self._label, self._probs = label, probs
+				index = self.labels.index(label) if label in self.labels else 255
+				body += bytes([index, len(probs)])
+				body += np.rint(probs * _BYTE_SCALE).astype(np.uint8).tobytes()
+
+		if telemetry is not None:
+			flags |= FLAG_TELEMETRY
+			body += np.array([int(telemetry.get("seq") or 0) & 0xFFFFFFFF], dtype="<u4").tobytes()
+			times = [telemetry.get(name) for name in TELEMETRY_FIELDS]
+			body += np.array([np.nan if t is None else t for t in times], dtype="<f8").tobytes()
+
+		header = np.array([RESPONSE_VERSION, flags], dtype=np.uint8).tobytes()
+		header += np.array([self._seq & 0xFFFF], dtype="<u2").tobytes()
+		self._seq += 1
+		return header + bytes(body)
+
+
+class KeypointDecoder:
+	"""Reference decoder for KeypointEncoder output (mirrors what clients implement)."""
+
+	def __init__(self, labels: List[str]):
+		self.labels = list(labels)
+		self._coords = None
+		self.label = None
+		self.probabilities = None
+
+	def decode(self, data: bytes) -> Dict:
+		version, flags = data[0], data[1]
+		if version != RESPONSE_VERSION:
+			raise ValueError(f"unsupported response version {version}")
+		seq = int(np.frombuffer(data, dtype="<u2", count=1, offset=2)[0])
+		offset = 4
+		result: Dict = {"seq": seq, "keyframe": bool(flags & FLAG_KEYFRAME), "keypoints": []}
+		if flags & FLAG_KEYPOINTS:
+			if flags & FLAG_DELTA:
+				steps = np.frombuffer(data, dtype="<i1", count=KEYPOINT_COUNT * 2, offset=offset).astype(np.int32)
+				self._coords = np.clip(self._coords + (steps.reshape(-1, 2) << DELTA_SHIFT), 0, _COORD_SCALE)
+				offset += KEYPOINT_COUNT * 2
+			else:
+				self._coords = np.frombuffer(data, dtype="<u2", count=KEYPOINT_COUNT * 2, offset=offset).astype(np.int32).reshape(-1, 2)
+				offset += KEYPOINT_COUNT * 4
+			scores = np.frombuffer(data, dtype=np.uint8, count=KEYPOINT_COUNT, offset=offset)
+			offset += KEYPOINT_COUNT
+			result["keypoints"] = [
+				{"x": x / _COORD_SCALE, "y": y / _COORD_SCALE, "score": s / _BYTE_SCALE}
+				for (x, y), s in zip(self._coords.tolist(), scores.tolist())
+			]
+		if flags & FLAG_PREDICTION:
+			index, n = data[offset], data[offset + 1]
+			probs = np.frombuffer(data, dtype=np.uint8, count=n, offset=offset + 2)
+			self.label = self.labels[index] if index < len(self.labels) else None
+			self.probabilities = (probs / _BYTE_SCALE).tolist()
+			offset += 2 + n
+		if flags & FLAG_TELEMETRY:
+			telemetry: Dict = {"seq": int(np.frombuffer(data, dtype="<u4", count=1, offset=offset)[0])}
+			times = np.frombuffer(data, dtype="<f8", count=len(TELEMETRY_FIELDS), offset=offset + 4)
+			for name, t in zip(TELEMETRY_FIELDS, times.tolist()):
+				telemetry[name] = None if np.isnan(t) else t
+			result["telemetry"] = telemetry
+		result["prediction_available"] = bool(flags & FLAG_PREDICTION_AVAILABLE)
+		if result["prediction_available"]:
+			result["label"] = self.label
+			result["all_probabilities"] = self.probabilities
+		return result
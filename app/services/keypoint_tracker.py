@@ -0,0 +1,151 @@
+import time
+import numpy as np
+import cv2
+from typing import Callable, List, Dict, Optional, Tuple
+
+
+class OneEuroFilter:
+	"""One-Euro low-pass filter, vectorised over an array of coordinates.
+
+	Smooths jitter at low speeds while keeping lag small during fast motion
+	(Casiez et al., 2012).
+	"""
+
+	def __init__(self, min_cutoff: float = 1.0, beta: float = 0.05, d_cutoff: float = 1.0):
+		self.min_cutoff = min_cutoff
+		self.beta = beta
+		self.d_cutoff = d_cutoff
+		self._x: Optional[np.ndarray] = None
+		self._dx: Optional[np.ndarray] = None
+		self._t: Optional[float] = None
+
+	@staticmethod
+	def _alpha(cutoff, dt: float):
+		tau = 1.0 / (2.0 * np.pi * cutoff)
+		return 1.0 / (1.0 + tau / dt)
+
+	def reset(self):
+		self._x = None
+		self._dx = None
+		self._t = None
+
+	def __call__(self, x: np.ndarray, t: float) -> np.ndarray:
+		if self._x is None or self._t is None or t <= self._t:
+			self._x = x.copy()
+			self._dx = np.zeros_like(x)
+			self._t = t
+			return x
+		dt = t - self._t
+		dx = (x - self._x) / dt
+		a_d = self._alpha(self.d_cutoff, dt)
+		self._dx = a_d * dx + (1.0 - a_d) * self._dx
+		cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+		a = self._alpha(cutoff, dt)
+		self._x = a * x + (1.0 - a) * self._x
+		self._t = t
+		return self._x.copy()
+
+
+class KeypointTracker:
+	"""Keyframe pose inference with Lucas-Kanade keypoint propagation.
+
+	The detector (MoveNet) runs on every ``keyframe_interval``-th frame, or
+	whenever optical-flow tracking quality drops below ``min_quality``. In
+	between, the 17 keypoints are carried forward with sparse pyramidal LK
+	flow. All output is smoothed with a One-Euro filter. Keypoints use the
+	detector's normalised ``{x, y, score}`` format relative to the frame.
+	"""
+
+	def __init__(
+		self,
+		detector: Callable[[np.ndarray], List[Dict]],
+		keyframe_interval: int = 3,
+		min_quality: float = 0.6,
+		min_score: float = 0.2,
+		score_decay: float = 0.97,
+	):
+		self.detector = detector
+		self.keyframe_interval = max(1, keyframe_interval)
+		self.min_quality = min_quality
+		self.min_score = min_score
+		self.score_decay = score_decay
+		self.filter = OneEuroFilter()
+		self._lk_params = dict(
+			winSize=(21, 21),
+			maxLevel=3,
+			criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+		)
+		self.reset()
+
+	def reset(self):
+		self._prev_gray: Optional[np.ndarray] = None
+		self._points: Optional[np.ndarray] = None  # (17, 2) pixel coordinates
+		self._scores: Optional[np.ndarray] = None  # (17,)
+		self._since_keyframe = 0
+		self.filter.reset()
+		self.keyframes = 0
+		self.tracked_frames = 0
+
+	@staticmethod
+	def _to_gray(frame: np.ndarray) -> np.ndarray:
+		if frame.ndim == 3:
+			return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+		return frame
+
+	def _detect(self, frame: np.ndarray, gray: np.ndarray) -> bool:
+		poses = self.detector(frame)
+		if len(poses) != 17:
+			self._points = None
+			self._scores = None
+			return False
+		h, w = gray.shape[:2]
+		self._points = np.array([[kp["x"] * w, kp["y"] * h] for kp in poses], dtype=np.float32)
+		self._scores = np.array([kp["score"] for kp in poses], dtype=np.float32)
+		self._since_keyframe = 0
+		self.keyframes += 1
+		return True
+
+	def _track(self, gray: np.ndarray) -> float:
+		"""Propagate keypoints with LK flow; returns the fraction of confident points kept."""
+		p0 = self._points.reshape(-1, 1, 2)
+		p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, p0, None, **self._lk_params)
+		if p1 is None:
+			return 0.0
+		status = status.reshape(-1).astype(bool)
+		h, w = gray.shape[:2]
+		p1 = p1.reshape(-1, 2)
+		inside = (p1[:, 0] >= 0) & (p1[:, 0] < w) & (p1[:, 1] >= 0) & (p1[:, 1] < h)
+		ok = status & inside
+		self._points[ok] = p1[ok]
+		self._scores[ok] *= self.score_decay
+		self._scores[~ok] *= 0.5
+		confident = self._scores >= self.min_score
+		if not confident.any():
+			return 0.0
+		self._since_keyframe += 1
+		self.tracked_frames += 1
+		return float(ok[confident].mean())
+
+	def process(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Tuple[List[Dict], bool]:
+		"""Return (keypoints, is_keyframe) for the next frame of the stream."""
+		gray = self._to_gray(frame)
+		keyframe = (
+			self._points is None
+			or self._prev_gray is None
+			or self._prev_gray.shape != gray.shape
+			or self._since_keyframe + 1 >= self.keyframe_interval
+		)
+		if not keyframe and self._track(gray) < self.min_quality:
+			keyframe = True
+		if keyframe and not self._detect(frame, gray):
+			self._prev_gray = gray
+			self.filter.reset()
+			return [], True
+		self._prev_gray = gray
+
+		h, w = gray.shape[:2]
+		smoothed = self.filter(self._points, time.monotonic() if timestamp is None else timestamp)
+		return [
+			{"x": float(x / w), "y": float(y / h), "score": float(s)}
+			for (x, y), s in zip(smoothed, self._scores)
+		], keyframe
@@ -0,0 +1,17 @@
+import os
+
+# Kept free of TensorFlow imports so web workers can use the labels without loading models
+
+
+def load_labels():
+    labels_path = os.path.join(os.path.dirname(__file__), "..", "models", "pose_labels.txt")
+    try:
+        with open(labels_path, 'r') as f:
+            labels = [line.strip() for line in f.readlines()]
+        print(f"[LSTM] Loaded labels: {labels}")
+        return labels
+    except Exception as e:
+        print(f"[LSTM] Could not load labels, using default: {e}")
+        return ["chair", "cobra", "dog", "tree", "warrior"]
+
+LABELS = load_labels()
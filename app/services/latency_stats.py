@@ -0,0 +1,111 @@
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Per-connection latency components (milliseconds)
+#   uplink:    server receive - client capture (includes client/server clock offset)
+#   queue:     inference start - server receive
+#   inference: inference end - inference start
+#   server:    server send - server receive
+#   e2e:       end-to-end capture-to-display latency reported back by the client
+LATENCY_COMPONENTS = ("uplink", "queue", "inference", "server", "e2e")
+
+
+def finite_number(value: Any) -> Optional[float]:
+	"""Client-supplied timestamp/latency as a float, or None unless it is a finite number.
+
+	json.loads accepts NaN and Infinity, and bools are ints in Python; neither
+	may be echoed back (browsers reject non-standard JSON) or reach the stats.
+	"""
+	if isinstance(value, bool) or not isinstance(value, (int, float)):
+		return None
+	value = float(value)
+	return value if math.isfinite(value) else None
+
+
+def client_seq(value: Any) -> Optional[int]:
+	"""Client frame sequence number, or None unless it is a plain int."""
+	if isinstance(value, bool) or not isinstance(value, int):
+		return None
+	return value
+
+
+class ConnectionStats:
+	"""Rolling latency samples for one realtime connection."""
+
+	def __init__(self, connection_id: int, patient_id: Optional[int], exercise_name: str, window: int = 500):
+		self.connection_id = connection_id
+		self.patient_id = patient_id
+		self.exercise_name = exercise_name
+		self.connected_at = time.time()
+		self.frames = 0
+		self.extra: Dict[str, float] = {}
+		self._samples = {name: deque(maxlen=window) for name in LATENCY_COMPONENTS}
+		self._lock = threading.Lock()
+
+	def record(self, **latencies_ms: Optional[float]):
+		with self._lock:
+			self.frames += 1
+			for name, value in latencies_ms.items():
+				# Non-finite samples would make the percentiles (and the admin JSON) NaN
+				if value is not None and math.isfinite(value):
+					self._samples[name].append(float(value))
+
+	def summary(self) -> Dict:
+		with self._lock:
+			samples = {name: list(values) for name, values in self._samples.items()}
+			frames = self.frames
+		percentiles = {}
+		for name, values in samples.items():
+			if not values:
+				continue
+			p50, p95, p99 = np.percentile(values, [50, 95, 99])
+			percentiles[name] = {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2), "samples": len(values)}
+		return {
+			"connection_id": self.connection_id,
+			"patient_id": self.patient_id,
+			"exercise_name": self.exercise_name,
+			"connected_at": self.connected_at,
+			"frames": frames,
+			"latency_ms": percentiles,
+			**self.extra,
+		}
+
+
+class ConnectionRegistry:
+	"""Live realtime connections, for the admin latency endpoint."""
+
+	def __init__(self):
+		self._connections: Dict[int, ConnectionStats] = {}
+		self._ids = itertools.count(1)
+		self._lock = threading.Lock()
+
+	def open(self, patient_id: Optional[int], exercise_name: str, window: int = 500) -> ConnectionStats:
+		stats = ConnectionStats(next(self._ids), patient_id, exercise_name, window)
+		with self._lock:
+			self._connections[stats.connection_id] = stats
+		return stats
+
+	def close(self, stats: ConnectionStats):
+		with self._lock:
+			self._connections.pop(stats.connection_id, None)
+
+	def get(self, connection_id: int) -> Optional[ConnectionStats]:
+		with self._lock:
+			return self._connections.get(connection_id)
+
+	def all(self) -> List[ConnectionStats]:
+		with self._lock:
+			return list(self._connections.values())
+
+
+connection_registry = ConnectionRegistry()
+
+
+def get_connection_registry() -> ConnectionRegistry:
+	return connection_registry
@@ -1,23 +1,13 @@
 from app.services.database_service import DatabaseService
-from typing import List, Dict, Tuple
+from collections import deque
+from typing import List, Dict, Tuple, Optional
 import os
 import numpy as np
 import tensorflow as tf
 from app.config import settings
 
 # Load labels from your trained model
-def load_labels():
-    labels_path = os.path.join(os.path.dirname(__file__), "..", "models", "pose_labels.txt")
-    try:
-        with open(labels_path, 'r') as f:
-            labels = [line.strip() for line in f.readlines()]
-        print(f"[LSTM] Loaded labels: {labels}")
-        return labels
-    except Exception as e:
-        print(f"[LSTM] Could not load labels, using default: {e}")
-        return ["chair", "cobra", "dog", "tree", "warrior"]
-
-LABELS = load_labels()
+from app.services.labels import LABELS, load_labels
 
 # Custom layer registration for the H5 model
 try:
@@ -76,19 +66,185 @@ def _poses_to_array(poses: List[List[Dict]], target_features: int = 51) -> np.nd
     return np.asarray(frames, dtype=np.float32)
 
 
+def _np_activation(name: Optional[str]):
+    # Numpy versions of the Keras activations used by our models, so a single
+    # recurrent step does not pay the per-call overhead of model.predict.
+    if name in (None, "linear"):
+        return lambda x: x
+    if name == "relu":
+        return lambda x: np.maximum(x, 0.0)
+    if name == "relu6":
+        return lambda x: np.clip(x, 0.0, 6.0)
+    if name == "tanh":
+        return np.tanh
+    if name == "sigmoid":
+        return lambda x: 1.0 / (1.0 + np.exp(-x))
+    if name == "hard_sigmoid":
+        return lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0)
+    if name == "softmax":
+        def softmax(x):
+            e = np.exp(x - np.max(x))
+            return e / np.sum(e)
+        return softmax
+    raise ValueError(f"Unsupported activation for streaming: {name}")
+
+
+class StreamState:
+    """Recurrent state for one realtime stream (e.g. one WebSocket connection).
+
+    Holds one (h, c) pair per LSTM layer, or a bounded frame window when the
+    model cannot be stepped, so memory stays constant for the whole stream.
+    """
+
+    def __init__(self, layer_units: List[int], window: int = 1):
+        self.states = [
+            (np.zeros(units, dtype=np.float32), np.zeros(units, dtype=np.float32))
+            for units in layer_units
+        ]
+        self.window = deque(maxlen=max(1, window))
+        self.steps = 0
+
+    def reset(self):
+        for h, c in self.states:
+            h.fill(0.0)
+            c.fill(0.0)
+        self.window.clear()
+        self.steps = 0
+
+
 class LSTMClassifier:
     def __init__(self):
         print("[LSTM] Initializing LSTM classifier with your trained H5 model...")
         self.model = None
         self.expected_features = 34  # Based on your model structure (17 keypoints * 2 = 34)
+        self.recurrent = False
+        self.sequence_length: Optional[int] = None
+        self._step_plan: Optional[List[Tuple]] = None
         
-        # Try to load the real H5 model
+        # Prefer a real recurrent model if one is provided, then the single-frame H5 model
+        try:
+            self._load_recurrent_model()
+            print("[LSTM] SUCCESS: Recurrent LSTM model loaded successfully!")
+            return
+        except Exception as e:
+            print(f"[LSTM] No recurrent model available: {e}")
         try:
             self._load_h5_model()
             print("[LSTM] SUCCESS: Your trained H5 model loaded successfully!")
         except Exception as e:
             print(f"[LSTM] WARNING: Could not load real model, using mock: {e}")
             print("[LSTM] Mock LSTM classifier ready!")
+
+    def _load_recurrent_model(self):
+        """Load a sequence model (containing LSTM layers) from settings.lstm_model_path"""
+        model_path = settings.lstm_model_path
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Recurrent model not found: {model_path}")
+
+        model = tf.keras.models.load_model(
+            model_path,
+            custom_objects={"NormalizationLayer": NormalizationLayer},
+            compile=False,
+        )
+        if not any(isinstance(layer, tf.keras.layers.LSTM) for layer in model.layers):
+            raise ValueError(f"{model_path} has no LSTM layer")
+
+        self.model = model
+        self.recurrent = True
+        self.expected_features = int(model.input_shape[-1])
+        self.sequence_length = model.input_shape[1]
+        self._step_plan = self._build_step_plan()
+        print(f"[LSTM] Recurrent model input shape: {model.input_shape}")
+        print(f"[LSTM] Incremental streaming: {'enabled' if self._step_plan else 'windowed fallback'}")
+
+    def _build_step_plan(self) -> Optional[List[Tuple]]:
+        """Translate the model into per-step numpy ops; None if it cannot be stepped."""
+        plan: List[Tuple] = []
+        lstm_index = 0
+        for layer in self.model.layers:
+            if isinstance(layer, (tf.keras.layers.InputLayer, tf.keras.layers.Dropout)):
+                continue
+            if isinstance(layer, tf.keras.layers.LSTM):
+                config = layer.get_config()
+                if config.get("go_backwards") or config.get("stateful"):
+                    return None
+                kernel, recurrent_kernel, bias = (w.astype(np.float32) for w in layer.get_weights())
+                plan.append((
+                    "lstm",
+                    lstm_index,
+                    kernel,
+                    recurrent_kernel,
+                    bias,
+                    _np_activation(config.get("activation", "tanh")),
+                    _np_activation(config.get("recurrent_activation", "sigmoid")),
+                ))
+                lstm_index += 1
+            elif isinstance(layer, tf.keras.layers.Dense):
+                kernel, bias = (w.astype(np.float32) for w in layer.get_weights())
+                plan.append(("dense", kernel, bias, _np_activation(layer.get_config().get("activation"))))
+            elif isinstance(layer, NormalizationLayer):
+                plan.append(("l2norm",))
+            elif isinstance(layer, (tf.keras.layers.Bidirectional, tf.keras.layers.RNN)):
+                # Bidirectional/other recurrent layers need the whole window
+                return None
+            else:
+                plan.append(("layer", layer))
+        return plan
+
+    def new_stream(self) -> StreamState:
+        """Create the per-stream state used by predict_step."""
+        units = [op[3].shape[0] for op in (self._step_plan or []) if op[0] == "lstm"]
+        return StreamState(units, window=self.sequence_length or 32)
+
+    def _decode(self, probs: np.ndarray):
+        label_idx = int(np.argmax(probs))
+        label = LABELS[label_idx] if label_idx < len(LABELS) else str(label_idx)
+        return label, float(probs[label_idx]), probs.tolist()
+
+    def _step(self, state: StreamState, x: np.ndarray) -> np.ndarray:
+        for op in self._step_plan:
+            kind = op[0]
+            if kind == "lstm":
+                _, idx, kernel, recurrent_kernel, bias, act, rec_act = op
+                h, c = state.states[idx]
+                units = h.shape[0]
+                z = x @ kernel + h @ recurrent_kernel + bias
+                i = rec_act(z[:units])
+                f = rec_act(z[units:2 * units])
+                g = act(z[2 * units:3 * units])
+                o = rec_act(z[3 * units:])
+                c[:] = f * c + i * g
+                h[:] = o * act(c)
+                x = h
+            elif kind == "dense":
+                _, kernel, bias, act = op
+                x = act(x @ kernel + bias)
+            elif kind == "l2norm":
+                x = x / max(float(np.linalg.norm(x)), 1e-12)
+            else:
+                x = np.asarray(op[1](x[None, :]))[0]
+        return x
+
+    def predict_step(self, state: StreamState, frame: List[Dict]):
+        """Advance one stream by a single frame and return (label, confidence, probabilities).
+
+        With a steppable recurrent model each call costs one recurrent step
+        instead of re-evaluating the whole window.
+        """
+        if not self.recurrent:
+            return self.predict_sequence([frame])
+
+        features = _poses_to_array([frame], target_features=self.expected_features)[0]
+        state.steps += 1
+        try:
+            if self._step_plan is not None:
+                return self._decode(self._step(state, features))
+            state.window.append(features)
+            arr = np.asarray(state.window, dtype=np.float32)[None, ...]
+            return self._decode(self.model.predict(arr, verbose=0)[0])
+        except Exception as e:
+            print(f"[LSTM] Error during streaming prediction: {e}")
+            return "unknown", 0.0, [0.2, 0.2, 0.2, 0.2, 0.2]
     
     def _load_h5_model(self):
         """Load your trained H5 model"""
@@ -153,9 +309,19 @@ class LSTMClassifier:
             confidence = random.uniform(0.6, 0.95)
             return label, confidence, [0.2, 0.2, 0.2, 0.2, 0.2]
         
-        # For single-frame model, use the most recent frame
         if not poses:
             return "unknown", 0.0, [0.2, 0.2, 0.2, 0.2, 0.2]
+
+        if self.recurrent:
+            window = poses[-self.sequence_length:] if self.sequence_length else poses
+            arr = _poses_to_array(window, target_features=self.expected_features)[None, ...]
+            try:
+                return self._decode(self.model.predict(arr, verbose=0)[0])
+            except Exception as e:
+                print(f"[LSTM] Error during sequence prediction: {e}")
+                return "unknown", 0.0, [0.2, 0.2, 0.2, 0.2, 0.2]
+
+        # For single-frame model, use the most recent frame
         
         # Use the last frame for prediction
         last_frame = poses[-1]
@@ -180,7 +346,13 @@ class LSTMClassifier:
             confidence = random.uniform(0.6, 0.95)
             return label, confidence, [0.2, 0.2, 0.2, 0.2, 0.2]
 
-    def predict_per_frame(self, poses: List[List[Dict]]):
+    def predict_per_frame(self, poses: List[List[Dict]], state: Optional[StreamState] = None, offset: int = 0):
+        """Per-frame predictions; frame_index counts from ``offset``.
+
+        A long video can be classified in chunks: pass the same ``state``
+        (from new_stream) and the chunk's first frame index to each call so
+        recurrent models carry their state across chunk boundaries.
+        """
         if self.model is None:
             # Mock prediction for demo
             import random
@@ -189,12 +361,22 @@ class LSTMClassifier:
                 label = random.choice(LABELS)
                 confidence = random.uniform(0.6, 0.95)
                 preds.append({
-                    "frame_index": t,
+                    "frame_index": offset + t,
                     "label": label,
                     "confidence": confidence
                 })
             return preds
         
+        if self.recurrent:
+            # One recurrent step per frame: the prediction after frame t sees frames 0..t
+            if state is None:
+                state = self.new_stream()
+            preds = []
+            for t, frame in enumerate(poses):
+                label, confidence, _ = self.predict_step(state, frame)
+                preds.append({"frame_index": offset + t, "label": label, "confidence": confidence})
+            return preds
+
         # For single-frame model, predict each frame individually
         preds = []
         for t, frame in enumerate(poses):
@@ -211,7 +393,7 @@ class LSTMClassifier:
                 confidence = float(probs[label_idx])
                 
                 preds.append({
-                    "frame_index": t,
+                    "frame_index": offset + t,
                     "label": LABELS[label_idx],
                     "confidence": confidence
                 })
@@ -222,8 +404,19 @@ class LSTMClassifier:
                 label = random.choice(LABELS)
                 confidence = random.uniform(0.6, 0.95)
                 preds.append({
-                    "frame_index": t,
+                    "frame_index": offset + t,
                     "label": label,
                     "confidence": confidence
                 })
-        return preds
\ No newline at end of file
+        return preds
+
+
+_lstm_classifier = None
+
+
+def get_lstm_classifier() -> LSTMClassifier:
+    """Process-wide classifier shared by realtime and batch routes"""
+    global _lstm_classifier
+    if _lstm_classifier is None:
+        _lstm_classifier = LSTMClassifier()
+    return _lstm_classifier
@@ -0,0 +1,186 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Minimal in-process metrics with Prometheus text exposition (format 0.0.4).
+# Kept dependency-free so the hot path only takes a lock and adds a float.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+	return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+	pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+	if extra is not None:
+		pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+	if value == float("inf"):
+		return "+Inf"
+	return repr(float(value))
+
+
+class _Metric(ABC):
+	kind = "untyped"
+
+	def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._lock = threading.Lock()
+		self._values: Dict[Tuple[str, ...], object] = {}
+
+	def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+		if set(labels) != set(self.labelnames):
+			raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+		return tuple(str(labels[n]) for n in self.labelnames)
+
+	@abstractmethod
+	def _samples(self) -> List[str]:
+		"""Exposition lines for every label set"""
+
+	def render(self) -> str:
+		lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+		lines.extend(self._samples())
+		return "\n".join(lines)
+
+
+class Counter(_Metric):
+	kind = "counter"
+
+	def inc(self, amount: float = 1.0, **labels):
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def value(self, **labels) -> float:
+		return self._values.get(self._key(labels), 0.0)
+
+	def _samples(self) -> List[str]:
+		with self._lock:
+			items = list(self._values.items())
+		return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+	kind = "gauge"
+
+	def set(self, value: float, **labels):
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = float(value)
+
+	def dec(self, amount: float = 1.0, **labels):
+		self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+	kind = "histogram"
+
+	def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+		super().__init__(name, documentation, labelnames)
+		self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+	def observe(self, value: float, **labels):
+		key = self._key(labels)
+		with self._lock:
+			state = self._values.get(key)
+			if state is None:
+				state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+			counts = state[0]
+			for i, bound in enumerate(self.buckets):
+				if value <= bound:
+					counts[i] += 1
+					break
+			state[1] += value
+			state[2] += 1
+
+	@contextmanager
+	def time(self, **labels):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(time.perf_counter() - start, **labels)
+
+	def _samples(self) -> List[str]:
+		with self._lock:
+			items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+		lines = []
+		for key, (counts, total, count) in items:
+			cumulative = 0
+			for bound, c in zip(self.buckets, counts):
+				cumulative += c
+				le = ("le", "+Inf" if bound == float("inf") else repr(bound))
+				lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+			lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+			lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+		return lines
+
+
+class Registry:
+	def __init__(self):
+		self._metrics: Dict[str, _Metric] = {}
+		self._lock = threading.Lock()
+
+	def register(self, metric: _Metric) -> _Metric:
+		with self._lock:
+			existing = self._metrics.get(metric.name)
+			if existing is not None:
+				return existing
+			self._metrics[metric.name] = metric
+		return metric
+
+	def render(self) -> str:
+		with self._lock:
+			metrics = list(self._metrics.values())
+		return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+	return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+	return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+	return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Inference pipeline
+STAGE_SECONDS = histogram(
+	"rehab_inference_stage_seconds",
+	"Time spent per realtime pipeline stage",
+	("stage",),
+)
+FRAMES_IN = counter("rehab_frames_received_total", "Frames received from clients", ("transport",))
+FRAMES_OUT = counter("rehab_frames_sent_total", "Responses sent to clients", ("transport",))
+WS_CONNECTIONS = gauge("rehab_ws_active_connections", "Open realtime WebSocket connections")
+
+# Persistence
+DB_WRITE_SECONDS = histogram("rehab_db_write_seconds", "Latency of write-behind group commits")
+DB_ROWS_WRITTEN = counter("rehab_db_rows_written_total", "Realtime prediction rows committed")
+DB_ROWS_DROPPED = counter("rehab_db_rows_dropped_total", "Realtime prediction rows dropped (queue full or commit failure)")
+
+
+def time_stage(stage: str):
+	"""Context manager timing one pipeline stage into STAGE_SECONDS."""
+	return STAGE_SECONDS.time(stage=stage)
+
+
+def render_latest() -> str:
+	return REGISTRY.render()
@@ -0,0 +1,28 @@
+"""Choose in-process models or the shared inference server.
+
+With ``INFERENCE_SERVER_ADDRESS`` unset the models are loaded in this
+process as before. When it is set, each web worker connects to a single
+``python -m app.inference_server`` process instead, so N workers share one
+copy of the models and frames are passed through shared memory.
+"""
+from app.config import settings
+
+
+def remote_inference_enabled() -> bool:
+	return bool(settings.inference_server_address)
+
+
+def get_movenet():
+	if remote_inference_enabled():
+		from app.services.remote_inference import RemoteMoveNet, get_inference_client
+		return RemoteMoveNet(get_inference_client())
+	from app.services.movenet_service import get_movenet_service
+	return get_movenet_service()
+
+
+def get_classifier():
+	if remote_inference_enabled():
+		from app.services.remote_inference import RemoteClassifier, get_inference_client
+		return RemoteClassifier(get_inference_client())
+	from app.services.lstm_service import get_lstm_classifier
+	return get_lstm_classifier()
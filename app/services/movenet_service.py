@@ -9,6 +9,9 @@ import cv2
 from typing import List, Dict, Tuple, Optional
 
 from app.config import settings
+from app.services.inference_executor import configure_tensorflow_threads
+
+configure_tensorflow_threads()
 
 
 class MoveNetService:
@@ -43,17 +46,50 @@ class MoveNetService:
 			print(f"MoveNet error: {e}")
 			return []
 
-	def process_video(self, video_path: str, stride: int = 1) -> List[List[Dict]]:
-		cap = cv2.VideoCapture(video_path)
+	def lease_frame_buffer(self) -> np.ndarray:
+		"""Decode target for one realtime stream (shared memory when using the inference server)"""
+		return np.empty((256, 256, 3), dtype=np.uint8)
+
+	def release_frame_buffer(self, frame: np.ndarray):
+		pass
+
+	def process_video_batch(self, cap, max_frames: int, stride: int = 1, frame_index: int = 0) -> Tuple[List[List[Dict]], int, bool]:
+		"""Detect keypoints on up to max_frames sampled frames of an open capture.
+
+		Returns (poses, next_frame_index, finished) so a long video can be
+		scheduled as a series of short jobs.
+		"""
 		poses: List[List[Dict]] = []
-		frame_index = 0
-		while True:
+		while len(poses) < max_frames:
 			ret, frame = cap.read()
 			if not ret:
-				break
+				return poses, frame_index, True
 			if frame_index % stride == 0:
 				poses.append(self.detect_keypoints(frame))
 			frame_index += 1
-		cap.release()
+		return poses, frame_index, False
+
+	def process_video(self, video_path: str, stride: int = 1) -> List[List[Dict]]:
+		cap = cv2.VideoCapture(video_path)
+		poses: List[List[Dict]] = []
+		frame_index = 0
+		finished = False
+		try:
+			while not finished:
+				batch, frame_index, finished = self.process_video_batch(cap, 64, stride, frame_index)
+				poses.extend(batch)
+		finally:
+			cap.release()
 		return poses
 
+
+_movenet_service: Optional[MoveNetService] = None
+
+
+def get_movenet_service() -> MoveNetService:
+	"""Process-wide MoveNetService shared by realtime and batch routes"""
+	global _movenet_service
+	if _movenet_service is None:
+		_movenet_service = MoveNetService()
+	return _movenet_service
+
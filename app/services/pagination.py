@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+	"""Opaque keyset cursor: the sort key of the last row returned, tagged with the list it belongs to"""
+	key = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+	raw = json.dumps({"k": kind, "v": key}, separators=(",", ":")).encode()
+	return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(kind: str, token: Optional[str], types: Sequence[type]) -> Optional[List[Any]]:
+	"""Inverse of encode_cursor, checking the key against ``types`` (int, str or datetime).
+
+	Raises ValueError for malformed cursors or cursors from another list.
+	"""
+	if not token:
+		return None
+	try:
+		raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+		payload = json.loads(raw)
+		kind_of_cursor = payload["k"]
+		values = list(payload["v"])
+	except (ValueError, KeyError, TypeError) as e:
+		raise ValueError(f"invalid cursor: {e}")
+	if kind_of_cursor != kind:
+		raise ValueError("cursor belongs to a different list")
+	if len(values) != len(types):
+		raise ValueError("invalid cursor: wrong key length")
+	try:
+		for i, expected in enumerate(types):
+			if expected is datetime:
+				values[i] = datetime.fromisoformat(values[i])
+			elif not isinstance(values[i], expected) or isinstance(values[i], bool):
+				raise TypeError(f"expected {expected.__name__}")
+	except (ValueError, TypeError) as e:
+		raise ValueError(f"invalid cursor: {e}")
+	return values
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Optional
+
+from app.config import settings
+from app.services.metrics import counter, gauge
+
+ADMISSIONS = counter("rehab_realtime_admissions_total", "Realtime stream admission decisions", ("result",))
+STREAMS_ACTIVE = gauge("rehab_realtime_streams_admitted", "Realtime streams currently holding an admission slot")
+STREAMS_WAITING = gauge("rehab_realtime_streams_waiting", "Realtime streams queued for an admission slot")
+STREAM_LIMIT = gauge("rehab_realtime_streams_limit", "Configured cap on concurrent realtime streams")
+RATE_LIMITED = counter("rehab_realtime_rate_limited_total", "Realtime messages dropped by per-connection limits", ("limit",))
+
+
+class TokenBucket:
+	"""Classic token bucket: refills at ``rate`` per second up to ``burst``."""
+
+	def __init__(self, rate: float, burst: float):
+		self.rate = rate
+		self.burst = burst
+		self.tokens = burst
+		self._last = time.monotonic()
+
+	def _refill(self, now: float):
+		self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+		self._last = now
+
+	def consume(self, amount: float = 1.0, now: Optional[float] = None) -> bool:
+		if self.rate <= 0:
+			return True  # unlimited
+		self._refill(time.monotonic() if now is None else now)
+		if self.tokens >= amount:
+			self.tokens -= amount
+			return True
+		return False
+
+	def retry_after(self, amount: float = 1.0) -> float:
+		"""Seconds until ``amount`` tokens will be available."""
+		if self.rate <= 0:
+			return 0.0
+		return max(0.0, (amount - self.tokens) / self.rate)
+
+
+class ConnectionLimiter:
+	"""Per-connection frames/s and bytes/s limits plus a per-message size cap."""
+
+	def __init__(self, max_fps: float, burst_frames: float, max_bytes_per_s: float, max_message_bytes: int):
+		self.frames = TokenBucket(max_fps, max(1.0, burst_frames))
+		# Allow one full-size message as burst so a single large frame is never starved
+		self.bytes = TokenBucket(max_bytes_per_s, max(max_bytes_per_s, max_message_bytes))
+		self.max_message_bytes = max_message_bytes
+
+	def check(self, nbytes: int) -> Optional[str]:
+		"""Return the violated limit ("message_size", "fps", "bytes") or None if allowed."""
+		if self.max_message_bytes > 0 and nbytes > self.max_message_bytes:
+			RATE_LIMITED.inc(limit="message_size")
+			return "message_size"
+		if not self.frames.consume(1.0):
+			RATE_LIMITED.inc(limit="fps")
+			return "fps"
+		if not self.bytes.consume(nbytes):
+			# Give back the frame token: the frame was not admitted
+			self.frames.tokens += 1.0
+			RATE_LIMITED.inc(limit="bytes")
+			return "bytes"
+		return None
+
+	def retry_after(self, limit: str, nbytes: int = 0) -> float:
+		"""Seconds until a message of ``nbytes`` would pass the violated limit"""
+		if limit == "fps":
+			return self.frames.retry_after()
+		if limit == "bytes":
+			return self.bytes.retry_after(nbytes)
+		return 0.0
+
+
+class AdmissionController:
+	"""Global cap on concurrent realtime streams.
+
+	A new stream takes a slot immediately if one is free, otherwise waits up
+	to ``wait_timeout`` seconds in FIFO order before being rejected.
+	"""
+
+	def __init__(self, max_streams: int, wait_timeout: float):
+		self.max_streams = max_streams
+		self.wait_timeout = wait_timeout
+		self._active = 0
+		self._waiting = 0
+		self._condition: Optional[asyncio.Condition] = None
+		STREAM_LIMIT.set(max_streams)
+
+	@property
+	def waiting(self) -> int:
+		return self._waiting
+
+	def would_queue(self) -> bool:
+		return not self._has_slot() or self._waiting > 0
+
+	def _has_slot(self) -> bool:
+		return self.max_streams <= 0 or self._active < self.max_streams
+
+	async def acquire(self) -> bool:
+		if self._condition is None:
+			self._condition = asyncio.Condition()
+		async with self._condition:
+			if self._has_slot() and self._waiting == 0:
+				result = "admitted"
+			else:
+				self._waiting += 1
+				STREAMS_WAITING.inc()
+				try:
+					await asyncio.wait_for(self._condition.wait_for(self._has_slot), self.wait_timeout)
+					result = "queued"
+				except asyncio.TimeoutError:
+					ADMISSIONS.inc(result="rejected")
+					return False
+				finally:
+					self._waiting -= 1
+					STREAMS_WAITING.dec()
+			self._active += 1
+			STREAMS_ACTIVE.inc()
+			ADMISSIONS.inc(result=result)
+			return True
+
+	async def release(self):
+		async with self._condition:
+			self._active -= 1
+			STREAMS_ACTIVE.dec()
+			self._condition.notify()
+
+
+admission_controller = AdmissionController(
+	max_streams=settings.realtime_max_streams,
+	wait_timeout=settings.realtime_admission_wait_s,
+)
+
+
+def get_admission_controller() -> AdmissionController:
+	return admission_controller
+
+
+def connection_limiter() -> ConnectionLimiter:
+	"""A fresh limiter configured from settings, one per connection."""
+	return ConnectionLimiter(
+		max_fps=settings.realtime_max_fps,
+		burst_frames=settings.realtime_burst_frames,
+		max_bytes_per_s=settings.realtime_max_bytes_per_s,
+		max_message_bytes=settings.realtime_max_message_bytes,
+	)
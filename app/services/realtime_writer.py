@@ -0,0 +1,233 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import DB_ROWS_DROPPED, DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from app.database import SessionLocal
+from app.models import Session as DbSession, ExerciseResult
+from app.services.response_cache import invalidate_patient
+from app.services.rollups import apply_results
+
+
+class RealtimeSession:
+    """Handle for a realtime session; its database id is assigned by the writer thread."""
+
+    __slots__ = ("patient_id", "exercise_name", "started_at", "session_id", "frame_index")
+
+    def __init__(self, patient_id: Optional[int], exercise_name: str):
+        self.patient_id = patient_id
+        self.exercise_name = exercise_name
+        self.started_at = datetime.utcnow()
+        self.session_id: Optional[int] = None
+        self.frame_index = 0
+
+
+class RealtimeWriter:
+    """Write-behind queue for realtime predictions.
+
+    The WebSocket loop only enqueues; a background thread group-commits
+    queued rows every ``batch_size`` rows or ``flush_interval_ms``
+    milliseconds, whichever comes first. Operations are applied in order, so
+    a session is always inserted before its results and closed after them.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+        max_queue: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.commits = 0
+
+    def start(self):
+        with self._lock:
+            self._stopped = False
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        # Caller holds self._lock
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="realtime-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._stopped = True
+        if thread is None:
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+
+    def flush(self, timeout: float = 10.0):
+        """Block until every operation enqueued so far has been committed."""
+        done = threading.Event()
+        self._put(("barrier", done), block=True)
+        done.wait(timeout)
+
+    def _put(self, op: Tuple, block: bool = False):
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                self._ensure_thread()
+        if stopped:
+            # Shut down: never restart the thread behind stop()'s back
+            self._drop(op)
+            return
+        try:
+            self._queue.put(op, block=block)
+        except queue.Full:
+            self._drop(op)
+
+    def _drop(self, op: Tuple):
+        if op[0] == "barrier":
+            op[1].set()
+        elif op[0] == "result":
+            self.rows_dropped += 1
+            DB_ROWS_DROPPED.inc()
+
+    def open_session(self, patient_id: Optional[int], exercise_name: str) -> RealtimeSession:
+        handle = RealtimeSession(patient_id, exercise_name)
+        # Session rows must never be dropped, or all their results would be lost
+        self._put(("open", handle), block=True)
+        return handle
+
+    def add_prediction(self, handle: RealtimeSession, label: str, confidence: float, keypoints: List[Dict]):
+        row = {
+            "frame_index": handle.frame_index,
+            "predicted_label": label,
+            "confidence": float(confidence),
+            "pose_keypoints": keypoints,
+            "timestamp": datetime.utcnow(),
+        }
+        handle.frame_index += 1
+        self._put(("result", handle, row))
+
+    def close_session(self, handle: RealtimeSession):
+        self._put(("close", handle, datetime.utcnow()), block=True)
+
+    def _run(self):
+        pending: List[Tuple] = []
+        rows = 0
+        deadline: Optional[float] = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                op = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                op = None
+            if op is self._STOP:
+                stopping = True
+            elif op is not None:
+                pending.append(op)
+                rows += op[0] == "result"
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            due = deadline is not None and time.monotonic() >= deadline
+            barrier = pending and pending[-1][0] == "barrier"
+            if pending and (stopping or due or barrier or rows >= self.batch_size):
+                self._commit(pending)
+                pending = []
+                rows = 0
+                deadline = None
+
+    def _commit(self, ops: List[Tuple]):
+        db = self.session_factory()
+        barriers = []
+        opened: List[RealtimeSession] = []
+        written = 0
+        patients = set()
+        rollup_rows: Dict[int, Tuple[Optional[int], List[Tuple]]] = {}
+        start = time.perf_counter()
+        try:
+            for op in ops:
+                kind = op[0]
+                if kind == "open":
+                    handle = op[1]
+                    session = DbSession(
+                        patient_id=handle.patient_id,
+                        exercise_name=handle.exercise_name,
+                        video_path="realtime",
+                        started_at=handle.started_at,
+                        status="in_progress",
+                    )
+                    db.add(session)
+                    db.flush()
+                    handle.session_id = session.id
+                    opened.append(handle)
+                    patients.add(handle.patient_id)
+                elif kind == "result":
+                    handle, row = op[1], op[2]
+                    if handle.session_id is None:
+                        continue
+                    db.add(ExerciseResult(session_id=handle.session_id, exercise_name=handle.exercise_name, **row))
+                    patients.add(handle.patient_id)
+                    rollup_rows.setdefault(handle.session_id, (handle.patient_id, []))[1].append(
+                        (row["predicted_label"], row["confidence"], row["timestamp"])
+                    )
+                    written += 1
+                elif kind == "close":
+                    handle, completed_at = op[1], op[2]
+                    if handle.session_id is None:
+                        continue
+                    session = db.get(DbSession, handle.session_id)
+                    if session is not None:
+                        session.completed_at = completed_at
+                        session.duration_seconds = int((completed_at - handle.started_at).total_seconds())
+                        session.status = "completed"
+                        patients.add(handle.patient_id)
+                elif kind == "barrier":
+                    barriers.append(op[1])
+            # Rollups commit atomically with the rows they summarise
+            for session_id, (patient_id, rows) in rollup_rows.items():
+                apply_results(db, session_id, patient_id, rows)
+            db.commit()
+            DB_WRITE_SECONDS.observe(time.perf_counter() - start)
+            self.commits += 1
+            self.rows_written += written
+            DB_ROWS_WRITTEN.inc(written)
+            for patient_id in patients:
+                invalidate_patient(patient_id)
+        except Exception as e:
+            db.rollback()
+            # The flushed session ids were rolled back too; later results of
+            # these handles are skipped rather than written against missing rows
+            for handle in opened:
+                handle.session_id = None
+            self.rows_dropped += written
+            DB_ROWS_DROPPED.inc(written)
+            print(f"[REALTIME] Write-behind commit failed: {e}")
+        finally:
+            db.close()
+            for done in barriers:
+                done.set()
+
+
+realtime_writer = RealtimeWriter(
+    batch_size=settings.realtime_write_batch_size,
+    flush_interval_ms=settings.realtime_write_flush_ms,
+    max_queue=settings.realtime_write_queue_size,
+)
+
+
+def get_realtime_writer() -> RealtimeWriter:
+    return realtime_writer
@@ -0,0 +1,216 @@
+import itertools
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Client
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.shared_frames import FrameRing, letterbox
+
+
+# Bounded wait for a temporary ring slot before giving up on a frame
+LEASE_TIMEOUT_S = 1.0
+
+
+def parse_address(address: str) -> str:
+	"""Unix socket path, ``@name`` (Linux abstract socket) or Windows named pipe.
+
+	multiprocessing.connection unpickles every message, so TCP addresses are
+	refused: the server must only be reachable from this host (the frame
+	ring is host-local shared memory anyway). Raises ValueError for host:port.
+	"""
+	if address.startswith("\\\\"):
+		return address
+	if address.startswith("@"):
+		return "\0" + address[1:]
+	host, sep, port = address.rpartition(":")
+	if sep and port.isdigit() and "/" not in address:
+		raise ValueError(f"TCP inference server addresses are not supported ({address!r}); use a unix socket path")
+	return address
+
+
+class InferenceClient:
+	"""Connection to ``python -m app.inference_server``.
+
+	Requests are small pickled tuples; frames travel through this worker's
+	shared-memory ring, which the server attaches once per connection.
+	Calls block the caller (an inference-executor thread) until the reply
+	arrives; a reader thread resolves replies so many calls can be in flight.
+	"""
+
+	def __init__(self, address: str, authkey: str, ring_slots: int):
+		self.ring = FrameRing.create(ring_slots)
+		self._conn = Client(parse_address(address), authkey=authkey.encode())
+		self._send_lock = threading.Lock()
+		self._pending: Dict[int, Future] = {}
+		self._pending_lock = threading.Lock()
+		self._ids = itertools.count(1)
+		self._closed = False
+		self._send(("attach", self.ring.name, self.ring.shape, self.ring.slots))
+		self._reader = threading.Thread(target=self._read_loop, name="inference-client", daemon=True)
+		self._reader.start()
+		print(f"[INFERENCE] Connected to inference server at {address} (ring {self.ring.name}, {ring_slots} slots)")
+
+	def _send(self, message):
+		with self._send_lock:
+			self._conn.send(message)
+
+	def _read_loop(self):
+		error: Exception = ConnectionError("inference server connection closed")
+		try:
+			while True:
+				req_id, ok, payload = self._conn.recv()
+				with self._pending_lock:
+					future = self._pending.pop(req_id, None)
+				if future is None:
+					continue
+				if ok:
+					future.set_result(payload)
+				else:
+					future.set_exception(RuntimeError(payload))
+		except (EOFError, OSError) as e:
+			if not self._closed:
+				print(f"[INFERENCE] Lost connection to inference server: {e}")
+				error = ConnectionError(f"inference server connection lost: {e}")
+		with self._pending_lock:
+			pending, self._pending = self._pending, {}
+		for future in pending.values():
+			future.set_exception(error)
+
+	def call(self, kind: str, *args):
+		req_id = next(self._ids)
+		future: Future = Future()
+		with self._pending_lock:
+			self._pending[req_id] = future
+		try:
+			self._send((kind, req_id) + args)
+		except Exception:
+			with self._pending_lock:
+				self._pending.pop(req_id, None)
+			raise
+		return future.result()
+
+	def notify(self, kind: str, *args):
+		"""Fire-and-forget message (no reply expected)"""
+		try:
+			self._send((kind,) + args)
+		except (OSError, ValueError):
+			pass
+
+	def close(self):
+		self._closed = True
+		try:
+			self._conn.close()
+		finally:
+			self.ring.close()
+
+
+class RemoteMoveNet:
+	"""MoveNetService API backed by the inference server"""
+
+	def __init__(self, client: InferenceClient):
+		self.client = client
+		self.ring = client.ring
+
+	def lease_frame_buffer(self) -> np.ndarray:
+		"""A decode target that the server can read in place; falls back to private memory when the ring is full"""
+		try:
+			return self.ring.lease(timeout=0)
+		except RuntimeError:
+			return np.empty(self.ring.shape, dtype=np.uint8)
+
+	def release_frame_buffer(self, frame: np.ndarray):
+		self.ring.release(frame)
+
+	def detect_keypoints(self, frame: np.ndarray) -> List[Dict]:
+		if frame is None:
+			return []
+		slot = self.ring.slot_of(frame)
+		if slot is not None:
+			return self.client.call("detect", slot)
+		# Not in shared memory yet: letterbox into a temporary slot (as resize_with_pad would)
+		buffer = self.ring.lease(timeout=LEASE_TIMEOUT_S)  # RuntimeError if the ring stays full
+		try:
+			if frame.shape == buffer.shape:
+				np.copyto(buffer, frame)
+			else:
+				letterbox(frame, buffer)
+			return self.client.call("detect", self.ring.slot_of(buffer))
+		finally:
+			self.ring.release(buffer)
+
+	def process_video_batch(self, cap, max_frames: int, stride: int = 1, frame_index: int = 0):
+		poses: List[List[Dict]] = []
+		while len(poses) < max_frames:
+			ret, frame = cap.read()
+			if not ret:
+				return poses, frame_index, True
+			if frame_index % stride == 0:
+				poses.append(self.detect_keypoints(frame))
+			frame_index += 1
+		return poses, frame_index, False
+
+	def process_video(self, video_path: str, stride: int = 1) -> List[List[Dict]]:
+		cap = cv2.VideoCapture(video_path)
+		poses: List[List[Dict]] = []
+		frame_index = 0
+		finished = False
+		try:
+			while not finished:
+				batch, frame_index, finished = self.process_video_batch(cap, 64, stride, frame_index)
+				poses.extend(batch)
+		finally:
+			cap.release()
+		return poses
+
+
+class RemoteStream:
+	"""Handle for per-stream recurrent state held by the inference server"""
+
+	_ids = itertools.count(1)
+
+	def __init__(self, client: InferenceClient):
+		self.client = client
+		self.stream_id = next(self._ids)
+
+	def reset(self):
+		self.client.notify("close_stream", self.stream_id)
+
+
+class RemoteClassifier:
+	"""LSTMClassifier API backed by the inference server"""
+
+	def __init__(self, client: InferenceClient):
+		self.client = client
+
+	def new_stream(self) -> RemoteStream:
+		return RemoteStream(self.client)
+
+	def predict_step(self, state: RemoteStream, frame: List[Dict]):
+		return tuple(self.client.call("classify", state.stream_id, frame))
+
+	def predict_sequence(self, poses: List[List[Dict]]):
+		return tuple(self.client.call("classify_seq", poses))
+
+	def predict_per_frame(self, poses: List[List[Dict]], state: Optional[RemoteStream] = None, offset: int = 0):
+		return self.client.call("classify_frames", poses, state.stream_id if state is not None else None, offset)
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client() -> InferenceClient:
+	"""Per-process connection to the inference server"""
+	global _client
+	with _client_lock:
+		if _client is None:
+			_client = InferenceClient(
+				settings.inference_server_address,
+				settings.inference_server_authkey,
+				settings.inference_ring_slots,
+			)
+		return _client
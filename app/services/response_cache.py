@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import counter, gauge
+
+CACHE_REQUESTS = counter("rehab_response_cache_total", "Analytics response cache lookups", ("endpoint", "result"))
+CACHE_INVALIDATIONS = counter("rehab_response_cache_invalidations_total", "Patients invalidated in the response cache")
+CACHE_ENTRIES = gauge("rehab_response_cache_entries", "Responses held in the analytics cache")
+
+
+class ResponseCache:
+	"""In-process LRU + TTL cache of per-patient API responses.
+
+	Entries are keyed by (endpoint, patient_id, variant), where variant
+	distinguishes e.g. pages of one list. Writers call
+	``invalidate(patient_id)`` after committing a session or results for that
+	patient; each patient has a generation counter, so a computation that
+	started before an invalidation is returned to its callers but not stored.
+	Concurrent misses for the same key share one computation (single-flight).
+	"""
+
+	def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+		self.max_entries = max(1, max_entries)
+		self.ttl = ttl
+		self._entries: "OrderedDict[Tuple[str, Hashable, Hashable], Tuple[float, Any]]" = OrderedDict()
+		self._generations: Dict[Hashable, int] = {}
+		self._inflight: Dict[Tuple[str, Hashable, Hashable], asyncio.Task] = {}
+		self._lock = threading.Lock()
+
+	def _lookup(self, key: Tuple[str, Hashable, Hashable]):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+			expires, value = entry
+			if time.monotonic() >= expires:
+				del self._entries[key]
+				CACHE_ENTRIES.set(len(self._entries))
+				return None
+			self._entries.move_to_end(key)
+			return entry
+
+	def _store(self, key: Tuple[str, Hashable, Hashable], value: Any, generation: int):
+		with self._lock:
+			if self._generations.get(key[1], 0) != generation:
+				return  # invalidated while computing
+			self._entries[key] = (time.monotonic() + self.ttl, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+			CACHE_ENTRIES.set(len(self._entries))
+
+	async def get_or_compute(
+		self, endpoint: str, patient_id: Hashable, compute: Callable[[], Awaitable[Any]], variant: Hashable = None
+	) -> Any:
+		key = (endpoint, patient_id, variant)
+		entry = self._lookup(key)
+		if entry is not None:
+			CACHE_REQUESTS.inc(endpoint=endpoint, result="hit")
+			return entry[1]
+		inflight = self._inflight.get(key)
+		if inflight is not None:
+			CACHE_REQUESTS.inc(endpoint=endpoint, result="coalesced")
+			return await asyncio.shield(inflight)
+
+		CACHE_REQUESTS.inc(endpoint=endpoint, result="miss")
+		with self._lock:
+			generation = self._generations.get(patient_id, 0)
+		# Run as its own task so a cancelled first caller doesn't cancel the others
+		task = asyncio.ensure_future(self._compute(key, compute, generation))
+		self._inflight[key] = task
+		return await asyncio.shield(task)
+
+	async def _compute(self, key: Tuple[str, Hashable, Hashable], compute: Callable[[], Awaitable[Any]], generation: int) -> Any:
+		try:
+			value = await compute()
+			self._store(key, value, generation)
+			return value
+		finally:
+			self._inflight.pop(key, None)
+
+	def invalidate(self, patient_id: Optional[Hashable]):
+		"""Drop every cached response for a patient; safe to call from any thread."""
+		if patient_id is None:
+			return
+		with self._lock:
+			self._generations[patient_id] = self._generations.get(patient_id, 0) + 1
+			for key in [k for k in self._entries if k[1] == patient_id]:
+				del self._entries[key]
+			CACHE_ENTRIES.set(len(self._entries))
+		CACHE_INVALIDATIONS.inc()
+
+
+class _NullCache(ResponseCache):
+	"""Cache disabled: always compute, still counted as misses"""
+
+	async def get_or_compute(self, endpoint, patient_id, compute, variant=None):
+		CACHE_REQUESTS.inc(endpoint=endpoint, result="miss")
+		return await compute()
+
+
+_response_cache: ResponseCache = (
+	ResponseCache(settings.analytics_cache_max_entries, settings.analytics_cache_ttl_s)
+	if settings.analytics_cache_enabled else _NullCache()
+)
+
+
+def get_response_cache() -> ResponseCache:
+	return _response_cache
+
+
+def invalidate_patient(patient_id: Optional[Hashable]):
+	"""Write hook: call after committing a session or results for a patient."""
+	_response_cache.invalidate(patient_id)
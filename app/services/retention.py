@@ -0,0 +1,315 @@
+"""Retention and compaction of per-frame exercise results.
+
+Rows older than ``RETENTION_RESULTS_DAYS`` are packed, per session and in
+chunks of ``RETENTION_BATCH_ROWS``, into ``exercise_result_archives`` blobs
+(or dropped when ``RETENTION_ARCHIVE_KEYPOINTS`` is off; session/day rollups
+already summarise them), deleted in the same transaction, and SQLite pages
+are then released with ``PRAGMA incremental_vacuum``.
+
+    python -m app.services.retention --dry-run
+    python -m app.services.retention [--days N] [--no-archive] [--enable-incremental-vacuum]
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import Text, delete, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import ExerciseResult, ExerciseResultArchive
+from app.services.metrics import counter
+
+RETENTION_ROWS = counter("rehab_retention_rows_total", "Per-frame result rows compacted by the retention job", ("action",))
+
+ARCHIVE_VERSION = 1
+# Rough per-row cost besides the keypoint JSON: fixed columns plus entries in
+# the four exercise_results indexes
+ROW_OVERHEAD_BYTES = 96
+_EPOCH = datetime(1970, 1, 1)
+_COORD_SCALE = 65535  # as in the binary realtime encoding (keypoint_codec)
+
+
+def _result_columns():
+	return (
+		ExerciseResult.id, ExerciseResult.frame_index, ExerciseResult.predicted_label,
+		ExerciseResult.confidence, ExerciseResult.pose_keypoints, ExerciseResult.timestamp,
+		ExerciseResult.exercise_name,
+	)
+
+
+def pack_results(rows: List) -> bytes:
+	"""Pack result rows (columns of _result_columns) into a compressed .npz blob.
+
+	Keypoints are stored as uint16 x/y/score in 1/65535 units, labels and
+	exercise names as indexes into small string tables.
+	"""
+	labels = sorted({r.predicted_label or "" for r in rows})
+	exercises = sorted({r.exercise_name or "" for r in rows})
+	label_index = {label: i for i, label in enumerate(labels)}
+	exercise_index = {name: i for i, name in enumerate(exercises)}
+	counts = np.zeros(len(rows), dtype=np.uint8)
+	points: List = []
+	for i, r in enumerate(rows):
+		kps = r.pose_keypoints or []
+		counts[i] = len(kps)
+		points.extend((kp.get("x", 0.0), kp.get("y", 0.0), kp.get("score", 0.0)) for kp in kps)
+	keypoints = np.clip(np.asarray(points, dtype=np.float64).reshape(-1, 3), 0.0, 1.0)
+	buffer = io.BytesIO()
+	np.savez_compressed(
+		buffer,
+		version=np.array([ARCHIVE_VERSION], dtype=np.uint8),
+		labels=np.array(json.dumps(labels)),
+		exercises=np.array(json.dumps(exercises)),
+		frame_index=np.array([r.frame_index if r.frame_index is not None else -1 for r in rows], dtype=np.int32),
+		label=np.array([label_index[r.predicted_label or ""] for r in rows], dtype=np.uint16),
+		exercise=np.array([exercise_index[r.exercise_name or ""] for r in rows], dtype=np.uint16),
+		# float64, so rollups rebuilt from archives match the live sums exactly
+		confidence=np.array([r.confidence if r.confidence is not None else np.nan for r in rows], dtype=np.float64),
+		timestamp_us=np.array(
+			[(r.timestamp - _EPOCH) // timedelta(microseconds=1) if r.timestamp else -1 for r in rows], dtype=np.int64
+		),
+		keypoint_counts=counts,
+		keypoints=np.rint(keypoints * _COORD_SCALE).astype(np.uint16),
+	)
+	return buffer.getvalue()
+
+
+def unpack_archive(data: bytes) -> Iterator[Dict]:
+	"""Yield archived rows as dicts shaped like exercise_results columns"""
+	with np.load(io.BytesIO(data)) as npz:
+		labels = json.loads(str(npz["labels"]))
+		exercises = json.loads(str(npz["exercises"]))
+		counts = npz["keypoint_counts"]
+		keypoints = npz["keypoints"].astype(np.float64) / _COORD_SCALE
+		offsets = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+		for i in range(len(counts)):
+			ts = int(npz["timestamp_us"][i])
+			conf = float(npz["confidence"][i])
+			frame_index = int(npz["frame_index"][i])
+			yield {
+				"frame_index": frame_index if frame_index >= 0 else None,
+				"predicted_label": labels[int(npz["label"][i])] or None,
+				"confidence": None if np.isnan(conf) else conf,
+				"pose_keypoints": [
+					{"x": float(x), "y": float(y), "score": float(s)}
+					for x, y, s in keypoints[offsets[i]:offsets[i + 1]]
+				],
+				"timestamp": _EPOCH + timedelta(microseconds=ts) if ts >= 0 else None,
+				"exercise_name": exercises[int(npz["exercise"][i])] or None,
+			}
+
+
+def cutoff_for(days: int) -> datetime:
+	return datetime.utcnow() - timedelta(days=days)
+
+
+def _row_bytes(db: Session, cutoff: datetime):
+	payload = func.coalesce(func.length(func.cast(ExerciseResult.pose_keypoints, Text)), 0)
+	return db.execute(
+		select(func.count(ExerciseResult.id), func.count(func.distinct(ExerciseResult.session_id)), func.sum(payload))
+		.where(ExerciseResult.timestamp < cutoff)
+	).one()
+
+
+def _sqlite_pages(db: Session) -> Optional[Dict]:
+	if db.get_bind().dialect.name != "sqlite":
+		return None
+
+	def pragma(name):
+		return db.execute(text(f"PRAGMA {name}")).scalar()
+
+	page_size = pragma("page_size")
+	return {
+		"page_size": page_size,
+		"database_bytes": pragma("page_count") * page_size,
+		"free_bytes": pragma("freelist_count") * page_size,
+		"auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(pragma("auto_vacuum"), "UNKNOWN"),
+	}
+
+
+def compaction_report(db: Session, cutoff: datetime, archive: bool = True, sample_rows: int = 2000) -> Dict:
+	"""Dry run: what compaction at ``cutoff`` would remove and roughly how much space it frees"""
+	rows, sessions, payload = _row_bytes(db, cutoff)
+	row_bytes = int(payload or 0) + rows * ROW_OVERHEAD_BYTES
+	archive_bytes = 0
+	if archive and rows:
+		sample = db.execute(
+			select(*_result_columns()).where(ExerciseResult.timestamp < cutoff).order_by(ExerciseResult.id).limit(sample_rows)
+		).all()
+		archive_bytes = int(len(pack_results(sample)) * rows / len(sample))
+	return {
+		"cutoff": cutoff.isoformat(),
+		"rows": rows,
+		"sessions": sessions,
+		"row_bytes_estimate": row_bytes,
+		"archive_bytes_estimate": archive_bytes,
+		"reclaimable_bytes_estimate": max(0, row_bytes - archive_bytes),
+		"sqlite": _sqlite_pages(db),
+	}
+
+
+def compact(
+	session_factory: Callable[[], Session],
+	cutoff: datetime,
+	archive: bool = True,
+	batch_rows: int = 5000,
+	should_stop: Callable[[], bool] = lambda: False,
+) -> Dict:
+	"""Archive and delete rows older than ``cutoff``, one chunk (<= batch_rows rows of a session) per transaction.
+
+	Expired rows without a session cannot be archived (nor reached through
+	any session) and are deleted outright. The DELETE is the claim on a
+	chunk: if it does not remove every row that was read, another pass (e.g.
+	another uvicorn worker) got there first and the chunk is rolled back
+	instead of being archived twice.
+	"""
+	stats = {"rows": 0, "archives": 0, "archive_bytes": 0, "batches": 0, "orphans": 0, "conflicts": 0}
+	while not should_stop():
+		db = session_factory()
+		try:
+			ids = db.execute(
+				select(ExerciseResult.id)
+				.where(ExerciseResult.session_id.is_(None), ExerciseResult.timestamp < cutoff)
+				.limit(batch_rows)
+			).scalars().all()
+			deleted = 0
+			if ids:
+				deleted = db.execute(delete(ExerciseResult).where(ExerciseResult.id.in_(ids))).rowcount
+				db.commit()
+		except Exception:
+			db.rollback()
+			raise
+		finally:
+			db.close()
+		if not ids:
+			break
+		stats["orphans"] += deleted
+		RETENTION_ROWS.inc(deleted, action="orphan_deleted")
+	while not should_stop():
+		db = session_factory()
+		try:
+			session_id = db.execute(
+				select(ExerciseResult.session_id)
+				.where(ExerciseResult.session_id.is_not(None), ExerciseResult.timestamp < cutoff)
+				.limit(1)
+			).scalar()
+			if session_id is None:
+				break
+			rows = db.execute(
+				select(*_result_columns())
+				.where(ExerciseResult.session_id == session_id, ExerciseResult.timestamp < cutoff)
+				.order_by(ExerciseResult.id)
+				.limit(batch_rows)
+			).all()
+			ids = [r.id for r in rows]
+			if db.execute(delete(ExerciseResult).where(ExerciseResult.id.in_(ids))).rowcount != len(ids):
+				db.rollback()
+				stats["conflicts"] += 1
+				continue
+			if archive:
+				blob = pack_results(rows)
+				timestamps = [r.timestamp for r in rows if r.timestamp is not None]
+				db.add(ExerciseResultArchive(
+					session_id=session_id,
+					frame_count=len(rows),
+					first_timestamp=min(timestamps, default=None),
+					last_timestamp=max(timestamps, default=None),
+					data=blob,
+				))
+				stats["archives"] += 1
+				stats["archive_bytes"] += len(blob)
+			db.commit()
+		except Exception:
+			db.rollback()
+			raise
+		finally:
+			db.close()
+		stats["rows"] += len(ids)
+		stats["batches"] += 1
+		RETENTION_ROWS.inc(len(ids), action="archived" if archive else "deleted")
+	return stats
+
+
+def incremental_vacuum(engine: Engine, pages: int) -> Optional[int]:
+	"""Release up to ``pages`` free pages back to the OS; returns bytes freed, or None if unavailable"""
+	if engine.dialect.name != "sqlite":
+		return None  # PostgreSQL: autovacuum reclaims dead tuples
+	with engine.connect() as conn:
+		if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+			return None
+		page_size = conn.execute(text("PRAGMA page_size")).scalar()
+		before = conn.execute(text("PRAGMA freelist_count")).scalar()
+		# pysqlite's execute() steps a pragma once (one page); executescript() runs it to completion
+		conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+		after = conn.execute(text("PRAGMA freelist_count")).scalar()
+		conn.commit()
+	return (before - after) * page_size
+
+
+def enable_incremental_vacuum(engine: Engine):
+	"""One-time switch of an existing SQLite database to auto_vacuum=INCREMENTAL (rewrites the file)"""
+	with engine.connect() as conn:
+		conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+		conn.commit()
+		conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+
+
+def run_retention(days: Optional[int] = None, archive: Optional[bool] = None, should_stop: Callable[[], bool] = lambda: False) -> Optional[Dict]:
+	"""One compaction pass with the configured settings; None when retention is disabled"""
+	from app.database import SessionLocal, engine
+
+	days = settings.retention_results_days if days is None else days
+	archive = settings.retention_archive_keypoints if archive is None else archive
+	if days <= 0:
+		return None
+	start = time.perf_counter()
+	stats = compact(SessionLocal, cutoff_for(days), archive, settings.retention_batch_rows, should_stop)
+	stats["vacuumed_bytes"] = incremental_vacuum(engine, settings.retention_vacuum_pages)
+	stats["seconds"] = round(time.perf_counter() - start, 3)
+	if stats["rows"] or stats["orphans"]:
+		print(f"[RETENTION] Compacted {stats['rows']} rows older than {days} days: {stats}")
+	return stats
+
+
+def main(argv=None) -> int:
+	parser = argparse.ArgumentParser(description="Archive and delete per-frame results older than a retention age")
+	parser.add_argument("--days", type=int, default=None, help="retention age (default: RETENTION_RESULTS_DAYS)")
+	parser.add_argument("--dry-run", action="store_true", help="report what would be compacted and reclaimed")
+	parser.add_argument("--no-archive", action="store_true", help="delete without keeping archived keypoints")
+	parser.add_argument(
+		"--enable-incremental-vacuum", action="store_true",
+		help="one-time VACUUM switching an existing SQLite database to auto_vacuum=INCREMENTAL",
+	)
+	args = parser.parse_args(argv)
+	from app.database import Base, SessionLocal, engine
+
+	Base.metadata.create_all(bind=engine)
+	days = settings.retention_results_days if args.days is None else args.days
+	if days <= 0 and not args.enable_incremental_vacuum:
+		print("[RETENTION] Retention is disabled: pass --days N or set RETENTION_RESULTS_DAYS")
+		return 2
+	if args.dry_run:
+		db = SessionLocal()
+		try:
+			report = compaction_report(db, cutoff_for(days), archive=not args.no_archive)
+		finally:
+			db.close()
+		print(json.dumps(report, indent=2))
+		return 0
+	if days > 0:
+		print(json.dumps(run_retention(days, archive=not args.no_archive), indent=2))
+	if args.enable_incremental_vacuum:
+		enable_incremental_vacuum(engine)
+		print("[RETENTION] Database switched to auto_vacuum=INCREMENTAL")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
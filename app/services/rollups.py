@@ -0,0 +1,240 @@
+"""Incrementally maintained analytics rollups.
+
+``apply_results`` folds a batch of newly inserted exercise_results into
+``session_rollups`` and ``patient_daily_rollups``; callers run it in the same
+transaction as the inserts so rollups commit (or roll back) with them.
+``rebuild_rollups`` recomputes both tables from exercise_results for
+backfills:
+
+    python -m app.services.rollups rebuild
+"""
+import sys
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import ExerciseResult, ExerciseResultArchive, PatientDailyRollup, Session as DbSession, SessionRollup
+from app.services.retention import unpack_archive
+
+
+class _Delta:
+	"""Aggregate of new results for one rollup row"""
+
+	__slots__ = ("frame_count", "confidence_sum", "labels", "last_active")
+
+	def __init__(self):
+		self.frame_count = 0
+		self.confidence_sum = 0.0
+		self.labels: Counter = Counter()
+		self.last_active: Optional[datetime] = None
+
+	def add(self, label: str, confidence: Optional[float], timestamp: Optional[datetime], count: int = 1):
+		self.frame_count += count
+		self.confidence_sum += float(confidence or 0.0)
+		self.labels[label] += count
+		if timestamp is not None and (self.last_active is None or timestamp > self.last_active):
+			self.last_active = timestamp
+
+
+def _merge_labels(current: Optional[Dict], labels: Counter) -> Dict:
+	merged = dict(current or {})
+	for label, count in labels.items():
+		merged[label] = merged.get(label, 0) + count
+	return merged
+
+
+def _apply(db: Session, model, key: Dict, delta: _Delta, increments: Dict, on_insert: Dict) -> bool:
+	"""Add ``delta`` to one rollup row; returns True if the row was created.
+
+	The counters are bumped with a relative UPDATE first, which takes the
+	row (SQLite: database) write lock, so the label histogram merge that
+	follows cannot race another writer.
+	"""
+	where = [getattr(model, k) == v for k, v in key.items()]
+	values = {
+		"frame_count": model.frame_count + delta.frame_count,
+		"confidence_sum": model.confidence_sum + delta.confidence_sum,
+	}
+	values.update({k: getattr(model, k) + v for k, v in increments.items()})
+	if db.execute(update(model).where(*where).values(**values)).rowcount:
+		labels, last_active = db.execute(select(model.label_counts, model.last_active).where(*where)).one()
+		if last_active is not None and (delta.last_active is None or last_active > delta.last_active):
+			delta_last = last_active
+		else:
+			delta_last = delta.last_active
+		db.execute(update(model).where(*where).values(
+			label_counts=_merge_labels(labels, delta.labels), last_active=delta_last
+		))
+		return False
+	row = model(
+		**key,
+		frame_count=delta.frame_count,
+		confidence_sum=delta.confidence_sum,
+		label_counts=dict(delta.labels),
+		last_active=delta.last_active,
+		**increments,
+		**on_insert,
+	)
+	try:
+		with db.begin_nested():
+			db.add(row)
+	except IntegrityError:
+		# Another transaction created the row first; add to it instead. (The
+		# savepoint rollback has already discarded the pending row.)
+		return _apply(db, model, key, delta, increments, on_insert)
+	return True
+
+
+def apply_results(
+	db: Session,
+	session_id: int,
+	patient_id: Optional[int],
+	rows: Iterable[Tuple[str, Optional[float], Optional[datetime]]],
+	form_score: Optional[float] = None,
+):
+	"""Fold (label, confidence, timestamp) rows of one session into the rollups.
+
+	Does not commit: call inside the transaction that inserts the rows.
+	"""
+	session_delta = _Delta()
+	days: Dict[date, _Delta] = defaultdict(_Delta)
+	for label, confidence, timestamp in rows:
+		timestamp = timestamp or datetime.utcnow()
+		session_delta.add(label, confidence, timestamp)
+		days[timestamp.date()].add(label, confidence, timestamp)
+	if not session_delta.frame_count:
+		return
+
+	created = _apply(
+		db, SessionRollup, {"session_id": session_id}, session_delta, {},
+		{"patient_id": patient_id, "form_score": form_score},
+	)
+	if patient_id is None:
+		return
+	first_day = min(days)
+	for day, delta in days.items():
+		# A session counts towards the day of its first results
+		new_session = created and day == first_day
+		scored = new_session and form_score is not None
+		_apply(
+			db, PatientDailyRollup, {"patient_id": patient_id, "day": day}, delta,
+			{
+				"session_count": int(new_session),
+				"form_score_sum": float(form_score) if scored else 0.0,
+				"form_score_count": int(scored),
+			},
+			{},
+		)
+
+
+def as_date(value) -> date:
+	# SQLite's date() returns text, PostgreSQL a date
+	return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def rebuild_rollups(db: Session) -> Tuple[int, int]:
+	"""Recompute all rollups from exercise_results and their archives; returns (sessions, patient-days). Commits."""
+	db.execute(delete(PatientDailyRollup))
+	db.execute(delete(SessionRollup))
+
+	session_deltas: Dict[int, _Delta] = defaultdict(_Delta)
+	session_info: Dict[int, Tuple[Optional[int], Optional[float]]] = {}
+	first_seen: Dict[int, datetime] = {}
+	by_session = db.execute(
+		select(
+			ExerciseResult.session_id, DbSession.patient_id, DbSession.form_score, ExerciseResult.predicted_label,
+			func.count(ExerciseResult.id), func.sum(ExerciseResult.confidence),
+			func.min(ExerciseResult.timestamp), func.max(ExerciseResult.timestamp),
+		)
+		.join(DbSession, ExerciseResult.session_id == DbSession.id)
+		.group_by(ExerciseResult.session_id, DbSession.patient_id, DbSession.form_score, ExerciseResult.predicted_label)
+	)
+	for session_id, patient_id, form_score, label, count, conf_sum, first, last in by_session:
+		session_deltas[session_id].add(label, conf_sum, last, count)
+		session_info[session_id] = (patient_id, form_score)
+		if first is not None and (session_id not in first_seen or first < first_seen[session_id]):
+			first_seen[session_id] = first
+
+	# Results already compacted by the retention job live in archive blobs
+	day_deltas: Dict[Tuple[int, date], _Delta] = defaultdict(_Delta)
+	archives = db.execute(
+		select(ExerciseResultArchive.session_id, DbSession.patient_id, DbSession.form_score, ExerciseResultArchive.data)
+		.join(DbSession, ExerciseResultArchive.session_id == DbSession.id)
+	)
+	for session_id, patient_id, form_score, data in archives:
+		session_info[session_id] = (patient_id, form_score)
+		for row in unpack_archive(data):
+			timestamp = row["timestamp"]
+			session_deltas[session_id].add(row["predicted_label"], row["confidence"], timestamp)
+			if timestamp is None:
+				continue
+			if session_id not in first_seen or timestamp < first_seen[session_id]:
+				first_seen[session_id] = timestamp
+			if patient_id is not None:
+				day_deltas[(patient_id, timestamp.date())].add(row["predicted_label"], row["confidence"], timestamp)
+
+	for session_id, delta in session_deltas.items():
+		patient_id, form_score = session_info[session_id]
+		db.add(SessionRollup(
+			session_id=session_id, patient_id=patient_id, frame_count=delta.frame_count,
+			confidence_sum=delta.confidence_sum, label_counts=dict(delta.labels),
+			form_score=form_score, last_active=delta.last_active,
+		))
+
+	day_col = func.date(ExerciseResult.timestamp)
+	by_day = db.execute(
+		select(
+			DbSession.patient_id, day_col, ExerciseResult.predicted_label,
+			func.count(ExerciseResult.id), func.sum(ExerciseResult.confidence), func.max(ExerciseResult.timestamp),
+		)
+		.join(DbSession, ExerciseResult.session_id == DbSession.id)
+		.where(DbSession.patient_id.is_not(None))
+		.group_by(DbSession.patient_id, day_col, ExerciseResult.predicted_label)
+	)
+	for patient_id, day, label, count, conf_sum, last in by_day:
+		day_deltas[(patient_id, as_date(day))].add(label, conf_sum, last, count)
+
+	sessions_per_day: Counter = Counter()
+	scores_per_day: Dict[Tuple[int, date], list] = defaultdict(list)
+	for session_id, first in first_seen.items():
+		patient_id, form_score = session_info[session_id]
+		if patient_id is None:
+			continue
+		sessions_per_day[(patient_id, first.date())] += 1
+		if form_score is not None:
+			scores_per_day[(patient_id, first.date())].append(form_score)
+
+	for (patient_id, day), delta in day_deltas.items():
+		scores = scores_per_day.get((patient_id, day), [])
+		db.add(PatientDailyRollup(
+			patient_id=patient_id, day=day, session_count=sessions_per_day[(patient_id, day)],
+			frame_count=delta.frame_count, confidence_sum=delta.confidence_sum,
+			label_counts=dict(delta.labels), form_score_sum=float(sum(scores)),
+			form_score_count=len(scores), last_active=delta.last_active,
+		))
+	db.commit()
+	return len(session_deltas), len(day_deltas)
+
+
+def main(argv=None) -> int:
+	argv = sys.argv[1:] if argv is None else argv
+	if argv != ["rebuild"]:
+		print("usage: python -m app.services.rollups rebuild")
+		return 2
+	from app.database import Base, SessionLocal, engine
+	Base.metadata.create_all(bind=engine)
+	db = SessionLocal()
+	try:
+		sessions, days = rebuild_rollups(db)
+	finally:
+		db.close()
+	print(f"[ROLLUPS] Rebuilt {sessions} session rollups and {days} patient-day rollups")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,88 @@
+import os
+import queue
+import secrets
+import numpy as np
+import cv2
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+FRAME_SHAPE = (256, 256, 3)
+
+
+class FrameRing:
+	"""Fixed-size slots of decoded frames in ``multiprocessing.shared_memory``.
+
+	A web worker owns (creates) its ring and decodes frames straight into
+	leased slots; the inference server attaches by name and reads the same
+	memory, so frames cross the process boundary without pickling or copies.
+	"""
+
+	def __init__(self, name: str, slots: int, shape: Tuple[int, ...] = FRAME_SHAPE, create: bool = False):
+		self.shape = tuple(shape)
+		self.slots = slots
+		self.slot_bytes = int(np.prod(self.shape))
+		if create:
+			self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.slot_bytes * slots)
+		else:
+			self.shm = shared_memory.SharedMemory(name=name)
+			if os.name == "posix":
+				# The creating process owns the segment; don't let this process's
+				# resource tracker unlink it (or warn about it) on exit
+				resource_tracker.unregister("/" + self.shm.name, "shared_memory")
+		self.name = self.shm.name
+		self.owner = create
+		self._array = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+		self._base = self._array.ctypes.data
+		self._free: "queue.Queue[int]" = queue.Queue()
+		if create:
+			for i in range(slots):
+				self._free.put(i)
+
+	@classmethod
+	def create(cls, slots: int, shape: Tuple[int, ...] = FRAME_SHAPE) -> "FrameRing":
+		# Random suffix: a segment left behind by a crashed process with a recycled pid never collides
+		return cls(f"rehab-frames-{os.getpid()}-{secrets.token_hex(4)}", slots, shape, create=True)
+
+	def view(self, slot: int) -> np.ndarray:
+		return self._array[slot]
+
+	def lease(self, timeout: Optional[float] = None) -> np.ndarray:
+		"""Borrow a free slot as a writable (H, W, 3) uint8 array."""
+		try:
+			return self._array[self._free.get(timeout=timeout)]
+		except queue.Empty:
+			raise RuntimeError("No free frame slots in shared memory ring")
+
+	def release(self, frame: np.ndarray):
+		slot = self.slot_of(frame)
+		if slot is not None:
+			self._free.put(slot)
+
+	def slot_of(self, frame: np.ndarray) -> Optional[int]:
+		"""Slot index if ``frame`` is exactly one slot of this ring, else None."""
+		if frame.shape != self.shape or frame.dtype != np.uint8 or not frame.flags.c_contiguous:
+			return None
+		offset = frame.ctypes.data - self._base
+		if offset < 0 or offset % self.slot_bytes or offset // self.slot_bytes >= self.slots:
+			return None
+		return offset // self.slot_bytes
+
+	def close(self):
+		del self._array
+		self.shm.close()
+		if self.owner:
+			self.shm.unlink()
+
+
+def letterbox(image: np.ndarray, out: np.ndarray) -> np.ndarray:
+	"""Resize with padding into ``out``, matching tf.image.resize_with_pad (centred padding)."""
+	target_h, target_w = out.shape[:2]
+	h, w = image.shape[:2]
+	scale = min(target_w / w, target_h / h)
+	new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+	resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+	out.fill(0)
+	top = (target_h - new_h) // 2
+	left = (target_w - new_w) // 2
+	out[top:top + new_h, left:left + new_w] = resized
+	return out
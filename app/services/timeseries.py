@@ -0,0 +1,85 @@
+"""Calendar bucketing and downsampling for progress timeseries.
+
+Inputs are per-day aggregates (from patient_daily_rollups and a GROUP BY
+over sessions); buckets are merged by summing counts and sums, so means
+stay exact (frame-weighted confidence, per-scored-session form score).
+"""
+import math
+from datetime import date
+from typing import Dict, List, Optional
+
+
+class DayStats:
+	__slots__ = ("sessions", "frames", "confidence_sum", "form_score_sum", "form_score_count", "repetitions")
+
+	def __init__(self):
+		self.sessions = 0
+		self.frames = 0
+		self.confidence_sum = 0.0
+		self.form_score_sum = 0.0
+		self.form_score_count = 0
+		self.repetitions = 0
+
+	def merge(self, other: "DayStats"):
+		self.sessions += other.sessions
+		self.frames += other.frames
+		self.confidence_sum += other.confidence_sum
+		self.form_score_sum += other.form_score_sum
+		self.form_score_count += other.form_score_count
+		self.repetitions += other.repetitions
+
+
+def slot_of(day: date, bucket: str) -> int:
+	"""Index of the calendar bucket containing ``day`` (weeks start on Monday)"""
+	if bucket == "day":
+		return day.toordinal()
+	if bucket == "week":
+		return (day.toordinal() - 1) // 7  # date.fromordinal(1) is a Monday
+	return day.year * 12 + day.month - 1
+
+
+def slot_start(slot: int, bucket: str) -> date:
+	if bucket == "day":
+		return date.fromordinal(slot)
+	if bucket == "week":
+		return date.fromordinal(slot * 7 + 1)
+	return date(slot // 12, slot % 12 + 1, 1)
+
+
+def build_series(
+	days: Dict[date, DayStats],
+	bucket: str,
+	start: Optional[date],
+	end: Optional[date],
+	max_points: int,
+) -> List[Dict]:
+	"""Bucket per-day stats, then widen buckets evenly until there are at most ``max_points``.
+
+	Only non-empty buckets are returned; each point covers [start, end).
+	"""
+	if not days:
+		return []
+	first_slot = slot_of(start or min(days), bucket)
+	last_slot = slot_of(end or max(days), bucket)
+	# Group g consecutive calendar buckets per point so time spacing stays even
+	group = max(1, math.ceil((last_slot - first_slot + 1) / max(1, max_points)))
+
+	points: Dict[int, DayStats] = {}
+	for day, stats in days.items():
+		key = (slot_of(day, bucket) - first_slot) // group
+		points.setdefault(key, DayStats()).merge(stats)
+
+	series = []
+	for key in sorted(points):
+		stats = points[key]
+		begin = first_slot + key * group
+		series.append({
+			"start": slot_start(begin, bucket),
+			"end": slot_start(begin + group, bucket),
+			"sessions": stats.sessions,
+			"frames": stats.frames,
+			"mean_confidence": stats.confidence_sum / stats.frames if stats.frames else None,
+			"form_score": stats.form_score_sum / stats.form_score_count if stats.form_score_count else None,
+			"repetitions": stats.repetitions,
+		})
+	return series
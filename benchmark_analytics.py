@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark /analytics/patient/{id} on a synthetic long patient history
+
+Seeds a temporary SQLite database with one patient's sessions and per-frame
+results (including keypoint JSON), backfills the rollup tables, then times
+the previous ORM approach (load every row, Counter in Python) against the
+endpoint, which reads one rollup row per session.
+
+    python benchmark_analytics.py [--sessions 300] [--frames 1000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+
+def seed(engine, sessions, frames):
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.models import ExerciseResult, Session as DbSession, User
+
+    Base.metadata.create_all(bind=engine)
+    labels = ["squat", "lunge", "plank", "pushup", "jumping_jack"]
+    keypoints = [{"x": 0.5, "y": 0.5, "score": 0.9}] * 17
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        user = User(email="long@example.com", full_name="Long History", hashed_password="x")
+        db.add(user)
+        db.flush()
+        start = datetime(2026, 1, 1)
+        for s in range(sessions):
+            session = DbSession(patient_id=user.id, exercise_name="squat", video_path=f"{s}.mp4",
+                                started_at=start + timedelta(hours=s))
+            db.add(session)
+            db.flush()
+            db.execute(ExerciseResult.__table__.insert(), [
+                {
+                    "session_id": session.id,
+                    "frame_index": f,
+                    "predicted_label": random.choice(labels),
+                    "confidence": random.random(),
+                    "pose_keypoints": keypoints,
+                    "timestamp": session.started_at + timedelta(seconds=f / 30),
+                    "exercise_name": "squat",
+                }
+                for f in range(frames)
+            ])
+        db.commit()
+        return user.id
+
+
+async def orm_progress(db, patient_id):
+    """The previous implementation: every ORM row into Python"""
+    from sqlalchemy import select
+    from app.models import ExerciseResult, Session as DbSession
+
+    sessions = (await db.execute(select(DbSession).where(DbSession.patient_id == patient_id))).scalars().all()
+    session_ids = [s.id for s in sessions]
+    results = (await db.execute(select(ExerciseResult).where(ExerciseResult.session_id.in_(session_ids)))).scalars().all()
+    return len(sessions), len(results), dict(Counter(r.predicted_label for r in results)), max((r.timestamp for r in results), default=None)
+
+
+async def run(patient_id, repeat):
+    from app.database import AsyncSessionLocal, async_engine
+    from app.routers.analytics_router import compute_patient_progress
+
+    async def timed(fn):
+        best = float("inf")
+        for _ in range(repeat):
+            async with AsyncSessionLocal() as db:
+                t0 = time.perf_counter()
+                out = await fn(db)
+                best = min(best, time.perf_counter() - t0)
+        return best, out
+
+    orm_s, orm = await timed(lambda db: orm_progress(db, patient_id))
+    sql_s, summary = await timed(lambda db: compute_patient_progress(db, patient_id))
+    await async_engine.dispose()
+    assert (orm[0], orm[1], orm[2], orm[3]) == (
+        summary.total_sessions, summary.total_frames, summary.label_distribution, summary.last_active
+    ), "results differ"
+    return orm_s, sql_s, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'analytics.db')}"
+    from app.database import SessionLocal, engine
+    from app.services.rollups import rebuild_rollups
+
+    print(f"🧪 Seeding {args.sessions} sessions x {args.frames} frames...")
+    patient_id = seed(engine, args.sessions, args.frames)
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        rebuild_rollups(db)
+    print(f"   rollup rebuild: {(time.perf_counter() - t0) * 1000:.0f} ms")
+    orm_s, sql_s, summary = asyncio.run(run(patient_id, args.repeat))
+    print(f"   rows: {summary.total_frames}, labels: {summary.label_distribution}")
+    print(f"   ORM + Counter : {orm_s * 1000:9.1f} ms")
+    print(f"   rollups       : {sql_s * 1000:9.1f} ms  ({orm_s / sql_s:.0f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
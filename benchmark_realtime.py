@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark realtime pose throughput: FastAPI WebSocket vs Flask Socket.IO
+
+Opens the same number of concurrent clients against each running server and
+has every client send one JPEG frame, wait for its result, and repeat (a
+closed loop, so latest-frame-wins dropping does not inflate the numbers).
+Reports results per second and per-frame round-trip percentiles.
+
+    uvicorn app.main:app --port 8000 &
+    python flask_backend.py &
+    python benchmark_realtime.py [--clients 4] [--seconds 20] [--image frame.jpg]
+        [--fastapi ws://127.0.0.1:8000/realtime/ws] [--flask http://127.0.0.1:5000]
+
+Pass an empty URL to skip a server. The Flask client needs python-socketio
+(pip install "python-socketio[client]").
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import websockets
+except Exception:
+    websockets = None
+
+try:
+    import socketio
+except Exception:
+    socketio = None
+
+
+def load_frame(path, width, height):
+    """Base64 JPEG of the given image, or of a synthetic frame"""
+    if path:
+        image = cv2.imread(path)
+        if image is None:
+            raise SystemExit(f"cannot read {path}")
+    else:
+        rng = np.random.default_rng(0)
+        image = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    assert ok
+    return base64.b64encode(jpeg.tobytes()).decode()
+
+
+def summarize(name, latencies, errors, seconds):
+    if not latencies:
+        print(f"   {name:8}: no results ({errors} errors)")
+        return
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(
+        f"   {name:8}: {len(latencies) / seconds:7.1f} results/s   "
+        f"p50 {p50:6.1f} ms   p95 {p95:6.1f} ms   p99 {p99:6.1f} ms   errors {errors}"
+    )
+
+
+async def fastapi_client(url, image_b64, deadline, latencies, errors):
+    async with websockets.connect(url, max_size=None) as ws:
+        message = json.dumps({"image_b64": image_b64})
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await ws.send(message)
+            while True:
+                reply = json.loads(await ws.recv())
+                if "keypoints" in reply:
+                    latencies.append(time.perf_counter() - t0)
+                    break
+                if "error" in reply or reply.get("type") == "rate_limited":
+                    errors.append(reply)
+                    break
+                # Anything else (e.g. capture advice) is a notice: keep waiting
+
+
+def bench_fastapi(url, image_b64, clients, seconds):
+    latencies, errors = [], []
+
+    async def run():
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(fastapi_client(url, image_b64, deadline, latencies, errors) for _ in range(clients)))
+
+    asyncio.run(run())
+    return latencies, len(errors)
+
+
+def flask_client(url, image_b64, deadline, latencies, errors):
+    client = socketio.Client()
+    replied = threading.Event()
+    reply = {}
+
+    def on_reply(ok):
+        reply["ok"] = ok
+        replied.set()
+
+    client.on("pose_detected", lambda data: on_reply(True))
+    client.on("error", lambda data: on_reply(False))
+    client.connect(url, transports=["websocket"])
+    try:
+        frame = {"image": f"data:image/jpeg;base64,{image_b64}"}
+        while time.perf_counter() < deadline:
+            replied.clear()
+            t0 = time.perf_counter()
+            client.emit("video_frame", frame)
+            if not replied.wait(timeout=10):
+                print("   flask   : no reply within 10 s")
+                break
+            if reply["ok"]:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors.append(1)
+    finally:
+        client.disconnect()
+
+
+def bench_flask(url, image_b64, clients, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=flask_client, args=(url, image_b64, deadline, latencies, errors))
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--image", default=None, help="JPEG/PNG to send (default: synthetic frame)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fastapi", default="ws://127.0.0.1:8000/realtime/ws")
+    parser.add_argument("--flask", default="http://127.0.0.1:5000")
+    args = parser.parse_args()
+
+    image_b64 = load_frame(args.image, args.width, args.height)
+    print(f"🧪 {args.clients} clients x {args.seconds:.0f} s, {len(image_b64) // 1024} KiB frames")
+    if args.fastapi:
+        if websockets is None:
+            print("   fastapi : skipped (pip install websockets)")
+        else:
+            summarize("fastapi", *bench_fastapi(args.fastapi, image_b64, args.clients, args.seconds), args.seconds)
+    if args.flask:
+        if socketio is None:
+            print('   flask   : skipped (pip install "python-socketio[client]")')
+        else:
+            summarize("flask", *bench_flask(args.flask, image_b64, args.clients, args.seconds), args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent SQLite reads/writes: default settings vs the app's profile
+
+Simulates a classify_video insert burst (batches of exercise_results rows)
+while analytics-style readers aggregate the same table, then reports
+throughput and lock errors for a plain engine and for app.database's
+WAL/pragma profile.
+
+    python benchmark_sqlite.py [--seconds 5] [--readers 4] [--batch 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import ExerciseResult, Session as DbSession, User
+
+LABELS = ["squat", "lunge", "plank", "pushup", "jumping_jack"]
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        user = User(email="bench@example.com", full_name="Bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        session = DbSession(patient_id=user.id, exercise_name="squat", video_path="bench.mp4")
+        db.add(session)
+        db.commit()
+        return session.id
+
+
+def run(engine, seconds, readers, batch):
+    session_id = seed(engine)
+    Session = sessionmaker(bind=engine)
+    stop = threading.Event()
+    counts = {"rows": 0, "reads": 0, "write_errors": 0, "read_errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        frame = 0
+        while not stop.is_set():
+            rows = [
+                {
+                    "session_id": session_id,
+                    "frame_index": frame + i,
+                    "predicted_label": random.choice(LABELS),
+                    "confidence": random.random(),
+                    "pose_keypoints": None,
+                    "exercise_name": "squat",
+                }
+                for i in range(batch)
+            ]
+            try:
+                with Session() as db:
+                    db.execute(ExerciseResult.__table__.insert(), rows)
+                    db.commit()
+                frame += batch
+                with lock:
+                    counts["rows"] += batch
+            except OperationalError:
+                with lock:
+                    counts["write_errors"] += 1
+
+    def reader():
+        query = (
+            select(ExerciseResult.predicted_label, func.count(), func.avg(ExerciseResult.confidence))
+            .where(ExerciseResult.session_id == session_id)
+            .group_by(ExerciseResult.predicted_label)
+        )
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    db.execute(query).all()
+                with lock:
+                    counts["reads"] += 1
+            except OperationalError:
+                with lock:
+                    counts["read_errors"] += 1
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.readers} readers + 1 writer ({args.batch} rows/commit), {args.seconds:.0f}s each\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            "default": create_engine(
+                f"sqlite:///{os.path.join(tmp, 'default.db')}",
+                connect_args={"check_same_thread": False},
+            ),
+            "tuned": create_db_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}"),
+        }
+        for name, engine in engines.items():
+            c = run(engine, args.seconds, args.readers, args.batch)
+            print(
+                f"{name:>8}: {c['rows'] / args.seconds:10.0f} rows/s written, "
+                f"{c['reads'] / args.seconds:8.1f} reads/s, "
+                f"errors w={c['write_errors']} r={c['read_errors']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
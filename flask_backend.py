@@ -10,10 +10,14 @@ import base64
 from io import BytesIO
 from PIL import Image
 import os
+import queue
+import threading
 
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Threading mode: each client gets its own handler thread, and inference runs
+# on background workers, so one client's frame never blocks the others
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 
 # Load models
 print("Loading models...")
@@ -23,6 +27,8 @@ import sys
 sys.path.append('app')
 from services.movenet_service import MoveNetService
 from services.lstm_service import LSTMClassifier
+from services.frame_decoder import decode_reduced
+from app.config import settings
 
 # Load services
 movenet_service = MoveNetService()
@@ -48,14 +54,10 @@ def base64_to_image(base64_string):
         
         # Decode base64
         image_bytes = base64.b64decode(base64_string)
-        image = Image.open(BytesIO(image_bytes))
-        image = np.array(image)
         
-        # Convert RGB to BGR for OpenCV
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        
-        return image
+        # Decode JPEGs at the smallest DCT scale still >= the 256px model input,
+        # as BGR for OpenCV
+        return decode_reduced(image_bytes, (256, 256))
     except Exception as e:
         print(f"Error decoding image: {e}")
         return None
@@ -72,12 +74,15 @@ def detect_keypoints(image):
         return None
 
 
-def classify_pose(keypoints):
-    """Classify pose from keypoints"""
+def classify_pose(keypoints, stream=None):
+    """Classify pose from keypoints; with a client's stream state, one recurrent step"""
     try:
         # Use our existing LSTM service
         if len(keypoints) == 17:
-            label, confidence, probs = pose_classifier.predict_sequence([keypoints])
+            if stream is not None:
+                label, confidence, probs = pose_classifier.predict_step(stream, keypoints)
+            else:
+                label, confidence, probs = pose_classifier.predict_sequence([keypoints])
             return {
                 'pose': label,
                 'confidence': confidence
@@ -107,57 +112,129 @@ def keypoints_to_list(keypoints):
     ]
 
 
+class FrameMailbox:
+    """Latest-frame-wins hand-off from Socket.IO handlers to inference workers.
+
+    Each session id holds at most one pending frame; a newer frame replaces
+    it. A session is in the ready queue at most once and is processed by one
+    worker at a time, so results for a client stay in order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._busy = set()
+        self._ready = queue.Queue()
+        self.dropped = 0
+
+    def put(self, sid, data):
+        with self._lock:
+            if sid in self._latest:
+                self.dropped += 1
+            self._latest[sid] = data
+            if sid not in self._busy:
+                self._busy.add(sid)
+                self._ready.put(sid)
+
+    def take(self):
+        sid = self._ready.get()
+        with self._lock:
+            return sid, self._latest.pop(sid, None)
+
+    def done(self, sid):
+        with self._lock:
+            if sid in self._latest:
+                self._ready.put(sid)
+            else:
+                self._busy.discard(sid)
+
+    def discard(self, sid):
+        with self._lock:
+            self._latest.pop(sid, None)
+
+
+frame_mailbox = FrameMailbox()
+
+# Recurrent classifier state per Socket.IO client (as per WebSocket in the
+# FastAPI app): created on connect, dropped on disconnect. The mailbox runs
+# one frame per sid at a time, so a state is never stepped concurrently.
+stream_states = {}
+stream_states_lock = threading.Lock()
+
+
+def process_frame(data, stream=None):
+    """Decode, detect and classify one frame; returns (event, payload)"""
+    # Get image data
+    image_data = data.get('image') if isinstance(data, dict) else None
+    if not image_data:
+        return 'error', {'message': 'No image data'}
+    
+    # Convert to numpy array
+    image = base64_to_image(image_data)
+    if image is None:
+        return 'error', {'message': 'Failed to decode image'}
+    
+    # Detect keypoints
+    keypoints = detect_keypoints(image)
+    if keypoints is None:
+        return 'error', {'message': 'Failed to detect keypoints'}
+    
+    # Classify pose
+    result = classify_pose(keypoints, stream)
+    if result is None:
+        return 'error', {'message': 'Failed to classify pose'}
+    
+    # Add keypoints for visualization
+    result['keypoints'] = keypoints_to_list(keypoints)
+    return 'pose_detected', result
+
+
+def inference_worker():
+    """Background worker: run the newest frame of each session and emit the result"""
+    while True:
+        sid, data = frame_mailbox.take()
+        try:
+            if data is None:
+                continue
+            with stream_states_lock:
+                stream = stream_states.get(sid)
+            try:
+                event, payload = process_frame(data, stream)
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+                event, payload = 'error', {'message': str(e)}
+            socketio.emit(event, payload, to=sid)
+        finally:
+            frame_mailbox.done(sid)
+
+
+for _ in range(max(1, settings.inference_workers)):
+    socketio.start_background_task(inference_worker)
+
+
 # ============================================
 # WebSocket endpoint for real-time streaming
 # ============================================
 @socketio.on('video_frame')
 def handle_video_frame(data):
-    """Process video frame from frontend"""
-    try:
-        # Get image data
-        image_data = data.get('image')
-        if not image_data:
-            emit('error', {'message': 'No image data'})
-            return
-        
-        # Convert to numpy array
-        image = base64_to_image(image_data)
-        if image is None:
-            emit('error', {'message': 'Failed to decode image'})
-            return
-        
-        # Detect keypoints
-        keypoints = detect_keypoints(image)
-        if keypoints is None:
-            emit('error', {'message': 'Failed to detect keypoints'})
-            return
-        
-        # Classify pose
-        result = classify_pose(keypoints)
-        if result is None:
-            emit('error', {'message': 'Failed to classify pose'})
-            return
-        
-        # Add keypoints for visualization
-        result['keypoints'] = keypoints_to_list(keypoints)
-        
-        # Send back to frontend
-        emit('pose_detected', result)
-        
-    except Exception as e:
-        print(f"Error processing frame: {e}")
-        emit('error', {'message': str(e)})
+    """Queue a video frame from frontend; older unprocessed frames are dropped"""
+    frame_mailbox.put(request.sid, data)
 
 
 @socketio.on('connect')
 def handle_connect():
+    with stream_states_lock:
+        stream_states[request.sid] = pose_classifier.new_stream()
     print('Client connected')
     emit('connected', {'message': 'Connected to pose detection server'})
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print('Client disconnected')
+    frame_mailbox.discard(request.sid)
+    with stream_states_lock:
+        stream_states.pop(request.sid, None)
+    print(f'Client disconnected (frames dropped so far: {frame_mailbox.dropped})')
 
 
 # ============================================
@@ -214,7 +291,16 @@ if __name__ == '__main__':
     print("="*50)
     print(f"Models: Loaded")
     print(f"Classes: {labels}")
-    print(f"Server: http://localhost:5000")
+    # Loopback only unless FLASK_HOST says otherwise (e.g. 0.0.0.0)
+    host = os.environ.get('FLASK_HOST', '127.0.0.1')
+    port = int(os.environ.get('FLASK_PORT', '5000'))
+    print(f"Server: http://{host}:{port}")
     print("="*50 + "\n")
     
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    # Debug mode (reloader, debugger) is opt-in: FLASK_DEBUG=1
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    # Flask-SocketIO refuses to run the Werkzeug development server when not
+    # started from a terminal (e.g. under a process manager); allowing that
+    # anyway is an explicit opt-in
+    allow_unsafe_werkzeug = os.environ.get('FLASK_ALLOW_UNSAFE_WERKZEUG') == '1'
+    socketio.run(app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=allow_unsafe_werkzeug)
@@ -16,8 +16,15 @@ const DoctorDashboard: React.FC = () => {
 	useEffect(() => {
 		(async () => {
 			try {
-				const { data } = await api.get('/patients/');
-				setPatients(data);
+				// The list is keyset-paginated: follow X-Next-Cursor until the last page
+				const all: Patient[] = [];
+				let cursor: string | undefined;
+				do {
+					const resp = await api.get('/patients/', { params: { limit: 500, cursor } });
+					all.push(...resp.data);
+					cursor = resp.headers['x-next-cursor'];
+				} while (cursor);
+				setPatients(all);
 			} catch (e: any) {
 				setError(e?.response?.data?.detail ?? 'Failed to load patients');
 			} finally {
@@ -163,9 +163,15 @@ const PatientDashboard: React.FC = () => {
 		const socket = new WebSocket(wsUrl);
 		setWs(socket);
 		
+		// Upload settings advised by the server (0 = not advised yet: native size, no fps cap)
+		const capture = { width: 0, height: 0, quality: 0.5, fps: 0 };
+		const captureCanvas = document.createElement('canvas');
+		let lastSent = 0;
+		
 		socket.onopen = () => {
 			console.log('WebSocket connected - AI Analysis started!');
 			setConnectionStatus('connected');
+			socket.send(JSON.stringify({ type: 'control', capture_advice: true }));
 		};
 		
 		socket.onmessage = (ev) => {
@@ -173,6 +179,14 @@ const PatientDashboard: React.FC = () => {
 				const data = JSON.parse(ev.data);
 				console.log('WebSocket message received:', data);
 				
+				if (data.type === 'capture_advice') {
+					capture.width = data.width;
+					capture.height = data.height;
+					capture.quality = data.jpeg_quality;
+					capture.fps = data.fps;
+					return;
+				}
+				
 				// Store keypoints for skeleton drawing
 				if (data.keypoints) {
 					console.log(`Received ${data.keypoints.length} keypoints for skeleton drawing`);
@@ -285,8 +299,16 @@ const PatientDashboard: React.FC = () => {
 				ctx.restore();
 			}
 			
-			const dataUrl = canvasRef.current!.toDataURL('image/jpeg', 0.5);
-			socket.send(JSON.stringify({ image_b64: dataUrl }));
+			// Send the raw video frame at the advised size, quality and rate
+			const now = performance.now();
+			if (!capture.fps || now - lastSent >= 1000 / capture.fps) {
+				lastSent = now;
+				captureCanvas.width = capture.width || w;
+				captureCanvas.height = capture.height || h;
+				captureCanvas.getContext('2d')!.drawImage(videoRef.current, 0, 0, captureCanvas.width, captureCanvas.height);
+				const dataUrl = captureCanvas.toDataURL('image/jpeg', capture.quality);
+				socket.send(JSON.stringify({ image_b64: dataUrl }));
+			}
 			
 			requestAnimationFrame(tick);
 		};
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bulk export checks for sessions and per-frame results
+
+On a scratch SQLite database (never the configured one): NDJSON/CSV row
+counts and headers for empty and filtered exports, compacted results read
+back from their archives with archived=true, a retention pass running in
+the middle of an export not duplicating rows, and the /export endpoint
+streaming the same rows as the CLI path.
+Runs standalone (python test_export.py) or under pytest.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_async_db_engine, create_db_engine
+from app.models import ExerciseResult, Session as DbSession, User, UserRole
+from app.routers import export_router
+from app.services.export import RESULT_FIELDS, SESSION_FIELDS, ExportFilters, check_format, iter_export, pq
+from app.services.retention import compact
+
+FRAMES = 40
+NOW = datetime(2026, 3, 31, 12)
+# (patient, exercise, days before NOW); sessions older than 25 days get compacted
+SESSIONS = [("a", "squat", 40), ("a", "squat", 5), ("a", "lunge", 3), ("b", "squat", 2)]
+CUTOFF = NOW - timedelta(days=25)
+
+
+def scratch_database(compacted: bool = True):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'export.db')}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    patients = {}
+    for name in ("a", "b"):
+        patients[name] = User(email=f"{name}@example.com", full_name=name.upper(), hashed_password="x", role=UserRole.patient)
+        db.add(patients[name])
+    db.flush()
+    for i, (name, exercise, age) in enumerate(SESSIONS):
+        started = NOW - timedelta(days=age)
+        session = DbSession(patient_id=patients[name].id, exercise_name=exercise, video_path=f"v{i}", started_at=started)
+        db.add(session)
+        db.flush()
+        db.add_all([
+            ExerciseResult(
+                session_id=session.id, frame_index=f, predicted_label=exercise, confidence=0.5,
+                pose_keypoints=[{"x": 0.25, "y": 0.5, "score": 1.0}] * 17,
+                timestamp=started + timedelta(seconds=f), exercise_name=exercise,
+            )
+            for f in range(FRAMES)
+        ])
+    db.commit()
+    ids = {name: p.id for name, p in patients.items()}
+    db.close()
+    if compacted:
+        compact(Session, CUTOFF, archive=True, batch_rows=16)
+    return url, engine, Session, ids
+
+
+def export(Session, kind, fmt, filters=ExportFilters(), chunk_rows=16) -> bytes:
+    db = Session()
+    try:
+        return b"".join(iter_export(db, kind, fmt, filters, chunk_rows))
+    finally:
+        db.close()
+
+
+def ndjson_rows(data: bytes):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+def csv_rows(data: bytes):
+    rows = list(csv.reader(io.StringIO(data.decode())))
+    return rows[0], rows[1:]
+
+
+def test_empty_export():
+    _, _, Session, _ = scratch_database()
+    nobody = ExportFilters(patient_id=999)
+    for kind, fields in (("sessions", SESSION_FIELDS), ("results", RESULT_FIELDS)):
+        assert export(Session, kind, "ndjson", nobody) == b""
+        header, rows = csv_rows(export(Session, kind, "csv", nobody))
+        assert header == list(fields) and rows == []
+
+
+def test_filters_and_archived_rows():
+    _, _, Session, ids = scratch_database()
+    a, b = ids["a"], ids["b"]
+    cases = [
+        # filters, sessions, live results, archived results
+        (ExportFilters(), 4, 3 * FRAMES, FRAMES),
+        (ExportFilters(patient_id=a), 3, 2 * FRAMES, FRAMES),
+        (ExportFilters(patient_id=b), 1, FRAMES, 0),
+        (ExportFilters(exercise="lunge"), 1, FRAMES, 0),
+        (ExportFilters(patient_id=a, exercise="squat"), 2, FRAMES, FRAMES),
+        # Inclusive day range covering only the archived session's day
+        (ExportFilters(start=date(2026, 2, 19), end=date(2026, 2, 19)), 1, 0, FRAMES),
+        (ExportFilters(start=date(2026, 3, 26)), 3, 3 * FRAMES, 0),
+        (ExportFilters(end=date(2026, 3, 28)), 3, 2 * FRAMES, FRAMES),
+    ]
+    for filters, sessions, live, archived in cases:
+        label = {name: getattr(filters, name) for name in filters.__slots__}
+        assert len(ndjson_rows(export(Session, "sessions", "ndjson", filters))) == sessions, label
+        header, rows = csv_rows(export(Session, "sessions", "csv", filters))
+        assert header == list(SESSION_FIELDS) and len(rows) == sessions, label
+
+        results = ndjson_rows(export(Session, "results", "ndjson", filters))
+        assert sum(not r["archived"] for r in results) == live, label
+        assert sum(r["archived"] for r in results) == archived, label
+        for r in results:
+            assert set(r) == set(RESULT_FIELDS)
+            assert (r["id"] is None) == r["archived"]
+            assert len(r["pose_keypoints"]) == 17
+            if filters.patient_id is not None:
+                assert r["patient_id"] == filters.patient_id
+            if filters.exercise:
+                assert r["exercise_name"] == filters.exercise
+
+        header, rows = csv_rows(export(Session, "results", "csv", filters))
+        assert header == list(RESULT_FIELDS) and len(rows) == live + archived, label
+        column = header.index("archived")
+        assert sum(row[column] == "True" for row in rows) == archived, label
+
+
+def test_retention_during_export_does_not_duplicate():
+    _, _, Session, _ = scratch_database(compacted=False)
+    db = Session()
+    try:
+        chunks = iter_export(db, "results", "ndjson", ExportFilters(), chunk_rows=16)
+        data = next(chunks)  # live rows are being read...
+        # ...when a retention pass archives the expired session
+        stats = compact(Session, CUTOFF, archive=True, batch_rows=16)
+        assert stats["rows"] == FRAMES
+        data += b"".join(chunks)
+    finally:
+        db.close()
+    rows = ndjson_rows(data)
+    assert len(rows) == 4 * FRAMES
+    assert len({(r["session_id"], r["frame_index"]) for r in rows}) == 4 * FRAMES
+    # The next export sees the archive instead
+    rows = ndjson_rows(export(Session, "results", "ndjson"))
+    assert len(rows) == 4 * FRAMES and sum(r["archived"] for r in rows) == FRAMES
+
+
+def test_endpoint_streams_export():
+    url, _, Session, ids = scratch_database()
+
+    async def fetch(**params):
+        async_engine = create_async_db_engine(url)
+        original = export_router.AsyncSessionLocal
+        export_router.AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        try:
+            query = {"format": "ndjson", "patient_id": None, "exercise": None, "start": None, "end": None, **params}
+            response = await export_router.export_data(user=None, **query)
+            return b"".join([chunk async for chunk in response.body_iterator])
+        finally:
+            export_router.AsyncSessionLocal = original
+            await async_engine.dispose()
+
+    for kind in ("sessions", "results"):
+        for fmt in ("ndjson", "csv"):
+            filters = ExportFilters(patient_id=ids["a"])
+            assert asyncio.run(fetch(kind=kind, format=fmt, patient_id=ids["a"])) == export(Session, kind, fmt, filters), (kind, fmt)
+    try:
+        asyncio.run(fetch(kind="results", start=date(2026, 3, 2), end=date(2026, 3, 1)))
+    except HTTPException as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("start after end was accepted")
+
+
+def test_format_check():
+    for fmt in ("ndjson", "csv"):
+        check_format(fmt)
+    for fmt in ("xml",) + (("parquet",) if pq is None else ()):
+        try:
+            check_format(fmt)
+        except ValueError:
+            continue
+        raise AssertionError(f"format {fmt!r} was accepted")
+
+
+def main():
+    print("🧪 Checking bulk export...")
+    ok = True
+    for test in (test_empty_export, test_filters_and_archived_rows, test_retention_during_export_does_not_duplicate, test_endpoint_streams_export, test_format_check):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Client telemetry validation for the realtime latency stats
+
+Timestamps and latencies sent by a realtime client are only accepted when
+they are finite, non-bool numbers, so a NaN/Infinity never gets echoed back
+or turns the admin latency summary into non-compliant JSON.
+Runs standalone (python test_latency_stats.py) or under pytest.
+"""
+import json
+import sys
+
+from app.services.latency_stats import ConnectionStats, client_seq, finite_number
+
+
+def test_finite_number_rejects_non_finite_and_bools():
+    message = json.loads('{"t_capture": NaN, "e2e_ms": Infinity, "a": -Infinity, "b": true, "c": "12", "d": null}')
+    for key in ("t_capture", "e2e_ms", "a", "b", "c", "d", "missing"):
+        assert finite_number(message.get(key)) is None, key
+    assert finite_number(12) == 12.0
+    assert finite_number(1712345678901.5) == 1712345678901.5
+
+
+def test_client_seq_accepts_only_ints():
+    assert client_seq(7) == 7
+    for value in (True, 7.0, float("nan"), "7", None):
+        assert client_seq(value) is None, value
+
+
+def test_summary_stays_json_compliant():
+    stats = ConnectionStats(1, None, "squat")
+    stats.record(uplink=float("nan"), e2e=float("inf"), server=5.0)
+    stats.record(uplink=10.0, server=7.0)
+    summary = stats.summary()
+    # allow_nan=False is what JSONResponse uses
+    json.dumps(summary, allow_nan=False)
+    assert summary["frames"] == 2
+    assert summary["latency_ms"]["uplink"]["samples"] == 1
+    assert summary["latency_ms"]["server"]["samples"] == 2
+    assert "e2e" not in summary["latency_ms"]
+
+
+def main():
+    print("🧪 Checking realtime telemetry validation...")
+    ok = True
+    for test in (test_finite_number_rejects_non_finite_and_bools, test_client_seq_accepts_only_ints, test_summary_stays_json_compliant):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
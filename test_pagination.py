@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination checks for the patient session list
+
+Cursor encode/decode round trips and rejection of foreign or tampered
+cursors, then a full page walk over sessions with tied start times on a
+scratch SQLite database (never the configured one), including legacy rows
+whose NULL started_at is backfilled by the migrations (from completed_at,
+or from the current time when there is nothing else to go on).
+Runs standalone (python test_pagination.py) or under pytest.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_async_db_engine, create_db_engine
+from app.migrations import run_migrations
+from app.models import Session as DbSession, User, UserRole
+from app.routers import patients_router
+from app.services.pagination import decode_cursor, encode_cursor
+
+# Pre-0002 sessions table, where started_at could be NULL
+LEGACY_SESSIONS_DDL = (
+    "CREATE TABLE sessions (id INTEGER PRIMARY KEY, patient_id INTEGER REFERENCES users(id), "
+    "exercise_name VARCHAR, video_path VARCHAR NOT NULL, started_at DATETIME, completed_at DATETIME, "
+    "duration_seconds INTEGER, form_score FLOAT, repetitions_count INTEGER, status VARCHAR)"
+)
+
+
+def scratch_database(legacy: bool = False):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pages.db')}"
+    engine = create_db_engine(url)
+    if legacy:
+        with engine.begin() as conn:
+            conn.execute(text(LEGACY_SESSIONS_DDL))
+    Base.metadata.create_all(bind=engine)
+    return url, engine
+
+
+def walk_sessions(url: str, patient_id: int, limit: int):
+    """Follow next cursors through _patient_sessions_page; returns the session ids in order"""
+    async def walk():
+        async_engine = create_async_db_engine(url)
+        original = patients_router.AsyncSessionLocal
+        patients_router.AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        try:
+            ids, cursor, seen = [], None, set()
+            while True:
+                # A cursor that sorts after its own row would repeat the page forever
+                assert cursor not in seen, f"cursor repeated after {ids}"
+                seen.add(cursor)
+                after = decode_cursor(f"sessions:{patient_id}", cursor, (datetime, int))
+                query = patients_router._patient_sessions_query(patient_id, after)
+                page, cursor = await patients_router._patient_sessions_page(patient_id, query, limit)
+                assert len(page) <= limit
+                ids.extend(s.id for s in page)
+                if cursor is None:
+                    return ids
+        finally:
+            patients_router.AsyncSessionLocal = original
+            await async_engine.dispose()
+    return asyncio.run(walk())
+
+
+def add_sessions(db, patient_id: int, started: list):
+    for i, started_at in enumerate(started):
+        db.add(DbSession(patient_id=patient_id, exercise_name="squat", video_path=f"v{i}", started_at=started_at))
+    db.commit()
+
+
+def expected_order(db, patient_id: int):
+    sessions = db.query(DbSession).filter(DbSession.patient_id == patient_id).all()
+    return [s.id for s in sorted(sessions, key=lambda s: (s.started_at, s.id), reverse=True)]
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    token = encode_cursor("sessions:7", [when, 42])
+    assert decode_cursor("sessions:7", token, (datetime, int)) == [when, 42]
+    assert decode_cursor("sessions:7", None, (datetime, int)) is None
+    for bad in (
+        encode_cursor("sessions:8", [when, 42]),  # another patient's list
+        encode_cursor("sessions:7", [None, 42]),
+        encode_cursor("sessions:7", [when, "42"]),
+        encode_cursor("sessions:7", [when]),
+        "not-a-cursor",
+    ):
+        try:
+            decode_cursor("sessions:7", bad, (datetime, int))
+        except ValueError:
+            continue
+        raise AssertionError(f"cursor {bad!r} was accepted")
+
+
+def test_page_walk_with_tied_timestamps():
+    url, engine = scratch_database()
+    db = sessionmaker(bind=engine)()
+    patient = User(email="walk@example.com", full_name="P", hashed_password="x", role=UserRole.patient)
+    db.add(patient)
+    db.commit()
+    base = datetime(2026, 3, 1, 9)
+    # Runs of identical start times straddle page boundaries
+    add_sessions(db, patient.id, [base + timedelta(minutes=i // 5) for i in range(23)])
+    expected = expected_order(db, patient.id)
+    db.close()
+    for limit in (1, 4, 5, 100):
+        assert walk_sessions(url, patient.id, limit) == expected, f"limit={limit}"
+
+
+def test_null_started_at_is_backfilled_and_paged():
+    url, engine = scratch_database(legacy=True)
+    db = sessionmaker(bind=engine)()
+    patient = User(email="legacy@example.com", full_name="P", hashed_password="x", role=UserRole.patient)
+    db.add(patient)
+    db.commit()
+    add_sessions(db, patient.id, [datetime(2026, 3, 1, 9), datetime(2026, 3, 2, 9), datetime(2026, 3, 3, 9)])
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO sessions (patient_id, exercise_name, video_path, started_at, completed_at) "
+            "VALUES (:p, 'squat', 'legacy', NULL, '2026-03-02 12:00:00.000000')"
+        ), {"p": patient.id})
+    run_migrations(engine)
+    assert db.query(DbSession).filter(DbSession.started_at.is_(None)).count() == 0
+    expected = expected_order(db, patient.id)
+    db.close()
+    assert len(expected) == 4
+    assert walk_sessions(url, patient.id, 1) == expected
+
+
+def test_null_started_at_without_history_is_paged():
+    url, engine = scratch_database(legacy=True)
+    db = sessionmaker(bind=engine)()
+    patient = User(email="orphan@example.com", full_name="P", hashed_password="x", role=UserRole.patient)
+    db.add(patient)
+    db.commit()
+    now = datetime.utcnow()
+    add_sessions(db, patient.id, [now - timedelta(days=2), now - timedelta(days=1)])
+    # No results and no completed_at: the backfill falls back to "now", which
+    # must be stored in the same format SQLAlchemy binds for the cursor
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO sessions (patient_id, exercise_name, video_path, started_at) "
+            "VALUES (:p, 'squat', 'legacy', NULL)"
+        ), {"p": patient.id})
+    run_migrations(engine)
+    backfilled = db.query(DbSession).filter(DbSession.video_path == "legacy").one()
+    assert backfilled.started_at >= now
+    expected = expected_order(db, patient.id)
+    db.close()
+    assert expected[0] == backfilled.id
+    for limit in (1, 2):
+        assert walk_sessions(url, patient.id, limit) == expected, f"limit={limit}"
+
+
+def main():
+    print("🧪 Checking keyset pagination...")
+    ok = True
+    for test in (test_cursor_round_trip, test_page_walk_with_tied_timestamps, test_null_started_at_is_backfilled_and_paged, test_null_started_at_without_history_is_paged):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
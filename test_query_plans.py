@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression checks for the hot analytics/patient queries
+
+Builds a scratch SQLite database with the app schema and migrations, then
+runs EXPLAIN QUERY PLAN for each hot query and fails if any of them scans a
+whole table or sorts with a temporary B-tree instead of using an index.
+Runs standalone (python test_query_plans.py) or under pytest.
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from app.database import Base, create_db_engine
+from app.migrations import run_migrations
+from app.models import ExerciseResult, PatientDailyRollup, Session as DbSession, SessionRollup, User, UserRole
+from app.routers.patients_router import _patient_sessions_query
+
+# A dedicated scratch database: the configured DATABASE_URL is never touched
+engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}")
+
+
+def hot_queries():
+    """(name, statement) for each query on a request path"""
+    patient_id, session_id = 1, 1
+    return [
+        # patients_router.list_patients (keyset on id)
+        ("patients page",
+         select(User).where(User.role == UserRole.patient, User.id > 10).order_by(User.id).limit(101)),
+        # patients_router.list_patient_sessions (keyset on started_at, id)
+        ("patient sessions first page",
+         _patient_sessions_query(patient_id, None).limit(101)),
+        ("patient sessions next page",
+         _patient_sessions_query(patient_id, [datetime(2026, 1, 1), 10]).limit(101)),
+        # analytics_router.compute_patient_progress
+        ("patient session count",
+         select(func.count(DbSession.id)).where(DbSession.patient_id == patient_id)),
+        ("patient session rollups",
+         select(SessionRollup.label_counts, SessionRollup.last_active)
+         .join(DbSession, SessionRollup.session_id == DbSession.id)
+         .where(DbSession.patient_id == patient_id)),
+        # per-session label histogram / rollup aggregates
+        ("session label stats",
+         select(ExerciseResult.predicted_label, func.count(ExerciseResult.id),
+                func.sum(ExerciseResult.confidence), func.max(ExerciseResult.timestamp))
+         .where(ExerciseResult.session_id == session_id)
+         .group_by(ExerciseResult.predicted_label)),
+        # rollups.apply_results
+        ("session rollup row",
+         select(SessionRollup.label_counts, SessionRollup.last_active).where(SessionRollup.session_id == session_id)),
+        ("patient daily rollups",
+         select(PatientDailyRollup)
+         .where(PatientDailyRollup.patient_id == patient_id, PatientDailyRollup.day >= date(2026, 1, 1))
+         .order_by(PatientDailyRollup.day)),
+    ]
+
+
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def query_plan(statement):
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(plan):
+    """Full table scans and temp-B-tree sorts; 'SCAN x USING (COVERING) INDEX' without a search is a full scan too"""
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail:
+            problems.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def test_hot_queries_use_indexes():
+    setup_database()
+    failures = {}
+    for name, statement in hot_queries():
+        problems = plan_problems(query_plan(statement))
+        if problems:
+            failures[name] = problems
+    assert not failures, f"query plans regressed: {failures}"
+
+
+def test_migrations_are_idempotent():
+    setup_database()
+    assert run_migrations(engine) == []
+
+
+def main():
+    print("🧪 Checking query plans...")
+    setup_database()
+    ok = True
+    for name, statement in hot_queries():
+        plan = query_plan(statement)
+        problems = plan_problems(plan)
+        ok &= not problems
+        print(f"{'✅' if not problems else '❌'} {name}")
+        for detail in plan:
+            print(f"     {detail}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Retention / compaction checks for per-frame exercise results
+
+On a scratch SQLite database (never the configured one): archive blobs
+round-trip, compaction archives and deletes expired rows (and is not
+blocked by rows without a session), rollups rebuilt from the archives match
+the live ones, the dry run reports the right rows, incremental vacuum
+returns freed pages, and two concurrent passes never archive a row twice.
+Runs standalone (python test_retention.py) or under pytest.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import ExerciseResult, ExerciseResultArchive, PatientDailyRollup, Session as DbSession, SessionRollup, User, UserRole
+from app.services.retention import compact, compaction_report, incremental_vacuum, pack_results, unpack_archive
+from app.services.rollups import rebuild_rollups
+
+Row = namedtuple("Row", "id frame_index predicted_label confidence pose_keypoints timestamp exercise_name")
+
+
+def scratch_sessionmaker():
+    # New files get auto_vacuum=INCREMENTAL from the connect pragmas
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'retention.db')}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, autoflush=False)
+
+
+def keypoints(rng):
+    return [{"x": rng.random(), "y": rng.random(), "score": rng.random()} for _ in range(17)]
+
+
+def populate(db, now, rng, days_ago=(40, 30, 20, 5), frames=300, email="r@example.com"):
+    patient = User(email=email, full_name="P", hashed_password="x", role=UserRole.patient)
+    db.add(patient)
+    db.flush()
+    for i, age in enumerate(days_ago):
+        started = now - timedelta(days=age)
+        session = DbSession(patient_id=patient.id, exercise_name="squat", video_path="v", started_at=started, form_score=0.5 + i / 10)
+        db.add(session)
+        db.flush()
+        db.add_all([
+            ExerciseResult(
+                session_id=session.id, frame_index=f, predicted_label=rng.choice(["squat", "lunge"]),
+                confidence=rng.random(), pose_keypoints=keypoints(rng),
+                timestamp=started + timedelta(seconds=f, microseconds=rng.randrange(10**6)), exercise_name="squat",
+            )
+            for f in range(frames)
+        ])
+    db.commit()
+    rebuild_rollups(db)
+
+
+def rollup_snapshot(db):
+    sessions = sorted((r.session_id, r.frame_count, r.confidence_sum, r.label_counts, r.last_active) for r in db.query(SessionRollup))
+    days = sorted(
+        (r.patient_id, r.day, r.session_count, r.frame_count, r.confidence_sum, r.label_counts, r.last_active)
+        for r in db.query(PatientDailyRollup)
+    )
+    return sessions, days
+
+
+def assert_rollups_close(before, after):
+    for old_rows, new_rows in zip(before, after):
+        assert len(old_rows) == len(new_rows)
+        for old, new in zip(old_rows, new_rows):
+            # Sums may differ in the last bits from summation order only
+            assert [v for v in old if not isinstance(v, float)] == [v for v in new if not isinstance(v, float)], (old, new)
+            for a, b in zip(old, new):
+                if isinstance(a, float):
+                    assert abs(a - b) < 1e-9, (old, new)
+
+
+def test_pack_unpack_round_trip():
+    rng = random.Random(1)
+    when = datetime(2026, 3, 1, 12, 0, 0, 123457)
+    rows = [
+        Row(1, 0, "squat", 0.123456789012345, keypoints(rng), when, "squat"),
+        Row(2, None, None, None, [], None, None),
+        Row(3, 2, "lunge", 1.0, keypoints(rng)[:5], when + timedelta(microseconds=1), "lunge"),
+    ]
+    unpacked = list(unpack_archive(pack_results(rows)))
+    assert len(unpacked) == len(rows)
+    for row, out in zip(rows, unpacked):
+        assert out["frame_index"] == row.frame_index
+        assert out["predicted_label"] == row.predicted_label
+        assert out["confidence"] == row.confidence
+        assert out["timestamp"] == row.timestamp
+        assert out["exercise_name"] == row.exercise_name
+        assert len(out["pose_keypoints"]) == len(row.pose_keypoints)
+        for kp, kp_out in zip(row.pose_keypoints, out["pose_keypoints"]):
+            for axis in ("x", "y", "score"):
+                assert abs(kp[axis] - kp_out[axis]) <= 0.5 / 65535 + 1e-12
+
+
+def test_compaction_preserves_rollups():
+    rng = random.Random(2)
+    engine, Session = scratch_sessionmaker()
+    now = datetime.utcnow()
+    db = Session()
+    populate(db, now, rng)
+    # An expired row without a session must not stall the job
+    db.add(ExerciseResult(session_id=None, predicted_label="squat", confidence=0.5, timestamp=now - timedelta(days=50)))
+    db.commit()
+    before = rollup_snapshot(db)
+    cutoff = now - timedelta(days=25)
+
+    report = compaction_report(db, cutoff)
+    assert report["rows"] == 601 and report["sessions"] == 2
+    assert 0 < report["archive_bytes_estimate"] < report["row_bytes_estimate"]
+    db.close()
+
+    stats = compact(Session, cutoff, archive=True, batch_rows=128)
+    assert stats["rows"] == 600 and stats["orphans"] == 1
+    assert stats["archives"] == 6  # 2 sessions x ceil(300 / 128)
+
+    db = Session()
+    assert db.query(ExerciseResult).filter(ExerciseResult.timestamp < cutoff).count() == 0
+    assert db.query(ExerciseResult).count() == 600
+    assert sum(a.frame_count for a in db.query(ExerciseResultArchive)) == 600
+    rebuild_rollups(db)
+    assert_rollups_close(before, rollup_snapshot(db))
+    db.close()
+
+    freed = incremental_vacuum(engine, 100000)
+    assert freed is not None and freed > 0
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+
+
+def test_concurrent_passes_archive_each_row_once():
+    rng = random.Random(3)
+    engine, Session = scratch_sessionmaker()
+    now = datetime.utcnow()
+    db = Session()
+    populate(db, now, rng, days_ago=(40, 35, 30, 5), frames=1000)
+    db.close()
+    cutoff = now - timedelta(days=25)
+
+    # Worker A has read its first chunk; worker B runs a whole pass before A deletes it
+    interleaved = {}
+
+    def run_other_pass(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("DELETE") and "b" not in interleaved:
+            interleaved["b"] = None
+            other = threading.Thread(target=lambda: interleaved.update(b=compact(Session, cutoff, batch_rows=400)))
+            other.start()
+            other.join()
+
+    event.listen(engine, "before_cursor_execute", run_other_pass)
+    try:
+        a = compact(Session, cutoff, batch_rows=400)
+    finally:
+        event.remove(engine, "before_cursor_execute", run_other_pass)
+    b = interleaved["b"]
+    db = Session()
+    assert sum(r.frame_count for r in db.query(ExerciseResultArchive)) == 3000
+    db.close()
+    assert a["rows"] == 0 and a["conflicts"] == 1, a
+    assert b["rows"] == 3000, b
+
+    # And two passes left to race freely
+    db = Session()
+    populate(db, now, rng, days_ago=(45, 26), frames=1000, email="r2@example.com")
+    db.close()
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(compact(Session, cutoff, batch_rows=250))) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(r["rows"] for r in results) == 2000, results
+
+    db = Session()
+    archives = db.query(ExerciseResultArchive).all()
+    assert sum(a.frame_count for a in archives) == 5000
+    assert sum(1 for a in archives for _ in unpack_archive(a.data)) == 5000
+    assert db.query(ExerciseResult).filter(ExerciseResult.timestamp < cutoff).count() == 0
+    db.close()
+
+
+def main():
+    print("🧪 Checking retention and compaction...")
+    ok = True
+    for test in (test_pack_unpack_round_trip, test_compaction_preserves_rollups, test_concurrent_passes_archive_each_row_once):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Behavioural checks for the incrementally maintained analytics rollups
+
+Runs against a scratch SQLite database (never the configured one): rollups
+built batch by batch with apply_results must equal a full rebuild, and a
+rollup row created by a concurrent writer between our UPDATE and INSERT
+must be merged into rather than failing the transaction.
+Runs standalone (python test_rollups.py) or under pytest.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import ExerciseResult, PatientDailyRollup, Session as DbSession, SessionRollup, User, UserRole
+from app.services.rollups import apply_results, rebuild_rollups
+
+
+def scratch_sessionmaker():
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'rollups.db')}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, autoflush=False)
+
+
+def add_patient_session(db, started_at, form_score=None):
+    patient = User(email=f"p{random.randrange(10**9)}@example.com", full_name="P", hashed_password="x", role=UserRole.patient)
+    db.add(patient)
+    db.flush()
+    session = DbSession(patient_id=patient.id, exercise_name="squat", video_path="v", started_at=started_at, form_score=form_score)
+    db.add(session)
+    db.flush()
+    return patient.id, session.id
+
+
+def snapshot(db):
+    sessions = sorted(
+        (r.session_id, r.patient_id, r.frame_count, round(r.confidence_sum, 6), r.label_counts, r.last_active)
+        for r in db.query(SessionRollup)
+    )
+    days = sorted(
+        (r.patient_id, r.day, r.session_count, r.frame_count, round(r.confidence_sum, 6), r.label_counts,
+         r.form_score_count, round(r.form_score_sum, 6), r.last_active)
+        for r in db.query(PatientDailyRollup)
+    )
+    return sessions, days
+
+
+def test_incremental_rollups_match_rebuild():
+    rng = random.Random(7)
+    _, Session = scratch_sessionmaker()
+    db = Session()
+    start = datetime(2026, 3, 1, 23, 50)
+    for s in range(3):
+        patient_id, session_id = add_patient_session(db, start + timedelta(days=s), form_score=0.5 + s / 10)
+        # Several batches per session, crossing midnight
+        for batch in range(4):
+            rows = []
+            for i in range(50):
+                ts = start + timedelta(days=s, minutes=batch * 5, seconds=i)
+                row = (rng.choice(["squat", "lunge"]), rng.random(), ts)
+                db.add(ExerciseResult(session_id=session_id, predicted_label=row[0], confidence=row[1], timestamp=ts))
+                rows.append(row)
+            apply_results(db, session_id, patient_id, rows, 0.5 + s / 10)
+            db.commit()
+    incremental = snapshot(db)
+    rebuild_rollups(db)
+    assert snapshot(db) == incremental
+    db.close()
+
+
+def test_concurrent_rollup_insert_is_merged():
+    engine, Session = scratch_sessionmaker()
+    db = Session()
+    patient_id, session_id = add_patient_session(db, datetime(2026, 3, 1, 12))
+    db.commit()
+
+    # Simulate another writer: right after our UPDATE finds no rollup row,
+    # the row appears, so our INSERT hits the primary key
+    injected = []
+
+    def insert_competing_row(conn, cursor, statement, parameters, context, executemany):
+        if not injected and statement.startswith("UPDATE session_rollups") and cursor.rowcount == 0:
+            injected.append(True)
+            cursor.connection.execute(
+                "INSERT INTO session_rollups (session_id, patient_id, frame_count, confidence_sum, label_counts) "
+                "VALUES (?, ?, 3, 1.5, '{\"squat\": 3}')",
+                (session_id, patient_id),
+            )
+
+    event.listen(engine, "after_cursor_execute", insert_competing_row)
+    try:
+        ts = datetime(2026, 3, 1, 12, 5)
+        apply_results(db, session_id, patient_id, [("squat", 0.5, ts), ("lunge", 1.0, ts)])
+        db.commit()
+    finally:
+        event.remove(engine, "after_cursor_execute", insert_competing_row)
+    assert injected, "duplicate-key path was not exercised"
+
+    row = db.get(SessionRollup, session_id)
+    assert row.frame_count == 5
+    assert abs(row.confidence_sum - 3.0) < 1e-9
+    assert row.label_counts == {"squat": 4, "lunge": 1}
+    assert row.last_active == ts
+    db.close()
+
+
+def main():
+    print("🧪 Checking analytics rollups...")
+    ok = True
+    for test in (test_incremental_rollups_match_rebuild, test_concurrent_rollup_insert_is_merged):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
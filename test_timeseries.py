@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Progress timeseries checks: calendar bucketing, downsampling and the
+per-day merge of rollup frame metrics with session metrics
+
+Slot arithmetic (Monday weeks, calendar months, [start, end) points widened
+into evenly sized groups) is checked directly; then one patient's day, week
+and month series on a scratch SQLite database (never the configured one)
+are compared with sums computed from the raw rows.
+Runs standalone (python test_timeseries.py) or under pytest.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_async_db_engine, create_db_engine
+from app.models import ExerciseResult, Session as DbSession, User, UserRole
+from app.routers import analytics_router
+from app.services.rollups import rebuild_rollups
+from app.services.timeseries import DayStats, build_series, slot_of, slot_start
+
+
+def day_stats(sessions=0, frames=0, confidence_sum=0.0, form_scores=(), repetitions=0):
+    stats = DayStats()
+    stats.sessions, stats.frames, stats.confidence_sum, stats.repetitions = sessions, frames, confidence_sum, repetitions
+    stats.form_score_sum, stats.form_score_count = sum(form_scores), len(form_scores)
+    return stats
+
+
+def test_calendar_slots():
+    # 2026-03-02 is a Monday
+    for day in (date(2026, 3, 2), date(2026, 3, 5), date(2026, 3, 8)):
+        assert slot_start(slot_of(day, "week"), "week") == date(2026, 3, 2)
+    assert slot_of(date(2026, 3, 9), "week") == slot_of(date(2026, 3, 8), "week") + 1
+    assert slot_start(slot_of(date(1, 1, 1), "week"), "week") == date(1, 1, 1)
+    for day in (date(2026, 12, 1), date(2026, 12, 31)):
+        assert slot_start(slot_of(day, "month"), "month") == date(2026, 12, 1)
+    assert slot_start(slot_of(date(2026, 12, 31), "month") + 1, "month") == date(2027, 1, 1)
+    assert slot_start(slot_of(date(2026, 2, 28), "day") + 1, "day") == date(2026, 3, 1)
+
+
+def test_build_series_widens_buckets():
+    days = {date(2026, 3, 1) + timedelta(days=i): day_stats(1, 10, 5.0, (0.5,), 3) for i in range(0, 30, 3)}
+    assert build_series({}, "day", None, None, 10) == []
+
+    daily = build_series(days, "day", None, None, 100)
+    assert len(daily) == 10  # only non-empty days
+    assert all(p["end"] - p["start"] == timedelta(days=1) for p in daily)
+
+    # 28 days (Mar 1 .. Mar 28) into at most 5 points: groups of ceil(28 / 5) = 6 days
+    series = build_series(days, "day", None, None, 5)
+    assert len(series) == 5
+    assert series[0]["start"] == date(2026, 3, 1) and series[-1]["end"] == date(2026, 3, 31)
+    assert all(p["end"] - p["start"] == timedelta(days=6) for p in series)
+    for a, b in zip(series, series[1:]):
+        assert a["end"] == b["start"]
+    assert [p["sessions"] for p in series] == [2, 2, 2, 2, 2]
+    assert sum(p["frames"] for p in series) == 100
+    assert all(p["mean_confidence"] == 0.5 and p["form_score"] == 0.5 for p in series)
+
+    # An explicit range anchors the groups at start, and points stay [start, end)
+    # (days come pre-filtered to the range by compute_daily_stats)
+    in_range = {day: stats for day, stats in days.items() if day >= date(2026, 3, 4)}
+    series = build_series(in_range, "week", date(2026, 3, 4), date(2026, 3, 31), 2)
+    assert series[0]["start"] == date(2026, 3, 2)  # Monday of the start week
+    assert all(p["end"] - p["start"] == timedelta(weeks=3) for p in series)  # 5 weeks into 2 points
+    assert sum(p["sessions"] for p in series) == len(in_range)
+
+    monthly = build_series(days, "month", None, None, 12)
+    assert [(p["start"], p["end"], p["sessions"]) for p in monthly] == [(date(2026, 3, 1), date(2026, 4, 1), 10)]
+
+
+def populate(db, rng):
+    patient, other = (User(email=f"{n}@example.com", full_name=n, hashed_password="x", role=UserRole.patient) for n in ("ts", "other"))
+    db.add_all([patient, other])
+    db.flush()
+    raw = []  # (started_at, form_score, repetitions, [(timestamp, confidence)])
+    for i in range(60):
+        # Some sessions start just before midnight, so frames spill into the next day
+        started = datetime(2026, 1, 1, 23, 55) + timedelta(days=rng.randrange(90), minutes=-rng.choice((0, 600)))
+        form_score = rng.choice((None, rng.random()))
+        repetitions = rng.choice((None, rng.randrange(20)))
+        frames = [(started + timedelta(seconds=15 * f), rng.random()) for f in range(rng.randrange(1, 60))]
+        for owner in (patient, other):
+            session = DbSession(
+                patient_id=owner.id, exercise_name="squat", video_path="v", started_at=started,
+                form_score=form_score, repetitions_count=repetitions,
+            )
+            db.add(session)
+            db.flush()
+            db.add_all([
+                ExerciseResult(session_id=session.id, frame_index=f, predicted_label="squat", confidence=c, timestamp=t, exercise_name="squat")
+                for f, (t, c) in enumerate(frames)
+            ])
+        raw.append((started, form_score, repetitions, frames))
+    db.commit()
+    rebuild_rollups(db)
+    return patient.id, raw
+
+
+def expected_days(raw, start=None, end=None):
+    days = defaultdict(DayStats)
+    for started, form_score, repetitions, frames in raw:
+        if (start is None or started.date() >= start) and (end is None or started.date() <= end):
+            stats = days[started.date()]
+            stats.sessions += 1
+            if form_score is not None:
+                stats.form_score_sum += form_score
+                stats.form_score_count += 1
+            stats.repetitions += repetitions or 0
+        for timestamp, confidence in frames:
+            if (start is None or timestamp.date() >= start) and (end is None or timestamp.date() <= end):
+                days[timestamp.date()].frames += 1
+                days[timestamp.date()].confidence_sum += confidence
+    return dict(days)
+
+
+def assert_series_close(actual, expected):
+    assert len(actual) == len(expected), (len(actual), len(expected))
+    for a, e in zip(actual, expected):
+        for key in ("start", "end", "sessions", "frames", "repetitions"):
+            assert a[key] == e[key], (key, a, e)
+        for key in ("mean_confidence", "form_score"):
+            assert (a[key] is None) == (e[key] is None) and (a[key] is None or abs(a[key] - e[key]) < 1e-9), (key, a, e)
+
+
+def test_patient_series_matches_raw_rows():
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'timeseries.db')}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    patient_id, raw = populate(db, random.Random(4))
+    db.close()
+
+    async def series(bucket, start, end, max_points):
+        async_engine = create_async_db_engine(url)
+        original = analytics_router.AsyncSessionLocal
+        analytics_router.AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        try:
+            timeseries = await analytics_router._patient_timeseries(patient_id, bucket, start, end, max_points)
+            return [p.model_dump() for p in timeseries.points]
+        finally:
+            analytics_router.AsyncSessionLocal = original
+            await async_engine.dispose()
+
+    for start, end in ((None, None), (date(2026, 1, 20), date(2026, 2, 17))):
+        days = expected_days(raw, start, end)
+        for bucket in ("day", "week", "month"):
+            for max_points in (200, 7):
+                actual = asyncio.run(series(bucket, start, end, max_points))
+                assert len(actual) <= max_points
+                assert_series_close(actual, build_series(days, bucket, start, end, max_points))
+        # Downsampling keeps every session and frame
+        coarse = asyncio.run(series("day", start, end, 3))
+        assert len(coarse) <= 3
+        assert sum(p["sessions"] for p in coarse) == sum(s.sessions for s in days.values())
+        assert sum(p["frames"] for p in coarse) == sum(s.frames for s in days.values())
+        widths = {p["end"] - p["start"] for p in coarse}
+        assert len(widths) == 1, widths
+
+
+def main():
+    print("🧪 Checking progress timeseries...")
+    ok = True
+    for test in (test_calendar_slots, test_build_series_widens_buckets, test_patient_series_matches_raw_rows):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            ok = False
+            print(f"❌ {test.__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())